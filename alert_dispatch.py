@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+警报异步发送：
+  - 监控线程只把消息放入有界队列后立即返回，不再等待 Telegram / 企业微信的网络请求
+  - 每个发送渠道（每个 Telegram chat_id、企业微信 webhook）单独合并：
+    短时间窗口内到达的多条警报拼成一条消息，超过渠道长度上限时自动分段
+  - 发送线程池按渠道顺序发送，失败时指数退避 + 随机抖动重试，
+    遇到限频（Telegram 429 的 retry_after）按服务端要求等待
+"""
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue, Empty, Full
+from threading import Thread, Lock
+from typing import Callable, Dict, Iterable, List, Optional
+
+from metrics import NOTIFY_SECONDS
+
+
+class RetryAfter(Exception):
+    """渠道限频：seconds 秒后再重试"""
+
+    def __init__(self, seconds: float):
+        super().__init__(f"retry after {seconds}s")
+        self.seconds = float(seconds)
+
+
+class AlertDispatcher:
+    """
+    maxsize: 队列上限，队列满时丢弃新消息并计数
+    window: 合并窗口（秒），同一渠道窗口内的消息合并发送
+    max_batch: 单次合并的最大消息条数，达到后立即发送
+    """
+
+    def __init__(self, maxsize: int = 1000, workers: int = 4, window: float = 2.0,
+                 max_batch: int = 20, max_retries: int = 3, log_callback: Optional[Callable] = None):
+        self.queue: Queue = Queue(maxsize)
+        self.window = window
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.workers = workers
+        self.log_callback = log_callback
+        self.sinks: Dict[str, tuple] = {}  # 渠道名 -> (发送函数, 单条消息长度上限)
+        self.pending: Dict[str, List[str]] = {}
+        self.window_start: Dict[str, float] = {}
+        self.sink_locks: Dict[str, Lock] = defaultdict(Lock)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='alert-sender')
+        self.stats = {'queued': 0, 'dropped': 0, 'batches': 0, 'sent': 0, 'retries': 0, 'failed': 0}
+        self.stats_lock = Lock()
+        self.running = True
+        self.thread = Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def log(self, message: str, category: str = 'warning') -> None:
+        if self.log_callback:
+            self.log_callback(message, category)
+        else:
+            print(f"[{category}] {message}")
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self.stats_lock:
+            self.stats[key] += n
+
+    def register(self, name: str, deliver: Callable[[str], bool], max_length: int = 4000) -> None:
+        """登记发送渠道：deliver(text) 成功返回 True，限频时抛出 RetryAfter"""
+        self.sinks[name] = (deliver, max_length)
+
+    def submit(self, message: str, sinks: Iterable[str]) -> bool:
+        """放入发送队列后立即返回；队列已满或已 stop() 时丢弃并返回 False"""
+        sinks = tuple(s for s in sinks if s in self.sinks)
+        if not sinks:
+            return True
+        if not self.running:
+            self._count('dropped')
+            return False
+        try:
+            self.queue.put_nowait((message, sinks))
+        except Full:
+            self._count('dropped')
+            return False
+        self._count('queued')
+        return True
+
+    def _run(self) -> None:
+        try:
+            self._loop()
+        finally:
+            # 由发送线程自己关闭线程池：stop() 等待超时后仍在合并发送时，剩余批次照常提交
+            self.pool.shutdown(wait=False)
+
+    def _loop(self) -> None:
+        while self.running or self.pending or not self.queue.empty():
+            now = time.time()
+            if self.window_start:
+                timeout = max(min(self.window_start.values()) + self.window - now, 0.01)
+            else:
+                timeout = 0.5
+            try:
+                message, sinks = self.queue.get(timeout=timeout)
+                now = time.time()
+                for sink in sinks:
+                    self.pending.setdefault(sink, []).append(message)
+                    self.window_start.setdefault(sink, now)
+            except Empty:
+                pass
+            now = time.time()
+            for sink in list(self.pending):
+                if (len(self.pending[sink]) >= self.max_batch or now - self.window_start[sink] >= self.window
+                        or not self.running):
+                    self._flush(sink)
+
+    def _flush(self, sink: str) -> None:
+        messages = self.pending.pop(sink)
+        self.window_start.pop(sink, None)
+        chunks = self._chunks(messages, self.sinks[sink][1])
+        self._count('batches', len(chunks))
+        self.pool.submit(self._deliver_all, sink, chunks, len(messages))
+
+    @staticmethod
+    def _chunks(messages: List[str], max_length: int) -> List[str]:
+        """按消息边界拼接，每段不超过 max_length（单条过长的消息截断）"""
+        chunks, current = [], ""
+        for message in messages:
+            message = message[:max_length]
+            if current and len(current) + 2 + len(message) > max_length:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n\n{message}" if current else message
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _deliver_all(self, sink: str, chunks: List[str], count: int) -> None:
+        with self.sink_locks[sink]:  # 同一渠道按顺序发送
+            for text in chunks:
+                self._deliver(sink, text, count)
+
+    def _deliver(self, sink: str, text: str, count: int) -> bool:
+        """发送一段消息，失败时指数退避 + 随机抖动重试（限频时按 retry_after 等待）"""
+        deliver = self.sinks[sink][0]
+        channel = sink.split(':', 1)[0]  # telegram:<chat_id> 按渠道汇总
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                if deliver(text):
+                    NOTIFY_SECONDS.observe(time.perf_counter() - start, channel, 'ok')
+                    self._count('sent')
+                    return True
+                NOTIFY_SECONDS.observe(time.perf_counter() - start, channel, 'failed')
+                delay = min(2 * 2 ** attempt, 60) * random.uniform(0.5, 1.5)
+            except RetryAfter as e:
+                NOTIFY_SECONDS.observe(time.perf_counter() - start, channel, 'rate_limited')
+                delay = e.seconds
+            except Exception as e:
+                NOTIFY_SECONDS.observe(time.perf_counter() - start, channel, 'error')
+                self.log(f"⚠️ {sink} 发送异常: {str(e)}")
+                delay = min(2 * 2 ** attempt, 60) * random.uniform(0.5, 1.5)
+            if attempt == self.max_retries or not self.running:
+                break
+            self._count('retries')
+            time.sleep(delay)
+        self._count('failed')
+        self.log(f"❌ {sink} 发送失败（合并 {count} 条警报）")
+        return False
+
+    def stop(self, timeout: float = 5) -> None:
+        """停止接收新消息，尽量发出已在队列中的消息（线程池在发送线程退出时关闭）"""
+        self.running = False
+        self.thread.join(timeout)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+警报历史的 SQLite 持久化（可选，配置 history_db 后启用）：
+  - add() 只把记录放入队列，由后台写线程批量写入（executemany + 单个事务），不阻塞监控线程
+  - WAL 模式，读写互不阻塞；索引 (ts)、(symbol, ts)、(type)
+  - 查询直接走数据库分页，内存占用与历史总量无关；只有查询范围内还有未写入的记录时才等待写线程
+  - 写入失败（磁盘满、数据库被锁等）时经 log_callback 报告并重试，多次失败后丢弃该批，写线程不退出
+  - purge() 按 data_retention 删除过期记录，并截断 WAL 文件
+"""
+import sqlite3
+import time
+from collections import deque
+from queue import Queue, Empty
+from threading import Event, Lock, Thread
+from typing import Callable, List, Optional
+
+FIELDS = ('timestamp', 'exchange', 'symbol', 'message', 'type', 'timeframe', 'period')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    timestamp TEXT,
+    exchange TEXT,
+    symbol TEXT,
+    message TEXT,
+    type TEXT,
+    timeframe TEXT,
+    period INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_ts ON alerts (ts);
+CREATE INDEX IF NOT EXISTS idx_alerts_symbol_ts ON alerts (symbol, ts);
+CREATE INDEX IF NOT EXISTS idx_alerts_type ON alerts (type);
+"""
+
+# data_retention 界面选项 -> 秒
+RETENTION_SECONDS = {'1小时': 3600, '6小时': 6 * 3600, '24小时': 24 * 3600}
+
+
+def retention_seconds(value, default: float = 6 * 3600) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    return RETENTION_SECONDS.get(value, default)
+
+
+class SQLiteAlertStore:
+    """
+    path: 数据库文件路径
+    batch_size / flush_interval: 攒够 batch_size 条或等待 flush_interval 秒后写入一次
+    max_retries: 一批写入失败后的重试次数，仍失败时丢弃该批并计数
+    log_callback: 写入失败时的日志回调 (消息, 类别)，未提供时打印到标准输出
+    """
+
+    def __init__(self, path: str, batch_size: int = 200, flush_interval: float = 1.0, max_retries: int = 3,
+                 log_callback: Optional[Callable] = None):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.log_callback = log_callback
+        self.queue: Queue = Queue()
+        self.pending_ts: deque = deque()  # 已入队未写入记录的时间戳（升序）
+        self.pending_lock = Lock()
+        with sqlite3.connect(path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        # 查询使用单独的连接（WAL 下读不阻塞写）
+        self.reader = sqlite3.connect(path, check_same_thread=False)
+        self.reader.row_factory = sqlite3.Row
+        self.reader_lock = Lock()
+        self.stats = {'written': 0, 'batches': 0, 'purged': 0, 'failed': 0, 'dropped': 0}
+        self.running = True
+        self.thread = Thread(target=self._writer, daemon=True)
+        self.thread.start()
+
+    def log(self, message: str, category: str = 'warning') -> None:
+        if self.log_callback:
+            self.log_callback(message, category)
+        else:
+            print(f"[{category}] {message}")
+
+    def add(self, ts: float, row: tuple) -> None:
+        with self.pending_lock:
+            self.pending_ts.append(ts)
+        self.queue.put(('row', (ts,) + tuple(row)))
+
+    def purge(self, before_ts: float) -> None:
+        """删除 before_ts 之前的记录（在写线程中执行）"""
+        self.queue.put(('purge', before_ts))
+
+    def flush(self, timeout: float = 5) -> bool:
+        """等待队列中已有的记录写入完成"""
+        done = Event()
+        self.queue.put(('flush', done))
+        return done.wait(timeout)
+
+    def flush_pending(self, end_ts: Optional[float] = None, timeout: float = 1.0) -> bool:
+        """查询范围（截止 end_ts）内还有未写入的记录时才等待写线程，否则立即返回"""
+        with self.pending_lock:
+            if not self.pending_ts or (end_ts is not None and end_ts < self.pending_ts[0]):
+                return True
+        return self.flush(timeout)
+
+    def _insert(self, conn: sqlite3.Connection, rows: List[tuple]) -> None:
+        """写入一批记录，失败时按 1、2、3... 秒间隔重试，超过 max_retries 次后丢弃"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                with conn:
+                    conn.executemany(
+                        f"INSERT INTO alerts (ts, {', '.join(FIELDS)}) VALUES ({', '.join('?' * (len(FIELDS) + 1))})",
+                        rows)
+            except sqlite3.Error as e:
+                self.stats['failed'] += 1
+                if attempt == self.max_retries or not self.running:
+                    self.stats['dropped'] += len(rows)
+                    self.log(f"❌ 警报历史写入失败，丢弃 {len(rows)} 条记录: {str(e)}", "error")
+                    return
+                self.log(f"⚠️ 警报历史写入失败，{attempt + 1} 秒后重试: {str(e)}", "warning")
+                time.sleep(attempt + 1)
+            else:
+                self.stats['written'] += len(rows)
+                self.stats['batches'] += 1
+                return
+
+    def _writer(self) -> None:
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        try:
+            while self.running or not self.queue.empty():
+                try:
+                    items = [self.queue.get(timeout=0.5)]
+                except Empty:
+                    continue
+                deadline = time.time() + self.flush_interval
+                while len(items) < self.batch_size and items[-1][0] == 'row':
+                    try:
+                        items.append(self.queue.get(timeout=max(deadline - time.time(), 0)))
+                    except Empty:
+                        break
+                rows = [data for kind, data in items if kind == 'row']
+                if rows:
+                    self._insert(conn, rows)
+                    with self.pending_lock:
+                        for _ in rows:
+                            self.pending_ts.popleft()
+                for kind, data in items:
+                    if kind == 'purge':
+                        try:
+                            with conn:
+                                self.stats['purged'] += conn.execute("DELETE FROM alerts WHERE ts < ?", (data,)).rowcount
+                            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                        except sqlite3.Error as e:
+                            self.log(f"⚠️ 警报历史清理失败: {str(e)}", "warning")
+                    elif kind == 'flush':
+                        data.set()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _where(start_ts: Optional[float], end_ts: Optional[float], alert_type: Optional[str],
+               symbol: Optional[str], exchange: Optional[str]):
+        clauses, params = [], []
+        for clause, value in (("ts >= ?", start_ts), ("ts <= ?", end_ts), ("type = ?", alert_type),
+                              ("symbol = ?", symbol), ("exchange = ?", exchange)):
+            if value is not None and value != "":
+                clauses.append(clause)
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, start_ts: Optional[float] = None, end_ts: Optional[float] = None,
+              alert_type: Optional[str] = None, symbol: Optional[str] = None, exchange: Optional[str] = None,
+              offset: int = 0, limit: Optional[int] = None, newest_first: bool = True) -> List[dict]:
+        where, params = self._where(start_ts, end_ts, alert_type, symbol, exchange)
+        order = "DESC" if newest_first else "ASC"
+        sql = f"SELECT {', '.join(FIELDS)} FROM alerts{where} ORDER BY ts {order}, id {order} LIMIT ? OFFSET ?"
+        with self.reader_lock:
+            rows = self.reader.execute(sql, params + [-1 if limit is None else limit, offset]).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self, start_ts: Optional[float] = None, end_ts: Optional[float] = None,
+              alert_type: Optional[str] = None, symbol: Optional[str] = None, exchange: Optional[str] = None) -> int:
+        where, params = self._where(start_ts, end_ts, alert_type, symbol, exchange)
+        with self.reader_lock:
+            return self.reader.execute(f"SELECT COUNT(*) FROM alerts{where}", params).fetchone()[0]
+
+    def close(self, timeout: float = 5) -> None:
+        self.running = False
+        self.thread.join(timeout)
+        with self.reader_lock:
+            self.reader.close()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+异步监控引擎（基于 ccxt.async_support）：
+  - 所有已连接交易所在同一个事件循环中并发执行
+  - 每个交易所一个信号量限制同时在途的请求数；请求速率与线程调用方共用 monitor.rate_limiters 的令牌桶，
+    并用已用权重响应头校准，418/429 时暂停该交易所的全部请求
+  - 报警判断复用 CryptoMonitorPro 的 evaluate_price_alert / evaluate_ma_strategy，
+    与 monitor_single_pair 的语义保持一致
+"""
+import asyncio
+import time
+import ccxt
+import ccxt.async_support as ccxt_async
+from typing import Dict, List, Optional
+
+from fetch_planner import plan_windows
+from metrics import FETCH_SECONDS, FETCH_ERRORS, FETCH_RETRIES, SWEEP_SECONDS
+
+
+class AsyncMonitorEngine:
+    """CryptoMonitorPro 的异步监控循环，数千个交易对只占用少量系统线程"""
+
+    def __init__(self, monitor, concurrency: Optional[int] = None):
+        self.monitor = monitor
+        self.concurrency = concurrency or monitor.config.get('async_concurrency', 20)
+        self.exchanges: Dict[str, ccxt_async.Exchange] = {}
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def log(self, message: str, category: str = 'log') -> None:
+        self.monitor.log(message, category)
+
+    def run(self) -> None:
+        """在当前线程中运行事件循环，直到 monitor.running 被清除"""
+        asyncio.run(self._main())
+
+    async def _get_exchange(self, exchange_id: str) -> ccxt_async.Exchange:
+        """创建异步交易所实例，优先复用同步实例已加载的市场数据"""
+        exchange = self.exchanges.get(exchange_id)
+        if exchange is not None:
+            return exchange
+        proxy = self.monitor.config.get('proxy')
+        exchange = getattr(ccxt_async, exchange_id)({
+            'enableRateLimit': False,  # 由 monitor.rate_limiters 统一限速（与线程调用方共用额度）
+            'headers': {
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)',
+                'Referer': 'https://www.htx.com/'
+            },
+            'aiohttp_proxy': proxy or None,
+        })
+        sync_exchange = self.monitor.exchanges.get(exchange_id)
+        if sync_exchange is not None and sync_exchange.markets:
+            exchange.set_markets(sync_exchange.markets, sync_exchange.currencies)
+        else:
+            await self.monitor.rate_limiters.get(exchange).acquire_async('load_markets')
+            await exchange.load_markets()
+        self.exchanges[exchange_id] = exchange
+        self.semaphores[exchange_id] = asyncio.Semaphore(self.concurrency)
+        return exchange
+
+    async def _close(self) -> None:
+        for exchange in self.exchanges.values():
+            try:
+                await exchange.close()
+            except Exception:
+                pass
+        self.exchanges.clear()
+
+    async def _fetch(self, exchange, symbol: str, timeframe: str, **kwargs) -> list:
+        """
+        与 _limited_call 相同：经共享令牌桶限速后 fetch_ohlcv，记录耗时与失败类型（metrics），
+        成功后用已用权重响应头校准，418/429 时暂停该交易所的全部请求后再抛出
+        """
+        limiter = self.monitor.rate_limiters.get(exchange)
+        await limiter.acquire_async('fetch_ohlcv')
+        start = time.perf_counter()
+        try:
+            result = await exchange.fetch_ohlcv(symbol, timeframe, **kwargs)
+        except (ccxt.DDoSProtection, ccxt.RateLimitExceeded) as e:  # 418 / 429
+            FETCH_ERRORS.inc(exchange.id, 'fetch_ohlcv', type(e).__name__)
+            pause = limiter.penalize(getattr(exchange, 'last_response_headers', None))
+            self.log(f"⚠️ {exchange.id} 触发限频，暂停请求 {pause:.0f} 秒", "warning")
+            raise
+        except Exception as e:
+            FETCH_ERRORS.inc(exchange.id, 'fetch_ohlcv', type(e).__name__)
+            raise
+        finally:
+            FETCH_SECONDS.observe(time.perf_counter() - start, exchange.id, 'fetch_ohlcv')
+        limiter.observe(getattr(exchange, 'last_response_headers', None))
+        return result
+
+    async def _fetch_delta(self, exchange, symbol: str, timeframe: str, limit: int) -> Optional[list]:
+        """与 safe_fetch_ohlcv 相同的增量策略：缓存足够时只拉取最后一根之后的K线"""
+        buffer = self.monitor.ohlcv_cache.get(exchange.id, symbol, timeframe)
+        if buffer is None:
+            buffer = await asyncio.to_thread(self.monitor.rehydrate_ohlcv, exchange, symbol, timeframe, limit)
+        if buffer is None or len(buffer) < limit:
+            return None
+        if time.time() - buffer.stream_updated < self.monitor.config.get('stream_stale_after', 30):
+            with buffer.lock:
+                return buffer.tail(limit)
+        timeframe_ms = exchange.parse_timeframe(timeframe) * 1000
+        with buffer.lock:
+            last_ts = buffer.last_timestamp
+        if last_ts is None:
+            return None
+        missing = int((exchange.milliseconds() - last_ts) // timeframe_ms) + 2
+        if missing > buffer.capacity:
+            return None
+        data = await self._fetch(exchange, symbol, timeframe, since=last_ts, limit=missing)
+        if not data or data[0][0] > last_ts + timeframe_ms:
+            return None
+        with buffer.lock:
+            if buffer.last_timestamp != last_ts:
+                return None  # 期间已被其他请求更新，直接全量拉取更稳妥
+            buffer.extend(data)
+            window = buffer.tail(limit)
+        self.monitor.persist_ohlcv(exchange.id, symbol, timeframe, data)
+        return window
+
+    async def fetch_ohlcv(self, exchange, symbol: str, timeframe: str, limit: int) -> Optional[list]:
+        """异步版 safe_fetch_ohlcv：增量/全量获取K线，成功后写入价格数据"""
+        for attempt in range(3):
+            try:
+                data = await self._fetch_delta(exchange, symbol, timeframe, limit)
+                if data is None:
+                    data = await self._fetch(exchange, symbol, timeframe, limit=limit)
+                    if not data or len(data) < limit:
+                        self.log(f"⚠️ {symbol} 数据不足，需要 {limit} 条，实际获取 {len(data) if data else 0} 条", "warning")
+                        continue
+                    if not all(isinstance(i, list) and len(i) > 4 for i in data):
+                        self.log(f"⚠️ {symbol} 返回数据异常: {data}", "warning")
+                        return None
+                    self.monitor.ohlcv_cache.seed(exchange.id, symbol, timeframe, data)
+                    self.monitor.persist_ohlcv(exchange.id, symbol, timeframe, data)
+                if data[-1][4] is None:
+                    self.log(f"⚠️ {symbol} 最新K线收盘价为 None: {data[-1]}", "warning")
+                    return None
+                self.monitor._record_price(symbol, float(data[-1][4]))
+                return data
+            except ccxt.NetworkError as e:
+                FETCH_RETRIES.inc(exchange.id, type(e).__name__)
+                self.log(f"网络错误: {str(e)} - {symbol}", 'warning')
+                await asyncio.sleep(10)
+            except ccxt.ExchangeError as e:
+                FETCH_RETRIES.inc(exchange.id, type(e).__name__)
+                self.log(f"交易所错误: {str(e)} - {symbol}", 'warning')
+            except Exception as e:
+                FETCH_RETRIES.inc(exchange.id, type(e).__name__)
+                self.log(f"第 {attempt+1} 次获取 {symbol} 数据失败: {str(e)}", "warning")
+                await asyncio.sleep(2)
+        self.log(f"❌ {symbol} 数据获取彻底失败", "warning")
+        return None
+
+    def _evaluate_pair(self, exchange_id: str, symbol: str, candles: Dict[str, list],
+                       config: dict, check_price: bool, alert_counts: dict) -> None:
+        """在线程池中执行报警判断与发送（send_alert 内部为同步网络请求）"""
+        monitor = self.monitor
+        if check_price and config.get('enable_price_monitor', False):
+            price_period = config.get('price_period', 15)
+            data = candles.get(config.get('price_timeframe', "1m"))
+            monitor.evaluate_price_alert(exchange_id, symbol, data[-price_period:] if data else data, config)
+
+        if config.get('ma_engine', 'series') == 'vectorized':
+            return  # 由 _sweep_exchange 在全部交易对获取完成后统一判断
+        for strategy in config.get('ma_strategies', []):
+            periods = strategy.get('periods')
+            required_length = max(periods) + 10
+            timeframe = strategy.get('timeframe')
+            data = candles.get(timeframe)
+            if not data or len(data) < required_length:
+                continue
+            for alert_type, msg in monitor.evaluate_ma_strategy(symbol, data[-required_length:], periods,
+                                                                (exchange_id, symbol, timeframe)):
+                monitor.send_alert(exchange_id, symbol, msg, alert_type)
+                alert_counts[alert_type] = alert_counts.get(alert_type, 0) + 1
+
+    async def _monitor_pair(self, exchange_id: str, symbol: str, windows: Dict[str, int],
+                            config: dict, check_price: bool, alert_counts: dict) -> None:
+        if not self.monitor.running.is_set():
+            return
+        exchange = self.exchanges[exchange_id]
+        candles: Dict[str, list] = {}
+        async with self.semaphores[exchange_id]:
+            for timeframe, limit in windows.items():
+                candles[timeframe] = await self.fetch_ohlcv(exchange, symbol, timeframe, limit)
+        try:
+            await asyncio.to_thread(self._evaluate_pair, exchange_id, symbol, candles,
+                                    config, check_price, alert_counts)
+        except Exception as e:
+            self.log(f"⚠️ {symbol} 监控异常: {str(e)}", "warning")
+
+    async def _sweep_exchange(self, exchange_id: str, config: dict, alert_counts: dict) -> None:
+        monitor = self.monitor
+        await self._get_exchange(exchange_id)
+        monitored_pairs: List[str] = await asyncio.to_thread(monitor.get_monitored_pairs, exchange_id)
+
+        bulk_price = (config.get('price_monitor_mode', 'ohlcv') == 'ticker' and
+                      await asyncio.to_thread(monitor.check_price_alerts_bulk,
+                                              monitor.exchanges[exchange_id], monitored_pairs, config))
+        check_price = not bulk_price
+        windows = plan_windows(config, include_price=check_price and config.get('enable_price_monitor', False))
+        self.log(f"⚡ {exchange_id} 异步监控 {len(monitored_pairs)} 个交易对，并发上限 {self.concurrency}", "log")
+        sweep_started = time.time()
+        await asyncio.gather(*(self._monitor_pair(exchange_id, symbol, windows, config, check_price, alert_counts)
+                               for symbol in monitored_pairs))
+
+        if config.get('ma_engine', 'series') == 'vectorized':
+            alerts = await asyncio.to_thread(monitor.check_ma_alerts_vectorized, exchange_id, monitored_pairs, sweep_started)
+            for symbol, alert_type, msg in alerts:
+                await asyncio.to_thread(monitor.send_alert, exchange_id, symbol, msg, alert_type)
+                alert_counts[alert_type] = alert_counts.get(alert_type, 0) + 1
+
+    async def _main(self) -> None:
+        monitor = self.monitor
+        monitor.log("异步监控循环启动", 'log')
+        await asyncio.to_thread(monitor.init_complete.wait)
+        try:
+            while monitor.running.is_set():
+                with monitor.data_lock:
+                    current_config = monitor.config.copy()
+                try:
+                    monitor.history.stats = {"bullish_signals": 0, "bearish_signals": 0}
+                    alert_counts = {'bullish': 0, 'bearish': 0}
+                    if current_config.get('enable_streaming', False):
+                        await asyncio.to_thread(monitor.start_streaming)
+                    connected = [ex_id for ex_id in list(monitor.exchanges)
+                                 if monitor.exchange_status.get(ex_id) == 'connected']
+                    sweep_started = time.perf_counter()
+                    results = await asyncio.gather(
+                        *(self._sweep_exchange(ex_id, current_config, alert_counts) for ex_id in connected),
+                        return_exceptions=True)
+                    SWEEP_SECONDS.observe(time.perf_counter() - sweep_started, 'async')
+                    for ex_id, result in zip(connected, results):
+                        if isinstance(result, Exception):
+                            self.log(f"⚠️ {ex_id} 异步监控异常: {str(result)}", 'warning')
+                    await asyncio.to_thread(monitor.send_sweep_summary, alert_counts)
+                    monitor.profile_sweep_done()
+                    await self._sleep(current_config.get('check_interval', 300))
+                except Exception as e:
+                    self.log(f"⚠️ 异步监控循环异常: {str(e)}", 'warning')
+                    await self._sleep(30)
+        finally:
+            await self._close()
+
+    async def _sleep(self, seconds: float) -> None:
+        """分段休眠，停止监控后尽快退出"""
+        remaining = seconds
+        while remaining > 0 and self.monitor.running.is_set():
+            await asyncio.sleep(min(1, remaining))
+            remaining -= 1
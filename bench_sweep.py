@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+监控循环压测（离线，使用 fake_ccxt_exchange.FakeExchange）：
+  python bench_sweep.py                                  默认 100 / 1000 / 5000 个交易对 x 3 个交易所
+  python bench_sweep.py --pairs 1000 --latency 0.02 --error-rate 0.01 --sweeps 3
+  python bench_sweep.py --set ma_engine=\"vectorized\" --set incremental_indicators=true --json result.json
+
+每个场景在独立进程中运行（峰值内存互不影响），每轮调用 CryptoMonitorPro.run_sweep，报告：
+  耗时、交易对/秒、每轮请求数（含被限频与失败的请求）、CPU 时间、峰值 RSS
+第 1 轮为冷启动（全量拉取K线），之后各轮走K线缓存增量补齐。
+"""
+import argparse
+import copy
+import json
+import subprocess
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb() -> float:
+    if resource is None:
+        return float('nan')
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == 'darwin' else rss / 1024  # macOS 为字节，Linux 为 KB
+
+
+def run_scenario(args, pair_count: int) -> dict:
+    """在当前进程中运行一个场景（每个交易所 pair_count 个交易对），返回各轮结果"""
+    from fake_ccxt_exchange import FakeExchange
+    from monitor_core import CryptoMonitorPro, DEFAULT_CONFIG
+
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    config.update({'exchanges': [], 'market_cache_dir': '', 'max_pairs': pair_count,
+                   'enable_bullish_ma': True, 'enable_bearish_ma': True})
+    for item in args.set:
+        key, _, value = item.partition('=')
+        config[key] = json.loads(value)
+
+    monitor = CryptoMonitorPro(config, lambda message, category='log': None)
+    monitor.init_complete.wait()
+    exchanges = []
+    for i in range(args.exchanges):
+        exchange = FakeExchange(f"fake{i}", pairs=pair_count, latency=args.latency, jitter=args.jitter,
+                                server_rps=args.server_rps, error_rate=args.error_rate, seed=i)
+        exchange.load_markets()
+        monitor.exchanges[exchange.id] = exchange
+        monitor.exchange_status[exchange.id] = 'connected'
+        exchanges.append(exchange)
+
+    sweeps = []
+    for n in range(args.sweeps):
+        for exchange in exchanges:
+            exchange.reset_stats()
+        with monitor.data_lock:
+            current_config = monitor.config.copy()
+        wall, cpu = time.perf_counter(), time.process_time()
+        monitor.fetch_planner.begin_sweep(current_config, monitor.single_pair_strategies)
+        alert_counts = monitor.run_sweep(current_config)
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        pairs = pair_count * args.exchanges
+        sweeps.append({
+            'sweep': n + 1,
+            'wall_s': round(wall, 3),
+            'pairs_per_s': round(pairs / wall, 1) if wall else 0,
+            'requests': sum(e.stats['requests'] for e in exchanges),
+            'rate_limited': sum(e.stats['rate_limited'] for e in exchanges),
+            'errors': sum(e.stats['errors'] for e in exchanges),
+            'cpu_s': round(cpu, 3),
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+            'alerts': sum(alert_counts.values()),
+        })
+        if n + 1 < args.sweeps and args.pause:
+            time.sleep(args.pause)
+    monitor.shutdown()
+    return {'pairs': pair_count, 'exchanges': args.exchanges, 'sweeps': sweeps}
+
+
+HEADER = (f"{'交易对':>8} {'轮次':>4} {'耗时(s)':>9} {'交易对/s':>10} {'请求数':>8} {'限频':>6} {'失败':>6} "
+          f"{'CPU(s)':>8} {'峰值RSS(MB)':>12}")
+
+
+def print_rows(result) -> None:
+    for s in result['sweeps']:
+        print(f"{result['pairs'] * result['exchanges']:>8} {s['sweep']:>4} {s['wall_s']:>9.2f} {s['pairs_per_s']:>10.1f} "
+              f"{s['requests']:>8} {s['rate_limited']:>6} {s['errors']:>6} {s['cpu_s']:>8.2f} {s['peak_rss_mb']:>12.1f}",
+              flush=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='监控循环离线压测')
+    parser.add_argument('--pairs', type=int, nargs='+', default=[100, 1000, 5000], help='每个交易所的交易对数量（可多个场景）')
+    parser.add_argument('--exchanges', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.02, help='模拟网络延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.005)
+    parser.add_argument('--server-rps', type=float, default=0, help='模拟服务端限频（每秒请求数，0 为不限）')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--sweeps', type=int, default=2)
+    parser.add_argument('--pause', type=float, default=0, help='两轮之间等待的秒数（让新K线产生）')
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=JSON', help='覆盖监控配置，例如 ma_engine="vectorized"')
+    parser.add_argument('--json', help='把结果写入 JSON 文件')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_scenario(args, args.pairs[0])))
+        return 0
+
+    results = []
+    print(HEADER)
+    for pairs in args.pairs:
+        # 每个场景使用新进程，峰值 RSS 与模块缓存互不影响
+        child_args = _without_pairs(argv if argv is not None else sys.argv[1:])
+        cmd = [sys.executable, __file__, '--child', '--pairs', str(pairs)] + child_args
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"场景 {pairs} 个交易对失败:\n{proc.stderr}")
+            return 1
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        print_rows(results[-1])
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+def _without_pairs(argv):
+    """去掉父进程的 --pairs 参数（子进程每次只跑一个场景）"""
+    out, skip = [], False
+    for arg in argv:
+        if arg == '--pairs':
+            skip = True
+            continue
+        if skip and not arg.startswith('--'):
+            continue
+        skip = False
+        if arg.startswith('--pairs='):
+            continue
+        out.append(arg)
+    return out
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,484 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+行情响应的记录与回放（config['capture_path']）：
+  - 记录：包装交易所对象（load_markets / set_markets / fetch_ohlcv / fetch_tickers）与股票数据函数
+    （akshare 分钟K线、腾讯实时报价），每个响应追加一行紧凑 JSON 到 gzip 日志，附带响应时间；
+    每轮轮询开始时写入 sweep 标记
+  - 回放：ReplayLog 读入日志，ReplayExchange 按虚拟时钟返回当时已记录的数据，结果只由日志决定；
+    replay_monitor 按记录的轮次逐轮调用 CryptoMonitorPro.run_sweep，不等待真实时间
+日志格式（每行一条）：{"t": 时间戳, "s": 来源, "m": 方法, "a": 参数, "r": 结果} 或 {"e": [异常类名, 信息]}
+"""
+import atexit
+import bisect
+import gzip
+import json
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Tuple
+
+import ccxt
+
+_writers: Dict[str, 'CaptureWriter'] = {}
+_writers_lock = Lock()
+
+
+def open_writer(path: str) -> 'CaptureWriter':
+    """同一路径在进程内共用一个 CaptureWriter（加密货币与股票监控可以写入同一份日志）"""
+    with _writers_lock:
+        writer = _writers.get(path)
+        if writer is None or writer.closed:
+            writer = _writers[path] = CaptureWriter(path)
+        return writer
+
+
+@atexit.register
+def close_writers() -> None:
+    with _writers_lock:
+        for writer in _writers.values():
+            writer.close()
+        _writers.clear()
+
+
+def frame_to_json(df) -> Optional[dict]:
+    if df is None:
+        return None
+    return {'columns': list(df.columns), 'data': df.values.tolist()}
+
+
+def frame_from_json(payload: Optional[dict]):
+    if payload is None:
+        return None
+    import pandas as pd
+    return pd.DataFrame(payload['data'], columns=payload['columns'])
+
+
+class CaptureWriter:
+    """
+    path: 日志文件（gzip，追加写入；每次打开是一个新的 gzip 成员，可直接拼接读取）
+    flush_every: 累计多少条后刷新到磁盘（进程被强制结束时最多丢失这么多条）
+    """
+
+    def __init__(self, path: str, flush_every: int = 256):
+        self.path = path
+        self.file = gzip.open(path, 'at', encoding='utf-8', compresslevel=6)
+        self.flush_every = flush_every
+        self.pending = 0
+        self.count = 0
+        self.closed = False
+        self.lock = Lock()
+
+    def write(self, source: str, method: str, args, result=None, error: Optional[BaseException] = None) -> None:
+        entry = {'t': round(time.time(), 3), 's': source, 'm': method, 'a': args}
+        if error is not None:
+            entry['e'] = [type(error).__name__, str(error)]
+        else:
+            entry['r'] = result
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':'), default=str)
+        with self.lock:
+            if self.closed:
+                return
+            self.file.write(line + '\n')
+            self.count += 1
+            self.pending += 1
+            if self.pending >= self.flush_every:
+                self.file.flush()
+                self.pending = 0
+
+    def mark(self, name: str = 'sweep') -> None:
+        """写入轮次标记，回放时按标记划分每一轮"""
+        self.write('monitor', name, None)
+
+    def wrap(self, source: str, method: str, fn: Callable, encode: Optional[Callable] = None) -> Callable:
+        """包装一个数据获取函数：调用后记录位置参数与返回值（encode 把返回值转换成可 JSON 化的对象）"""
+        def recorded(*args, **kwargs):
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                self.write(source, method, [list(args), kwargs], error=e)
+                raise
+            self.write(source, method, [list(args), kwargs], encode(result) if encode else result)
+            return result
+        recorded.__wrapped__ = fn
+        return recorded
+
+    def wrap_exchange(self, exchange) -> 'RecordingExchange':
+        return RecordingExchange(exchange, self)
+
+    def flush(self) -> None:
+        with self.lock:
+            if not self.closed:
+                self.file.flush()
+                self.pending = 0
+
+    def close(self) -> None:
+        with self.lock:
+            if not self.closed:
+                self.closed = True
+                self.file.close()
+
+
+class RecordingExchange:
+    """ccxt 交易所代理：记录行情方法的响应，其余属性与方法直接转发"""
+
+    def __init__(self, exchange, writer: CaptureWriter):
+        self._exchange = exchange
+        self._writer = writer
+        writer.write(exchange.id, 'open', None, {'rateLimit': getattr(exchange, 'rateLimit', None)})
+
+    def __getattr__(self, name):
+        return getattr(self._exchange, name)
+
+    def _call(self, method: str, args: list, call: Callable):
+        try:
+            result = call()
+        except Exception as e:
+            self._writer.write(self._exchange.id, method, args, error=e)
+            raise
+        return result
+
+    def load_markets(self, reload: bool = False, params: Optional[dict] = None):
+        markets = self._call('load_markets', [], lambda: self._exchange.load_markets(reload, params or {}))
+        self._writer.write(self._exchange.id, 'load_markets', [],
+                           {'markets': markets, 'currencies': getattr(self._exchange, 'currencies', None)})
+        return markets
+
+    def set_markets(self, markets, currencies=None):
+        result = self._exchange.set_markets(markets, currencies)
+        self._writer.write(self._exchange.id, 'load_markets', [], {'markets': markets, 'currencies': currencies})
+        return result
+
+    def fetch_ohlcv(self, symbol: str, timeframe: str = '1m', since: Optional[int] = None,
+                    limit: Optional[int] = None, params: Optional[dict] = None):
+        args = [symbol, timeframe, since, limit]
+        data = self._call('fetch_ohlcv', args,
+                          lambda: self._exchange.fetch_ohlcv(symbol, timeframe, since, limit, params or {}))
+        self._writer.write(self._exchange.id, 'fetch_ohlcv', args, data)
+        return data
+
+    def fetch_tickers(self, symbols: Optional[List[str]] = None, params: Optional[dict] = None):
+        args = [symbols]
+        tickers = self._call('fetch_tickers', args, lambda: self._exchange.fetch_tickers(symbols, params or {}))
+        self._writer.write(self._exchange.id, 'fetch_tickers', args,
+                           {s: {'last': t.get('last'), 'timestamp': t.get('timestamp')} for s, t in tickers.items()})
+        return tickers
+
+
+# ======================== 回放 ========================
+class VirtualClock:
+    """
+    回放用的时钟：time() 返回当前轮次的虚拟时间，sleep() 立即返回；其余属性转发到 time 模块。
+    horizon 为本轮结束时间（下一轮开始），本轮中记录的响应都可以返回
+    """
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+        self.horizon = start
+
+    def set(self, now: float, horizon: Optional[float] = None) -> None:
+        self.now = now
+        self.horizon = now if horizon is None else max(horizon, now)
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        pass
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+    @contextmanager
+    def installed(self, *modules):
+        """在 with 块内用本时钟替换各模块的 time 引用"""
+        saved = [(module, module.time) for module in modules]
+        for module in modules:
+            module.time = self
+        try:
+            yield self
+        finally:
+            for module, original in saved:
+                module.time = original
+
+
+def clock_modules() -> tuple:
+    """监控循环与K线缓存、增量指标共用时间（例如向量化均线比较缓存更新时间），回放时一起换成虚拟时钟"""
+    import indicators
+    import monitor_core
+    import ohlcv_cache
+    return monitor_core, ohlcv_cache, indicators
+
+
+class _Series:
+    """同一 (来源, 方法, 参数) 按时间排序的记录"""
+
+    def __init__(self):
+        self.times: List[float] = []
+        self.entries: List[dict] = []
+
+    def add(self, entry: dict) -> None:
+        self.times.append(entry['t'])
+        self.entries.append(entry)
+
+    def latest(self, horizon: float) -> Optional[dict]:
+        """horizon 之前最后一次成功的响应；还没有时返回第一条（启动时的响应可能晚于第一个标记）"""
+        i = bisect.bisect_right(self.times, horizon)
+        for entry in reversed(self.entries[:i]):
+            if 'e' not in entry:
+                return entry
+        return next((e for e in self.entries if 'e' not in e), None)
+
+
+class _CandleTimeline:
+    """
+    同一 (交易所, 交易对, 周期) 的全部K线响应按时间合并：
+    回放时依次应用 horizon 之前的响应（后到的同一时间戳K线覆盖之前的未收盘K线），再按 since / limit 截取
+    """
+
+    def __init__(self):
+        self.times: List[float] = []
+        self.responses: List[list] = []
+        self.errors: List[Tuple[float, list]] = []
+        self.rewind()
+
+    def rewind(self) -> None:
+        self.applied = 0
+        self.candles: Dict[int, list] = {}
+        self.sorted: List[list] = []
+        self.stamps: List[int] = []
+        self.error_index = 0
+
+    def add(self, entry: dict) -> None:
+        if 'e' in entry:
+            self.errors.append((entry['t'], entry['e']))
+        elif entry.get('r'):
+            self.times.append(entry['t'])
+            self.responses.append(entry['r'])
+
+    def pop_error(self, horizon: float) -> Optional[list]:
+        """horizon 之前尚未回放的错误，每条只抛出一次（与记录时的重试次数一致）"""
+        if self.error_index < len(self.errors) and self.errors[self.error_index][0] <= horizon:
+            self.error_index += 1
+            return self.errors[self.error_index - 1][1]
+        return None
+
+    def view(self, horizon: float) -> List[list]:
+        end = bisect.bisect_right(self.times, horizon)
+        if end == 0 and self.times:
+            end = 1  # 启动时的首次拉取可能晚于第一个标记
+        if end < self.applied:
+            self.applied, self.candles = 0, {}  # 时钟回退，重新合并
+        if end > self.applied:
+            for response in self.responses[self.applied:end]:
+                for candle in response:
+                    self.candles[candle[0]] = candle
+            self.applied = end
+            self.sorted = [self.candles[ts] for ts in sorted(self.candles)]
+            self.stamps = [c[0] for c in self.sorted]
+        return self.sorted
+
+    def query(self, horizon: float, since: Optional[int], limit: Optional[int]) -> List[list]:
+        candles = self.view(horizon)
+        if since is not None:
+            start = bisect.bisect_left(self.stamps, since)
+            return [list(c) for c in candles[start:start + limit if limit else None]]
+        return [list(c) for c in (candles[-limit:] if limit else candles)]
+
+
+class ReplayLog:
+    """读入 CaptureWriter 写出的日志（可以是多个文件），按来源与方法建立索引"""
+
+    def __init__(self, *paths: str):
+        self.series: Dict[Tuple[str, str, str], _Series] = {}
+        self.timelines: Dict[Tuple[str, str, str], _CandleTimeline] = {}
+        self.exchanges: Dict[str, dict] = {}
+        self.sweeps: List[float] = []
+        self.calls: Dict[Tuple[str, str], List[Tuple[float, list]]] = {}
+        self.start = self.end = None
+        self.count = 0
+        entries = []
+        for path in paths:
+            entries.extend(self._read(path))
+        entries.sort(key=lambda e: e['t'])  # 稳定排序，同一时间保持写入顺序
+        for entry in entries:
+            self._index(entry)
+
+    @staticmethod
+    def _read(path: str) -> List[dict]:
+        entries = []
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entries.append(json.loads(line))
+        except (EOFError, json.JSONDecodeError):
+            pass  # 记录进程被强制结束，末尾不完整，保留已读到的部分
+        return entries
+
+    def _index(self, entry: dict) -> None:
+        self.count += 1
+        t, source, method = entry['t'], entry['s'], entry['m']
+        self.start = t if self.start is None else self.start
+        self.end = t
+        if source == 'monitor':
+            if method == 'sweep':
+                self.sweeps.append(t)
+            return
+        if method == 'open':
+            self.exchanges.setdefault(source, entry['r'] or {})
+        elif method == 'fetch_ohlcv':
+            symbol, timeframe = entry['a'][:2]
+            self.timelines.setdefault((source, symbol, timeframe), _CandleTimeline()).add(entry)
+        else:
+            key = (source, method, json.dumps(entry['a'], sort_keys=True))
+            self.series.setdefault(key, _Series()).add(entry)
+            self.calls.setdefault((source, method), []).append((t, entry['a']))
+
+    def rewind(self) -> None:
+        """回到日志开头（同一份日志多次回放，例如比较不同引擎）"""
+        for timeline in self.timelines.values():
+            timeline.rewind()
+
+    def sweep_windows(self, interval: float = 300) -> List[Tuple[float, float]]:
+        """每一轮的 (开始, 结束) 时间；日志中没有轮次标记时按 interval 均分"""
+        if self.start is None:
+            return []
+        starts = list(self.sweeps)
+        if not starts:
+            starts = [self.start + i * interval for i in range(int((self.end - self.start) // interval) + 1)]
+        return [(t, starts[i + 1] if i + 1 < len(starts) else self.end) for i, t in enumerate(starts)]
+
+    def response(self, source: str, method: str, args, horizon: float):
+        series = self.series.get((source, method, json.dumps(args, sort_keys=True)))
+        entry = series.latest(horizon) if series else None
+        if entry is None:
+            raise KeyError(f"日志中没有 {source}.{method}{args} 的记录")
+        return entry['r']
+
+    def exchange(self, exchange_id: str, clock: VirtualClock) -> 'ReplayExchange':
+        return ReplayExchange(exchange_id, self, clock)
+
+    def wrap(self, source: str, method: str, clock: VirtualClock, decode: Optional[Callable] = None) -> Callable:
+        """与 CaptureWriter.wrap 对应：返回按参数查找记录的函数，没有记录时返回 None（与接口失败时一致）"""
+        def replayed(*args, **kwargs):
+            try:
+                result = self.response(source, method, [list(args), kwargs], clock.horizon)
+            except KeyError:
+                return None
+            return decode(result) if decode else result
+        return replayed
+
+
+def _raise_recorded(error: list):
+    name, message = error
+    exc_class = getattr(ccxt, name, None)
+    if not (isinstance(exc_class, type) and issubclass(exc_class, Exception)):
+        exc_class = ccxt.NetworkError
+    raise exc_class(message)
+
+
+class ReplayExchange:
+    """按虚拟时钟返回记录数据的交易所对象，提供 CryptoMonitorPro 用到的 ccxt 接口"""
+
+    def __init__(self, exchange_id: str, log: ReplayLog, clock: VirtualClock):
+        self.id = exchange_id
+        self.log = log
+        self.clock = clock
+        self.rateLimit = log.exchanges.get(exchange_id, {}).get('rateLimit') or 50
+        self.last_response_headers: Dict[str, str] = {}
+        self.markets: Dict[str, dict] = {}
+        self.currencies: Dict[str, dict] = {}
+        self.requests = 0
+
+    def load_markets(self, reload: bool = False, params: Optional[dict] = None) -> Dict[str, dict]:
+        if not self.markets or reload:
+            self.requests += 1
+            result = self.log.response(self.id, 'load_markets', [], self.clock.horizon)
+            self.set_markets(result['markets'], result.get('currencies'))
+        return self.markets
+
+    def set_markets(self, markets, currencies=None) -> Dict[str, dict]:
+        self.markets = dict(markets)
+        self.currencies = dict(currencies or {})
+        return self.markets
+
+    @staticmethod
+    def parse_timeframe(timeframe: str) -> int:
+        return ccxt.Exchange.parse_timeframe(timeframe)
+
+    def milliseconds(self) -> int:
+        return int(self.clock.now * 1000)
+
+    def fetch_ohlcv(self, symbol: str, timeframe: str = '1m', since: Optional[int] = None,
+                    limit: Optional[int] = None, params: Optional[dict] = None) -> List[list]:
+        self.requests += 1
+        timeline = self.log.timelines.get((self.id, symbol, timeframe))
+        if timeline is None:
+            raise ccxt.BadSymbol(f"{self.id} {symbol} {timeframe} 没有记录的K线")
+        error = timeline.pop_error(self.clock.horizon)
+        if error:
+            _raise_recorded(error)
+        return timeline.query(self.clock.horizon, since, limit)
+
+    def fetch_tickers(self, symbols: Optional[List[str]] = None, params: Optional[dict] = None) -> Dict[str, dict]:
+        self.requests += 1
+        tickers = self.log.response(self.id, 'fetch_tickers', [symbols], self.clock.horizon)
+        return {s: dict(t, symbol=s) for s, t in tickers.items()}
+
+
+REPLAY_OVERRIDES = {
+    'exchanges': [],  # 交易所由回放日志提供
+    'enable_tg': False,
+    'enable_wechat': False,
+    'enable_streaming': False,
+    'history_db': '',
+    'ohlcv_store_dir': '',
+    'market_cache_dir': '',
+    'capture_path': '',
+    'metrics_port': 0,  # 不占用在线监控的指标端口
+    'sweep_mode': 'fixed',
+    'rate_limit_utilization': 1e6,  # 不按真实限额等待
+}
+
+
+def replay_monitor(log: ReplayLog, config: dict, log_callback: Optional[Callable] = None, speed: float = 0,
+                   on_sweep: Optional[Callable] = None):
+    """
+    用记录的日志重新运行监控（固定轮询模式），返回 CryptoMonitorPro 对象，警报在其 history 中。
+    每轮把虚拟时钟设为记录时该轮的开始时间；speed 为 0 时不等待，否则按 speed 倍速等待真实时间。
+    on_sweep(序号, 虚拟时间, 本轮警报计数) 在每轮结束后调用
+    """
+    from monitor_core import CryptoMonitorPro
+
+    config = dict(config, **REPLAY_OVERRIDES)
+    monitor = CryptoMonitorPro(config, log_callback)
+    monitor.init_complete.wait()
+    monitor.optimizer.running = False  # 内存清理按虚拟时间由下面的循环执行
+    clock = VirtualClock(log.start or 0)
+    mem_interval = config.get('mem_interval', 600)
+    last_cleanup = None
+    log.rewind()
+    with clock.installed(*clock_modules()):
+        for exchange_id in log.exchanges:
+            exchange = log.exchange(exchange_id, clock)
+            clock.set(log.start)
+            exchange.load_markets()
+            monitor.exchanges[exchange_id] = exchange
+            monitor.exchange_status[exchange_id] = 'connected'
+        previous = None
+        for index, (start, end) in enumerate(log.sweep_windows(config.get('check_interval', 300))):
+            if speed and previous is not None:
+                time.sleep((start - previous) / speed)
+            previous = start
+            clock.set(start, end)
+            if last_cleanup is None or start - last_cleanup >= mem_interval:
+                monitor.cleanup_data()
+                last_cleanup = start
+            with monitor.data_lock:
+                current_config = monitor.config.copy()
+            monitor.fetch_planner.begin_sweep(current_config, monitor.single_pair_strategies)
+            alert_counts = monitor.run_sweep(current_config)
+            if on_sweep:
+                on_sweep(index, start, alert_counts)
+    return monitor
@@ -1,38 +1,31 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-import ccxt
 import time
 import json
-import numpy as np
-import pandas as pd
-import tkinter as tk
-import requests
 import os
-import akshare as ak
+import copy
+import tkinter as tk
 import threading
-from datetime import datetime, timedelta
-from threading import Thread, Event, Lock
+from threading import Thread
 from tkinter import ttk, scrolledtext, messagebox
 from collections import deque
-from typing import Callable, Optional, Dict, List, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from stock_utils import fetch_all_stock_codes
-from threading import Event
-from typing import Any, Dict, List, Tuple
-import ctypes
+from typing import TYPE_CHECKING
+from indicators import IndicatorStore
+from http_pool import get_pool
+from monitor_core import (TelegramNotifier, EnterpriseWeChatNotifier, CryptoMonitorPro, DEFAULT_CONFIG,
+                          prevent_sleep, restore_sleep)
+from metrics import QUEUE_DEPTH
 import atexit
 
-try:
-    import talib
-    TA_LIB_AVAILABLE = True
-except ImportError:
-    TA_LIB_AVAILABLE = False
+if TYPE_CHECKING:
+    import pandas as pd
+
 #===========================================================
 def fetch_latest_stock_price(symbol):
     """从腾讯/新浪获取最新股票价格，防止 AkShare 数据延迟"""
     url = f"https://qt.gtimg.cn/q={symbol}"  # 腾讯行情接口
     try:
-        response = requests.get(url, timeout=5)
+        response = get_pool().get(url, timeout=5)
         response.encoding = "gbk"
         data = response.text.split("~")
         if len(data) > 10:
@@ -73,894 +66,41 @@ def fetch_stock_data(symbol, period="5min", count=200):
         except Exception as e:
             print(f"{symbol} 获取数据异常: {e}")
             return None
-# ======================== 警报历史记录 ========================
-class AlertHistory:
-    """用于记录并查询历史警报信息（线程安全）"""
-
-    def __init__(self, max_records: int = 1000, log_callback: Optional[Callable] = None):
-        self.records: deque = deque(maxlen=max_records)
-        self.lock = Lock()
-        self.stats = {
-            "bullish_signals": 0,  # 多头信号数
-            "bearish_signals": 0   # 空头信号数
-        }
-        self.log_callback = log_callback  # 新增日志回调
-
-    def add_record(self, record: dict) -> None:
-        """添加一条警报记录"""
-        record['timeframe'] = self.config.get("price_timeframe", "5m")  # 获取最新时间参数
-        with self.lock:
-            self.records.append(record)
-            self.log(f"📜 记录新历史: {record}", "log")
-            if self.log_callback:  # 通过回调记录日志
-                self.log_callback(f"⚠️ 记录警报: {record}", "log")
-            if record['type'] == 'bullish':
-                self.stats["bullish_signals"] += 1
-            elif record['type'] == 'bearish':
-                self.stats["bearish_signals"] += 1
-    
-    def get_stats(self) -> Dict[str, int]:
-        """获取当前的监控统计信息"""
-        with self.lock:
-            return self.stats.copy()
-
-    def get_records(self, start_time: datetime = None,
-                    end_time: datetime = None,
-                    alert_type: str = None) -> List[dict]:
-        """按条件筛选历史记录"""
-        with self.lock:
-            filtered = []
-            for r in self.records:
-                timestamp = datetime.strptime(r['timestamp'], '%Y-%m-%d %H:%M:%S')
-                if start_time and timestamp < start_time:
-                    continue
-                if end_time and timestamp > end_time:
-                    continue
-                if alert_type and r['type'] != alert_type:
-                    continue
-                filtered.append(r)
-            return filtered
-
-
-# ======================== Telegram通知 ========================
-class TelegramNotifier:
-    """用于发送Telegram通知"""
-
-    def __init__(self, token: str, chat_ids: list):
-        self.base_url = f"https://api.telegram.org/bot{token}/sendMessage"
-        # chat_ids 现在可以是一个包含多个聊天ID的列表
-        self.chat_ids = chat_ids if isinstance(chat_ids, list) else [chat_ids]
-        self.enabled = False
-
-    def test_connection(self) -> bool:
-        """测试连接，发送测试消息"""
-        try:
-            return self._send_telegram_message({'text': '📡 监控系统连接测试成功'})
-        except Exception:
-            return False
-
-    def send_message(self, message: str) -> bool:
-        """发送消息到Telegram"""
-        if not self.webhook_url:  # 检查配置有效性
-            return False
-        if not self.enabled:
-            return False
-        return self._send_telegram_message({'text': message})
-
-    def _send_telegram_message(self, params: dict) -> bool:
-        """内部方法，尝试多次发送消息"""
-        params.update({
-            'parse_mode': 'Markdown'
-        })
-        for chat_id in self.chat_ids:
-            params['chat_id'] = chat_id
-            for _ in range(3):
-                try:
-                    response = requests.post(self.base_url, params=params, timeout=5)
-                    response.raise_for_status()
-                    break  # 如果消息发送成功，停止重试
-                except Exception:
-                    time.sleep(2)
-            else:
-                # 如果尝试了3次都失败，返回False
-                return False
-        return True
-# ======================== 企业微信通知 ========================
-class EnterpriseWeChatNotifier:
-    def __init__(self, webhook_url: str):
-        self.webhook_url = webhook_url
-        self.enabled = False
-
-    def test_connection(self) -> bool:
-        """发送测试消息，检查 webhook 是否可用"""
-        return self.send_message("【测试】企业微信提醒连接测试成功")
-
-    def send_message(self, message: str) -> bool:
-        payload = {
-            "msgtype": "text",
-            "text": {
-                "content": message
-            }
-        }
-        try:
-            response = requests.post(self.webhook_url, json=payload, timeout=5)
-            response.raise_for_status()
-            # 根据企业微信返回信息判断是否成功
-            result = response.json()
-            if result.get("errcode") == 0:
-                return True
-        except Exception as e:
-            print("企业微信发送异常:", e)
-        return False
 
+_stock_sources = (fetch_latest_stock_price, fetch_stock_data)
 
-# ======================== 内存清理线程 ========================
-class MemoryOptimizer(Thread):
-    """定期清理缓存与历史数据，避免内存过高"""
 
-    def __init__(self, monitor, interval: int = 600):
-        super().__init__(daemon=True)
-        self.monitor = monitor
-        self.running = True
-        self.interval = interval
+def install_stock_capture(writer):
+    """记录模式：akshare 分钟K线与腾讯实时报价的响应写入行情日志（capture.CaptureWriter）"""
+    global fetch_latest_stock_price, fetch_stock_data
+    from capture import frame_to_json
+    fetch_latest_stock_price = writer.wrap('tencent', 'quote', _stock_sources[0])
+    fetch_stock_data = writer.wrap('akshare', 'stock_zh_a_minute', _stock_sources[1], encode=frame_to_json)
 
-    def run(self) -> None:
-        while self.running:
-            self.monitor.cleanup_data()
-            time.sleep(self.interval)
-    
-    def stop(self):
-        self.running = False
-
-# 全局辅助函数
-def clean_symbol(symbol):
-    # 如果 symbol 中出现多次 USDT，则保留第一次出现前的部分+"/USDT"
-    if symbol.count("USDT") > 1:
-        base = symbol.split("/")[0]
-        return f"{base}/USDT"
-    return symbol
-# ======================== 监控核心类 ========================
-class CryptoMonitorPro:
-    """
-    核心监控类：
-      - 初始化交易所连接
-      - 定时获取K线数据、价格数据
-      - 分析价格变化及均线策略（支持多组均线策略）
-      - 发送警报（包含Telegram通知与日志记录）
-    """
-
-    def __init__(self, config: Dict, log_callback: Optional[Callable] = None):
-        self.config = config
-        self.log_callback = log_callback
-        self.running = Event()  # 这里用 Event 对象替代布尔值
-        self.running.set()       # 设置为运行状态
-        self.init_complete = Event()
-        # 初始配置数据
-        self.price_data: Dict[str, dict] = {}
-        self.base_prices: Dict[str, float] = {}  # 新增：记录每个交易对的基准价格
-        self.single_pair_strategies = {}  # 用于存储单对监控配置，key 为交易对代码
-        self.exchanges: Dict[str, ccxt.Exchange] = {}
-        self.exchange_status: Dict[str, str] = {}
-        self.last_leaderboard_log_time = 0 
-        # 定义冷却时间，单位为秒（例如 300 秒即 5 分钟）
-        self.alert_cooldown = self.config.get("alert_cooldown", 6000)
-        self.last_alert_time: Dict[Tuple[str, str], float] = {}  # 存储每个 (symbol, alert_type) 的上次提醒时间
 
-        
-
-
-        # 数据缓存与统计
-        self.market_cache: Dict[str, dict] = {}
-        self.ma_data: Dict[str, dict] = {}
-        self.usdt_pairs_cache: Dict[str, List[str]] = {}
-        self.data_lock = Lock()
-        self.stats_lock = Lock()
-        self.connection_stats = {
-            'total_pairs': 0,
-            'success_pairs': 0,
-            'last_update': None
-        }
-        # 修改历史记录初始化
-        self.history = AlertHistory(log_callback=log_callback)  # 传递日志回调
-
-        # 通知类（Telegram）
-        self.notifier = TelegramNotifier(config['tg_token'], config['tg_chat_id'])
-        if config.get('enable_tg'):
-            self.notifier.enabled = True
-            self.notifier.send_message("🚀 加密货币监控系统已启动")
-        # 通知类（企业微信）
-        self.wechat_notifier = EnterpriseWeChatNotifier(config.get("wechat_webhook", ""))
-        if config.get("enable_wechat"):
-            self.wechat_notifier.enabled = True
-            self.wechat_notifier.send_message("🚀 加密货币监控系统已启动（企业微信通知）")
-
-
-        # 初始化交易所
-        Thread(target=self.init_exchanges_with_retry, daemon=True).start()
-
-        # 启动内存优化线程
-        self.optimizer = MemoryOptimizer(self, config.get('mem_interval', 600))
-        self.optimizer.start()
-
-    def log(self, message: str, category: str = 'log') -> None:
-        """统一日志记录，同时回调给GUI显示"""
-        if self.log_callback:
-            print("DEBUG: log_callback type:", type(self.log_callback))
-            self.log_callback(message, category)
-
-    def get_markets(self, exchange_id: str) -> Dict:
-        """
-        获取并缓存交易所市场数据，缓存时效为300秒
-        同时更新USDT交易对缓存
-        """
-        with self.data_lock:
-            cache = self.market_cache.get(exchange_id)
-            if cache and (datetime.now() - cache['timestamp']).seconds < 300:
-                return cache['markets']
-
-            exchange = self.exchanges[exchange_id]
-            try:
-                markets = exchange.load_markets()
-                self.market_cache[exchange_id] = {
-                    'timestamp': datetime.now(),
-                    'markets': markets
-                }
-                self.usdt_pairs_cache[exchange_id] = [
-                    clean_symbol(s) for s in markets
-                    if ((s.endswith('/USDT') or s.endswith('-USDT') or 'usdt' in s.lower())
-                    and markets[s]['active'])
-                ]
-                self.log(f"✅ 交易所 {exchange_id} 可用交易对: {self.usdt_pairs_cache[exchange_id]}", "log")
-
-                return markets
-            except Exception as e:
-                self.log(f"市场数据加载失败({exchange_id}): {str(e)}", 'warning')
-                return {}
-        
-    #==============
-
-    def _calculate_moving_averages(self, closes: pd.Series, periods: List[int]) -> Dict[int, pd.Series]:
-        """
-        计算指定周期的移动平均，支持TA-Lib或Pandas rolling
-        """
-        ma_values = {}
-        for period in periods:
-            if TA_LIB_AVAILABLE:
-                ma_values[period] = talib.SMA(closes, period)
-            else:
-                # 仅在第一次输出日志提示
-                if not hasattr(self, '_talib_unavailable_logged'):
-                    self.log("TA-Lib不可用，使用普通移动平均计算", 'warning')
-                    self._talib_unavailable_logged = True
-                ma_values[period] = closes.rolling(period).mean()
-        return ma_values
-    
-
-    def safe_fetch_ohlcv(self, exchange: ccxt.Exchange, symbol: str, timeframe: str, limit: int) -> Optional[list]:
-        """
-        获取K线数据，确保数据格式正确，并防止异常数据存入 `price_data`
-        """
-        if not self.init_complete.is_set():
-            return None
-
-        # 针对HTX的额外延迟
-        if exchange.id == 'htx':
-            time.sleep(0.25)  # 控制HTX请求间隔至少250ms
-
-        #for _ in range(3):
-        for attempt in range(3):
-            try:
-                time.sleep(max(exchange.rateLimit / 1000, 0.1))
-                data = exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
-                # 强化数据验证
-                if not data or len(data) < limit:
-                    self.log(f"⚠️ {symbol} 数据不足，需要 {limit} 条，实际获取 {len(data)} 条", "warning")
-                    continue  # 继续重试
-
-                # ✅ 确保 `data` 是 `list[list]`
-                if not isinstance(data, list) or not all(isinstance(i, list) and len(i) > 4 for i in data):
-                    self.log(f"⚠️ {symbol} 返回数据异常: {data}", "warning")
-                    return None
-
-                latest_candle = data[-1]  # 取最新一根K线
-                latest_close = float(latest_candle[4]) if latest_candle[4] is not None else None
-                if len(latest_candle) < 5 or latest_candle[4] is None:
-                    self.log(f"⚠️ {symbol} K线格式异常", "warning")
-                    continue
-                if latest_close is None:
-                    self.log(f"⚠️ {symbol} 最新K线收盘价为 None: {latest_candle}", "warning")
-                    return None
-
-                with self.stats_lock:
-                    self.connection_stats['total_pairs'] += 1
-                    self.connection_stats['success_pairs'] += 1
-                    self.connection_stats['last_update'] = datetime.now()
-
-                with self.data_lock:
-                    # **确保 `self.base_prices[symbol]` 只存 float**
-                    if symbol not in self.base_prices:
-                        self.base_prices[symbol] = latest_close
-
-                    # **确保 `self.price_data[symbol]` 只存 `dict`**
-                    self.price_data[symbol] = {
-                        'timestamp': time.time(),
-                        'data': latest_close  # 确保 `float` 类型
-                    }
-                    self.log(f"✅ 存储 {symbol} 价格: {self.price_data[symbol]}", "log")
-
-                return data  # ✅ 返回完整 K 线数据
-
-            except ccxt.NetworkError as e:
-                self.log(f"网络错误: {str(e)} - {symbol}", 'warning')
-                time.sleep(10)
-            except ccxt.ExchangeError as e:
-                self.log(f"交易所错误: {str(e)} - {symbol}", 'warning')
-            except Exception as e:
-                #self.log(f"未知错误: {str(e)} - {symbol}", 'warning')
-                self.log(f"第 {attempt+1} 次获取 {symbol} 数据失败: {str(e)}", "warning")
-                time.sleep(2)
+def install_stock_replay(log, clock):
+    """回放模式：按虚拟时钟从行情日志（capture.ReplayLog）返回记录的股票数据，不访问网络"""
+    global fetch_latest_stock_price, fetch_stock_data
+    from capture import frame_from_json
+    fetch_latest_stock_price = log.wrap('tencent', 'quote', clock)
+    fetch_stock_data = log.wrap('akshare', 'stock_zh_a_minute', clock, decode=frame_from_json)
 
 
-        # 三次尝试均失败后记录
-        self.log(f"❌ {symbol} 数据获取彻底失败", "warning")
-        return None  # ✅ 确保函数返回 `None`
-
-    
-    
-    def get_leaderboard(self, top_n: int = 10) -> Dict[str, Any]:
-        """
-        获取涨幅排行榜 + 监控统计信息
-        top_n: 返回排行榜的数量（默认前10名）
-        """
-        leaderboard = []
-        with self.data_lock:
-            for symbol, info in self.price_data.items():
-                    current_price = info.get('data')
-                    base_price = self.base_prices.get(symbol)
-                
-                    # 确保数据有效（基准价格不能为0）
-                    if base_price and base_price > 0:
-                        change = (current_price - base_price) / base_price * 100
-                        leaderboard.append({
-                            "symbol": symbol,
-                            "exchange": "N/A",  # 如果需要可进一步完善此处的交易所信息
-                            "current_price": current_price,
-                            "base_price": base_price,
-                            "change": change
-                        })
-
-        # 按涨幅降序排序，剔除异常数据
-        leaderboard = sorted(leaderboard, key=lambda x: x["change"], reverse=True)[:top_n]
-
-        return {
-            "leaderboard": leaderboard,
-            "monitor_stats": self.history.get_stats()  # 添加监控统计信息
-        }
-
-
-    def cleanup_data(self) -> None:
-        """
-        定期清理过期数据：
-          - 价格数据保留2小时
-          - 均线数据保留24小时
-          - 交易所市场缓存保留1小时
-          - 清空USDT交易对缓存（由下次调用get_markets重新填充）
-        """
-        now_time = time.time()
-        with self.data_lock:
-            self.price_data = {
-                k: v for k, v in self.price_data.items()
-                if now_time - v['timestamp'] < 7200
-            }
-            self.log(f"💾 内存清理后仍存储的交易对: {list(self.price_data.keys())}", "log")
-
-            self.ma_data = {
-                k: v for k, v in self.ma_data.items()
-                if now_time - v['timestamp'] < 86400
-            }
-            # 清理交易所市场缓存
-            for ex_id in list(self.market_cache.keys()):
-                if (datetime.now() - self.market_cache[ex_id]['timestamp']).seconds > 3600:
-                    del self.market_cache[ex_id]
-            # 清空USDT缓存，等待下次刷新
-            self.usdt_pairs_cache.clear()
-
-    def init_exchanges_with_retry(self) -> None:
-        """
-        并行初始化所选交易所，重试三次后标记为“disconnected”
-        """
-        self.log("初始化交易所连接中...", "log")
-        # 新增代理测试逻辑
-        proxy = self.config['proxy']
-        if proxy:
-            try:
-                test_url = "https://api.binance.com/api/v3/ping"  # 使用通用测试地址
-                response = requests.get(test_url, 
-                                      proxies={'http': proxy, 'https': proxy}, 
-                                      timeout=10)
-                if response.status_code != 200:
-                    self.log(f"代理 {proxy} 测试失败: HTTP {response.status_code}", 'warning')
-                    return
-            except Exception as e:
-                self.log(f"代理 {proxy} 不可用: {str(e)}", 'warning')
-                # return # 不 return，继续尝试连接交易所
-         # 原有初始化逻辑（增加HTX的headers）   
-        def init_single_exchange(exchange_id: str):
-            self.exchange_status[exchange_id] = 'connecting'
-            for attempt in range(3):
-                try:
-                    self.log(f"正在连接 {exchange_id} ({attempt+1}/3)...")
-                    exchange_class = getattr(ccxt, exchange_id)
-                    exchange = exchange_class({
-                        'proxies': {'http': self.config['proxy'], 'https': self.config['proxy']},
-                        'enableRateLimit': True,
-                            'headers': {
-                                       'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)',
-                                       'Referer': 'https://www.htx.com/'  # 添加Referer绕过反爬
-                    },
-                        'verify': False  # 注意：此处禁用了 SSL 验证，仅用于调试，生产环境下不建议关闭验证！
-                    })
-                    exchange.load_markets()
-                    with self.data_lock:
-                        self.exchanges[exchange_id] = exchange
-                        self.exchange_status[exchange_id] = 'connected'
-                    self.log(f"{exchange_id} 连接成功", 'log')
-                    return
-                except ccxt.DDoSProtection as e:
-                    self.log(f"交易所 {exchange_id} 触发DDoS保护: {str(e)}", 'warning')
-                except ccxt.ExchangeNotAvailable as e:
-                    self.log(f"交易所 {exchange_id} 暂时不可用: {str(e)}", 'warning')
-                except Exception as e:
-                    self.log(f"{exchange_id} 连接失败: {str(e)}", 'warning')
-                time.sleep(10)
-            self.exchange_status[exchange_id] = 'disconnected'
-
-        threads = []
-        for exchange_id in self.config['exchanges']:
-            t = Thread(target=init_single_exchange, args=(exchange_id,), daemon=True)
-            threads.append(t)
-            t.start()
-        for t in threads:
-            t.join()
-        self.init_complete.set()
-
-    def send_alert(self, exchange_id: str, symbol: str, message: str, alert_type: str) -> None:
-        """
-        发送警报：
-          - 格式化警报消息，记录到历史记录
-          - 通过Telegram发送（如果启用）
-          - 通过日志回调显示在GUI上
-          - 新增监控统计数据（新增排行榜数据）
-        """
-        key = (symbol, alert_type)
-        current_time = time.time()
-        # 如果该警报曾经发送过，并且距离上次发送时间小于冷却时间，则不再发送
-        if key in self.last_alert_time and (current_time - self.last_alert_time[key] < self.alert_cooldown):
-            return  # 冷却中，不发送
-
-        # 更新最后发送时间
-        self.last_alert_time[key] = current_time
-
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        full_message = f"[{timestamp}] {exchange_id.upper()} {symbol} - {message}"
-
-            # 在记录中保存实际使用的参数
-        record = {
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'exchange': exchange_id,
-            'symbol': symbol,
-            'message': message,
-            'type': alert_type,
-            'timeframe': self.config.get('price_timeframe', '1m'),  # 记录实际参数
-            'period': self.config.get('price_period', 15)
-        }
-        self.history.add_record(record)
-
-        # 记录到历史记录
-        #self.history.add_record({
-            #'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            #'exchange': exchange_id,
-            #'symbol': symbol,
-           # 'message': message,
-           # 'type': alert_type,
-          #  'timeframe': self.config.get('price_timeframe', '1m'),  # 记录实际参数
-          #  'period': self.config.get('price_period', 15)
-       # })
-
-        # 获取监控统计 & 排行榜
-        leaderboard_data = self.get_leaderboard()
-        stats = leaderboard_data["monitor_stats"]
-
-        # 📊 监控统计信息
-        stats_message = f"\n📊 监控统计:\n🔼 多头: {stats['bullish_signals']} 🔽 空头: {stats['bearish_signals']}"
-
-        # 🏆 涨幅排行榜
-        leaderboard_message = "\n🏆 涨幅榜:"
-        for i, entry in enumerate(leaderboard_data["leaderboard"], 1):
-            leaderboard_message += f"\n{i}️⃣ {entry['symbol']} ({entry['exchange']}) {entry['change']:.2f}%"
-
-        final_message = full_message + stats_message + leaderboard_message
-
-        # 发送 Telegram
-        if self.notifier.enabled:
-            self.notifier.send_message(final_message)
-
-        # 发送企业微信
-        if self.wechat_notifier and self.wechat_notifier.enabled:
-            self.wechat_notifier.send_message(final_message)
-
-
-    def check_price_alert(self, exchange: ccxt.Exchange, symbol: str,config: dict) -> None:
-        """
-        检查虚拟货币价格：
-        - 计算自定义周期（price_period）内的涨跌幅
-        - 如果达到设定的阈值（price_threshold），则触发提醒
-        """
-        if not self.config.get('enable_price_monitor', False):
-            return
-        # 从配置中动态读取参数
-
-        price_timeframe = self.config.get('price_timeframe', "1m")
-        price_period = self.config.get('price_period', 15)
-        threshold = config.get('price_threshold', 5.0)
-        direction = config.get('price_direction', 'both').lower()
-
-        data = self.safe_fetch_ohlcv(exchange, symbol, price_timeframe, limit=price_period)
-
-        # ✅ 确保数据格式正确
-        if not isinstance(data, list) or len(data) < price_period:
-            self.log(f"⚠️ {symbol} 数据不足 ({len(data) if isinstance(data, list) else 'None'})，无法计算涨跌幅", "warning")
-            return
-
-        try:
-            # ✅ 取第一根和最后一根K线数据
-            first_candle = data[0] if isinstance(data[0], list) and len(data[0]) > 4 else None
-            last_candle = data[-1] if isinstance(data[-1], list) and len(data[-1]) > 4 else None
-
-            if first_candle is None or last_candle is None:
-                self.log(f"⚠️ {symbol} K线数据格式异常: first_candle={first_candle}, last_candle={last_candle}", "warning")
-                return
-
-            past_close = float(first_candle[4]) if first_candle[4] is not None else None
-            current_close = float(last_candle[4]) if last_candle[4] is not None else None
-
-            if past_close is None or current_close is None or past_close <= 0:
-                self.log(f"⚠️ {symbol} 价格异常: past_close={past_close}, current_close={current_close}", "warning")
-                return
-
-            # ✅ 计算涨跌幅
-            change_percent = ((current_close - past_close) / past_close) * 100
-            threshold = self.config.get('price_threshold', 5.0)
-            if not isinstance(threshold, (int, float)) or threshold <= 0:
-                self.log(f"⚠️ 无效的价格阈值: {threshold}", "warning")
-                return
-
-            # ✅ 方向判断，确保值合法
-            direction = self.config.get('price_direction', 'both').lower()
-            alert_triggered = False
-            alert_msg = ""
-
-            if direction in ['up', 'both'] and change_percent >= threshold:
-                alert_msg = f"📈 价格上涨 {change_percent:.2f}%（{price_period}分钟）"
-                alert_triggered = True
-            elif direction in ['down', 'both'] and change_percent <= -threshold:
-                alert_msg = f"📉 价格下跌 {abs(change_percent):.2f}%（{price_period}分钟）"
-                alert_triggered = True
-
-            # ✅ 发送警报
-            if alert_triggered:
-                self.send_alert(exchange.id, symbol, alert_msg, 'price')
-
-        except Exception as e:
-            self.log(f"⚠️ {symbol} 价格计算异常: {str(e)}", "warning")
-    
-
-
-    def check_ma_alerts(self, exchange: ccxt.Exchange, symbol: str) -> List[Tuple[str, str]]:
-        """
-        检测均线策略信号：
-          - 遍历每组均线策略（周期、时间周期可配置）
-          - 使用K线数据计算移动均线
-          - 判断短/中/长期均线的排列与中轨价格偏离，确认多头或空头信号
-        返回 [(alert_type, message), ...] 的列表
-        """
-        alerts = []
-        for strategy in self.config.get('ma_strategies', []):
-            periods = strategy.get('periods')
-            timeframe = strategy.get('timeframe')
-            required_length = max(periods) + 10
-            data = self.safe_fetch_ohlcv(exchange, symbol, timeframe, limit=required_length)
-            if not data or len(data) < required_length:
-                continue
-            closes = pd.Series([candle[4] for candle in data])
-            current_price = closes.iloc[-1]
-            ma_values = self._calculate_moving_averages(closes, periods)
-            ma_short, ma_medium, ma_long = periods
-            ma_short_val = ma_values[ma_short].iloc[-1]
-            ma_medium_val = ma_values[ma_medium].iloc[-1]
-            ma_long_val = ma_values[ma_long].iloc[-1]
-
-            # 检查中轨偏离：1%容差
-            if abs(current_price - ma_medium_val) / ma_medium_val > 0.01:
-                continue
-
-            # 判断多头信号：短 > 中 > 长，且最近10根K线均高于中轨
-            #if (ma_short_val > ma_medium_val > ma_long_val and
-               # all(closes.iloc[i] > ma_medium_val for i in range(-10, 0))):
-               # alerts.append(("bullish", f"{symbol} 均线多头排列"))
-            # 判断空头信号：短 < 中 < 长，且最近10根K线均低于中轨
-            #elif (ma_short_val < ma_medium_val < ma_long_val and
-                 # all(closes.iloc[i] < ma_medium_val for i in range(-10, 0))):
-               # alerts.append(("bearish", f"{symbol} 均线空头排列"))
-            
-            # 检测多头排列：启用多头策略时，短期 > 中期 > 长期，且最近10根K线的收盘价均高于中期均线
-            if self.config.get("enable_bullish_ma", False) and \
-               ma_short_val > ma_medium_val > ma_long_val and \
-               all(closes.iloc[i] > ma_medium_val for i in range(-10, 0)):
-                alerts.append(("bullish", f"{symbol} 形成多头排列"))
-
-            # 检测空头排列：启用空头策略时，短期 < 中期 < 长期，且最近10根K线的收盘价均低于中期均线
-            if self.config.get("enable_bearish_ma", False) and \
-               ma_short_val < ma_medium_val < ma_long_val and \
-               all(closes.iloc[i] < ma_medium_val for i in range(-10, 0)):
-                alerts.append(("bearish", f"{symbol} 形成空头排列"))
-        return alerts
-
-    def monitor_single_pair(self, exchange: ccxt.Exchange, symbol: str, alert_counts: dict) -> None:
-        """
-        监控单个交易对：
-          - 检测价格警报
-          - 检测均线策略警报
-        """
-        retry_count = 0
-        max_retries = 3
-        while retry_count < max_retries and self.running.is_set():
-            try:
-                if not self.running.is_set():
-                    return
-    
-                self.log(f"⏳ 监控 {symbol}...", "log")
-
-                # ✅ 确保 `self.price_data[symbol]` 是 `dict`
-                price_info = self.price_data.get(symbol)
-                if not price_info or not isinstance(price_info, dict) or 'data' not in price_info:
-                    self.log(f"⚠️ {symbol} 第 {retry_count+1} 次重试获取价格数据...", "warning")
-                    # 尝试重新调用 safe_fetch_ohlcv() 以更新价格数据
-                    timeframe = self.config.get('price_timeframe', "1m")
-                    period = self.config.get('price_period', 15)
-                    data = self.safe_fetch_ohlcv(exchange, symbol, timeframe, limit=period)
-                    if not data:
-                        retry_count += 1
-                        time.sleep(2)
-                        self.log(f"⚠️ {symbol} 重新获取价格数据失败", "warning")
-                        return
-                    # 重新检查更新后的价格数据
-                    price_info = self.price_data.get(symbol)
-                    if not price_info or 'data' not in price_info:
-                        raise ValueError("价格数据刷新失败")
-                        self.log(f"⚠️ {symbol} 重新获取后仍无有效价格数据", "warning")
-                        return
-
-                # ✅ 价格警报检测
-                self.check_price_alert(exchange, symbol)
-
-                # ✅ 均线策略检测
-                ma_alerts = self.check_ma_alerts(exchange, symbol) or []
-                if not isinstance(ma_alerts, list):
-                    self.log(f"⚠️ {symbol} 均线策略返回异常: {ma_alerts}", "warning")
-                    return
-
-                for alert_type, msg in ma_alerts:
-                    self.send_alert(exchange.id, symbol, msg, alert_type)
-                    alert_counts[alert_type] = alert_counts.get(alert_type, 0) + 1
-
-                time.sleep(0.5)  # 控制请求频率
-                break  # 成功则退出循环
-
-            except Exception as e:
-                retry_count += 1
-                self.log(f"⚠️ {symbol} 监控异常（{retry_count}/{max_retries}）: {str(e)}", "warning")
-                time.sleep(3)
-
-    def start_monitoring(self, symbol) -> None:
-        """
-        主监控循环：
-          - 遍历每个交易所，过滤USDT交易对（支持排除及最大数量限制）
-          - 使用线程池并行检测每个交易对的监控信号
-          - 定时更新连接统计与日志输出
-        """
-        self.log("监控循环启动", 'log')
-        while self.running.is_set():
-            # 每次循环前动态读取最新配置
-            with self.data_lock:  # 加锁保证线程安全
-                current_config = self.config.copy()
-            # 使用 current_config 进行检测
-            self.check_price_alert(exchange, symbol, current_config)  # 传递当前配置
-            try:
-                # ✅ 先读取当前统计数据，避免清零影响 `get_leaderboard()`
-                previous_stats = self.history.get_stats()  # 先获取之前的统计数据
-
-                # ✅ 清零统计，防止数据累积
-                self.history.stats = {"bullish_signals": 0, "bearish_signals": 0}
-
-                alert_counts = {'bullish': 0, 'bearish': 0}
-                for exchange_id, exchange in self.exchanges.items():
-                    if self.exchange_status.get(exchange_id) != 'connected':
-                        continue
-                
-                    # ✅ 确保 `self.get_markets(exchange_id)` 不返回 `None`
-                    markets = self.get_markets(exchange_id) or {}
-
-                    # ✅ 确保 `usdt_pairs_cache` 可用
-                    usdt_pairs = self.usdt_pairs_cache.get(exchange_id, [])
-                    if not usdt_pairs:
-                        usdt_pairs = [s for s in markets if s.endswith('/USDT')]
-
-                    # ✅ 排除指定交易对
-                    excluded = [x.strip().upper() for x in self.config.get('excluded_pairs', '').split(',') if x]
-                    monitored_pairs = [p for p in usdt_pairs if p.upper() not in excluded][:self.config.get('max_pairs', 500)]
-
-                    # ✅ 动态分配 `max_workers`，防止线程浪费
-                    max_threads = min(10, len(monitored_pairs) // 2 + 1)
-    
-                    # ✅ 并行处理交易对
-                    with ThreadPoolExecutor(max_workers=max_threads) as executor:
-                        futures = [executor.submit(self.monitor_single_pair, exchange, symbol, alert_counts) for symbol in monitored_pairs]
-                        for future in as_completed(futures):
-                            pass
-
-                # 📊 监控统计 & 排行榜
-                leaderboard_data = self.get_leaderboard() or {"leaderboard": []}  # ✅ 确保 `leaderboard_data` 可用
-
-                stats_msg = (f"📊 监控统计 | 🔼 多头: {alert_counts.get('bullish', 0)} "
-                             f"🔽 空头: {alert_counts.get('bearish', 0)}")
-
-                leaderboard_msg = "\n🏆 涨幅榜:"
-                for i, entry in enumerate(leaderboard_data["leaderboard"], 1):
-                    leaderboard_msg += f"\n{i}️⃣ {entry.get('symbol', '未知')} ({entry.get('exchange', '未知')}) {entry.get('change', 0.0):.2f}%"
-
-                full_message = stats_msg + leaderboard_msg
-
-                # ✅ 发送 Telegram & 企业微信
-                if self.notifier.enabled:
-                    self.notifier.send_message(full_message)
-
-                if self.wechat_notifier and self.wechat_notifier.enabled:
-                    self.wechat_notifier.send_message(full_message)
-
-                # ✅ 防止 `check_interval` 为 `None`
-                #time.sleep(self.config.get('check_interval', 300) or 300)
-                # 动态调整休眠时间
-                time.sleep(current_config.get('check_interval', 300))
-        
-            except Exception as e:
-                self.log(f"⚠️ 监控循环异常: {str(e)}", 'warning')
-                time.sleep(30)  # ✅ 避免短时间内死循环
-
-    # 新增接口：更新整个监控配置
-    def update_config(self, new_config: dict) -> None:
-        """
-        更新监控对象内部的配置字典，新的配置会在下一次监控周期生效。
-        """
-        with self.data_lock:  # 加锁
-            changed_keys = [k for k in new_config if self.config.get(k) != new_config[k]]
-            # 记录需要重新初始化的字段
-            need_reinit = 'price_timeframe' in new_config
-        # 合并配置
-            self.config.update(new_config)
-        
-
-            # 特殊字段处理
-            if need_reinit:
-                self._reinit_data_fetcher()
-    
-        self.log(f"配置已实时更新: {new_config}", "log")
-        self.log(f"配置变更字段: {changed_keys}", "debug")
-
-    def _reinit_data_fetcher(self):
-        """重新初始化数据抓取器（真实实现）"""
-        # 清空旧数据缓存
-        with self.data_lock:
-            self.price_data.clear()
-            self.base_prices.clear()
-            
-        self.log("价格时间周期变更，已清空缓存数据", "log")
-
-    # 新增接口：更新单个交易对监控列表
-    def update_single_pair_list(self, pair_list: list) -> None:
-        """
-        更新单个交易对监控列表，重置内部的单对策略配置（可根据需要保留原有策略）。
-        这里简单将原有策略清空，并以新列表初始化每个交易对为“未启用”状态。
-        """
-        self.single_pair_strategies = {}
-        for pair in pair_list:
-            self.single_pair_strategies[pair.upper()] = {"enabled": False}
-        self.log("单个交易对监控列表已更新", "log")
-    #=====================================================
-    def enable_single_pair_strategy(self, pair: str, strategy1: dict, strategy2: dict) -> None:
-        """
-        启用单个交易对监控：
-          - pair: 交易对代码，如 "BTC/USDT"
-          - strategy1: 字典，包含策略1参数，例如：
-              {"timeframe": "5m", "ma_period": 20, "threshold": 5}
-          - strategy2: 字典，包含策略2参数，例如：
-              {"timeframe": "5m", "threshold": 10}
-        此方法保存配置，并启动后台线程进行监控。
-        """
-        pair = pair.upper()
-        if not hasattr(self, "single_pair_strategies"):
-            self.single_pair_strategies = {}
-        self.single_pair_strategies[pair] = {
-            "strategy1": strategy1,
-            "strategy2": strategy2,
-            "enabled": True
-        }
-        self.log(f"单个交易对 {pair} 监控已启用", "log")
-        # 启动监控线程，如果尚未启动该交易对的监控线程（你可以简单启动一个新的线程，每次启用均启动）
-        thread = Thread(target=self.monitor_single_pair_strategy, args=(pair,), daemon=True)
-        thread.start()
-
-    def disable_single_pair_strategy(self, pair: str) -> None:
-        """
-        禁用单个交易对监控，将对应策略标记为禁用。
-        """
-        pair = pair.upper()
-        if hasattr(self, "single_pair_strategies") and pair in self.single_pair_strategies:
-            self.single_pair_strategies[pair]["enabled"] = False
-            self.log(f"单个交易对 {pair} 监控已禁用", "log")
-        else:
-            self.log(f"未找到 {pair} 的单对监控策略", "warning")
-
-    def monitor_single_pair_strategy(self, pair: str) -> None:
-        """
-        后台线程循环监控指定交易对，分别应用策略1和策略2，
-        当达到警报条件时调用 send_alert 触发报警。
-        这里示例中使用默认刷新间隔为 60 秒，你可根据需要调整或将其作为参数设置。
-        """
-        refresh_interval = 60  # 单对监控刷新间隔（秒）
-        while (hasattr(self, "single_pair_strategies") and
-               pair in self.single_pair_strategies and
-               self.single_pair_strategies[pair].get("enabled", False) and
-               self.running.is_set()):
-            # 取出策略配置
-            strat = self.single_pair_strategies[pair]
-            s1 = strat["strategy1"]
-            s2 = strat["strategy2"]
-
-            # 选择一个交易所进行监控，这里示例使用 Binance（你可根据实际情况选择其他交易所）
-            exchange = self.exchanges.get("binance")
-            if not exchange:
-                self.log(f"监控 {pair} 时未连接 Binance", "warning")
-                time.sleep(refresh_interval)
-                continue
-
-            # 策略1：监控价格与均线偏离
-            data1 = self.safe_fetch_ohlcv(exchange, pair, s1.get("timeframe", "5m"), limit=s1.get("ma_period", 20) + 10)
-            if data1 and len(data1) >= s1.get("ma_period", 20):
-                closes = pd.Series([candle[4] for candle in data1])
-                ma_line = closes.rolling(window=s1.get("ma_period", 20)).mean()
-                current_price = closes.iloc[-1]
-                current_ma = ma_line.iloc[-1]
-                if current_ma and current_ma != 0:
-                    diff_pct = abs(current_price - current_ma) / current_ma * 100
-                    if diff_pct <= s1.get("threshold", 5):
-                        self.send_alert(exchange.id, pair, 
-                                        f"策略1：价格 {current_price:.2f} 与均线 {current_ma:.2f} 差 {diff_pct:.2f}%", 
-                                        "strategy1")
-            
-            # 策略2：监控价格涨跌幅百分比
-            data2 = self.safe_fetch_ohlcv(exchange, pair, s2.get("timeframe", "5m"), limit=2)
-            if data2 and len(data2) >= 2:
-                prev_close = data2[-2][4]
-                current_close = data2[-1][4]
-                if prev_close != 0:
-                    change_pct = ((current_close - prev_close) / prev_close) * 100
-                    if abs(change_pct) >= s2.get("threshold", 10):
-                        self.send_alert(exchange.id, pair, 
-                                        f"策略2：价格变动 {change_pct:.2f}%", 
-                                        "strategy2")
-            time.sleep(refresh_interval)
-
+def replay_stock_monitor(log, config, log_callback=None):
+    """
+    用行情日志重新运行股票监控：按记录的每次K线请求推进虚拟时钟并检查均线，
+    提醒通过 log_callback（类别 'stock'）输出，返回 StockMonitorPro 对象
+    """
+    from capture import VirtualClock
+    clock = VirtualClock(log.start or 0)
+    install_stock_replay(log, clock)
+    monitor = StockMonitorPro(dict(config, capture_path=''), log_callback)
+    for t, (args, kwargs) in log.calls.get(('akshare', 'stock_zh_a_minute'), []):
+        clock.set(t)
+        df = fetch_stock_data(*args, **kwargs)
+        if df is not None and not df.empty:
+            monitor.check_stock(args[0], df)
+    return monitor
 # ======================== 股票类 ========================
 
 class StockMonitorPro:
@@ -983,7 +123,11 @@ class StockMonitorPro:
         self.running.set()  # 标记为运行状态
         # 新增：数据缓存，用于预加载股票数据
         self.data_cache = {}
+        self.indicators = IndicatorStore()  # 增量均线状态（incremental_indicators）
         self.allowed_periods = ["5min", "15min", "30min", "60min", "120min", "240min", "daily"]
+        if config.get('capture_path'):
+            from capture import open_writer  # 行情记录（与加密货币监控共用同一份日志）
+            install_stock_capture(open_writer(config['capture_path']))
 
 
     def update_config(self, new_config: dict) -> None:
@@ -1015,11 +159,12 @@ class StockMonitorPro:
         else:
             print(f"[{category}] {message}")
     
-    def calculate_ma(self, closes: pd.Series):
+    def calculate_ma(self, closes: 'pd.Series'):
         period = self.config.get('ma_period', 30)
         return closes.rolling(window=period, min_periods=1).mean()  # 允许最小周期为1，避免初期数据不足
 
     def check_stock(self, symbol, df=None):
+        import pandas as pd
         if df is None:
             df = self.data_cache.get(symbol)
             if df is None or df.empty:
@@ -1029,9 +174,17 @@ class StockMonitorPro:
 
         closes = df["收盘"]
         ma_period = self.config.get("ma_period", 30)
-        ma_line = closes.rolling(window=ma_period).mean()
-        current_price = closes.iloc[-1]
-        current_ma = ma_line.iloc[-1]
+        if self.config.get('incremental_indicators', False):
+            # 末行是实时价格拼接的临时K线，下一轮会被撤销后再对齐
+            keys = df["时间"].astype(str).tolist() if "时间" in df else df.index.tolist()
+            ma_values, recent = self.indicators.sync((symbol, self.config.get("stock_period", "5min")),
+                                                     [ma_period], keys, closes.tolist())
+            current_price = recent[-1]
+            current_ma = ma_values[ma_period]
+        else:
+            ma_line = closes.rolling(window=ma_period).mean()
+            current_price = closes.iloc[-1]
+            current_ma = ma_line.iloc[-1]
         if pd.isna(current_ma) or current_ma == 0:
             return
         diff_pct = abs(current_price - current_ma) / current_ma * 100
@@ -1091,13 +244,15 @@ class MonitorGUIPro(tk.Tk):
       - 支持启动、停止、紧急停止与配置保存
     """
 
-    def __init__(self):
+    def __init__(self, state_bridge=None):
         super().__init__()
+        self.state_bridge = state_bridge  # 共享内存状态通道，监控对象每轮发布给 Web 进程
         self.title("专业加密货币监控系统 v7.3")
         self.geometry("1200x900")
         #self.monitor = None
         self.stock_monitor = None  # 新增股票监控对象
         self._pending_alerts = deque(maxlen=100)
+        QUEUE_DEPTH.track('gui_log', function=lambda: len(self._pending_alerts))
         self._setup_ui()
        # self.after(5000, self.update_leaderboard)
         self.protocol("WM_DELETE_WINDOW", self.on_close)
@@ -1113,6 +268,7 @@ class MonitorGUIPro(tk.Tk):
             config = {}  # 避免 None 传递导致错误
 
         self.monitor = CryptoMonitorPro(config, log_callback=self.log_message)
+        self.monitor.state_bridge = self.state_bridge
         # ✅ 确保 leaderboard_listbox 正确初始化
         self.leaderboard_listbox = tk.Listbox(self)
         self.leaderboard_listbox.pack(pady=10, fill=tk.BOTH, expand=True)
@@ -1238,6 +394,7 @@ class MonitorGUIPro(tk.Tk):
         
         ttk.Button(row3, text="⚠️ 急停", command=self.emergency_stop, style='Emergency.TButton').pack(side=tk.LEFT, padx=2)
         ttk.Button(row3, text="🔍 查询历史记录", command=self.show_history).pack(side=tk.LEFT, padx=2)
+        ttk.Button(row3, text="🔬 性能采样", command=self.toggle_profiling).pack(side=tk.LEFT, padx=2)
 
         # 样式配置
         self.style = ttk.Style()
@@ -1274,6 +431,10 @@ class MonitorGUIPro(tk.Tk):
         self.price_threshold.insert(0, "5.0")  # 默认 5%
         self.price_threshold.grid(row=0, column=8)
 
+        # 批量行情模式：每轮每个交易所一次 fetch_tickers
+        self.price_ticker_mode = tk.BooleanVar(value=False)
+        ttk.Checkbutton(price_frame, text="批量行情", variable=self.price_ticker_mode).grid(row=0, column=9)
+
         # 保存按钮
         ttk.Button(price_frame, text="保存价格监控设置", command=self.save_price_monitor_config).grid(row=0, column=10, padx=5, pady=3, sticky="e")
 
@@ -1285,6 +446,8 @@ class MonitorGUIPro(tk.Tk):
         self.enable_bearish_ma = tk.BooleanVar(value=False)
         ttk.Checkbutton(ma_frame, text="启用多头排列策略", variable=self.enable_bullish_ma).grid(row=1, column=3, padx=5, pady=2, sticky=tk.W)
         ttk.Checkbutton(ma_frame, text="启用空头排列策略", variable=self.enable_bearish_ma).grid(row=1, column=4, padx=5, pady=2, sticky=tk.W)
+        self.vectorized_ma = tk.BooleanVar(value=False)
+        ttk.Checkbutton(ma_frame, text="向量化计算", variable=self.vectorized_ma).grid(row=1, column=5, padx=5, pady=2, sticky=tk.W)
           # 添加保存均线策略设置按钮
         ttk.Button(ma_frame, text="保存均线策略设置", command=self.save_ma_strategy_config)\
             .grid(row=0, column=10, padx=5, pady=3, sticky="e")
@@ -1429,6 +592,32 @@ class MonitorGUIPro(tk.Tk):
         self.alert_cooldown_entry = ttk.Entry(adv_frame, width=6)
         self.alert_cooldown_entry.insert(0, "6000")  # 默认300秒
         self.alert_cooldown_entry.grid(row=0, column=11)
+        # 监控引擎：thread 为原线程池循环，async 为基于 ccxt.async_support 的异步引擎，sharded 为多进程分片
+        ttk.Label(adv_frame, text="监控引擎:").grid(row=0, column=12)
+        self.engine_combo = ttk.Combobox(adv_frame, values=['thread', 'async', 'sharded'], width=7)
+        self.engine_combo.set('thread')
+        self.engine_combo.grid(row=0, column=13)
+        # 增量指标：每个交易对维护均线滑动累加和，每轮只处理新增/修订的K线
+        self.incremental_indicators = tk.BooleanVar(value=False)
+        ttk.Checkbutton(adv_frame, text="增量指标", variable=self.incremental_indicators).grid(row=1, column=0, sticky=tk.W)
+        # 自适应调度：波动大/接近报警条件的交易对提前检查，静默交易对推迟，总请求量不变
+        self.adaptive_sweep = tk.BooleanVar(value=False)
+        ttk.Checkbutton(adv_frame, text="自适应调度", variable=self.adaptive_sweep).grid(row=1, column=1, columnspan=2, sticky=tk.W)
+        # 警报历史持久化：写入 SQLite（alert_history.db），按最大保留时间清理
+        self.persist_history = tk.BooleanVar(value=False)
+        ttk.Checkbutton(adv_frame, text="历史持久化", variable=self.persist_history).grid(row=1, column=3, columnspan=2, sticky=tk.W)
+        # K线落盘：K线与基准价格写入 ohlcv_store 目录，重启后回填缓存，只请求停机期间缺失的K线
+        self.persist_klines = tk.BooleanVar(value=False)
+        ttk.Checkbutton(adv_frame, text="K线落盘", variable=self.persist_klines).grid(row=1, column=5, sticky=tk.W)
+        # 市场数据快照：启动时使用本地保存的交易对信息立即连接，后台刷新
+        self.market_snapshot = tk.BooleanVar(value=True)
+        ttk.Checkbutton(adv_frame, text="市场快照", variable=self.market_snapshot).grid(row=1, column=6, columnspan=2, sticky=tk.W)
+        # 行情记录：交易所与股票数据源的响应写入 market_capture.jsonl.gz，可离线回放（monitor_cli replay）
+        self.record_capture = tk.BooleanVar(value=False)
+        ttk.Checkbutton(adv_frame, text="行情记录", variable=self.record_capture).grid(row=1, column=8, columnspan=2, sticky=tk.W)
+        # 运行指标：在 127.0.0.1:9108/metrics 提供请求耗时、重试、轮次耗时、队列长度、锁等待等指标（Prometheus 格式）
+        self.metrics_endpoint = tk.BooleanVar(value=False)
+        ttk.Checkbutton(adv_frame, text="指标接口", variable=self.metrics_endpoint).grid(row=1, column=10, columnspan=2, sticky=tk.W)
 
         #创建底部状态栏
         status_frame = ttk.Frame(control_frame)
@@ -1461,7 +650,8 @@ class MonitorGUIPro(tk.Tk):
             'enable_price_monitor': self.price_enable.get(),
             'price_timeframe': self.price_tf.get(),# 获取选择的时间周期（1m, 5m, 15m等）
             'price_threshold': float(self.price_threshold.get()),
-            'price_direction': self.price_direction.get()
+            'price_direction': self.price_direction.get(),
+            'price_monitor_mode': 'ticker' if self.price_ticker_mode.get() else 'ohlcv'
         }
         if self.monitor and hasattr(self.monitor, "update_config"):
             # 假设 update_config 会更新相关参数，
@@ -1486,7 +676,8 @@ class MonitorGUIPro(tk.Tk):
                 except ValueError:
                     self.log_message("均线策略输入格式错误", "warning")
         if self.monitor and hasattr(self.monitor, "update_config"):
-            self.monitor.update_config({'ma_strategies': ma_strategies})
+            self.monitor.update_config({'ma_strategies': ma_strategies,
+                                        'ma_engine': 'vectorized' if self.vectorized_ma.get() else 'series'})
         self.log_message("均线策略设置已更新", "log")
 
     def save_excluded_pairs_config(self):
@@ -1520,7 +711,9 @@ class MonitorGUIPro(tk.Tk):
             'stock_period': self.stock_period.get(),  # 这里保存数据周期
             'ma_period': self._safe_get(int, self.ma_period_entry, 30),
             'ma_threshold': self._safe_get(float, self.ma_threshold_entry, 2.0),
-            'stock_check_interval': self._safe_get(int, self.stock_interval_entry, 60)
+            'stock_check_interval': self._safe_get(int, self.stock_interval_entry, 60),
+            'incremental_indicators': self.incremental_indicators.get(),
+            'capture_path': 'market_capture.jsonl.gz' if self.record_capture.get() else ''
         }
         self.stock_monitor = StockMonitorPro(stock_config, log_callback=self.log_message)
         if self.stock_monitor:
@@ -1553,7 +746,8 @@ class MonitorGUIPro(tk.Tk):
     #=================================================================
     def fetch_stock_codes(self):
         # 获取个股代码列表（调用你实际的数据接口，这里使用示例函数
-        codes = fetch_all_stock_codes()  # 请确保 fetch_all_stock_codes 在本模块或已导入
+        from stock_utils import fetch_all_stock_codes  # 延迟导入，只有股票监控才需要
+        codes = fetch_all_stock_codes()
         # 将返回的代码列表填充到股票下拉框中
         self.stock_combo['values'] = codes
         self.log_message("股票代码列表已更新", "log")
@@ -1820,7 +1014,9 @@ class MonitorGUIPro(tk.Tk):
                 'stock_period': stock_period,
                 'ma_period': ma_period,
                 'ma_threshold': ma_threshold,
-                'stock_check_interval': stock_interval
+                'stock_check_interval': stock_interval,
+                'incremental_indicators': self.incremental_indicators.get(),
+                'capture_path': 'market_capture.jsonl.gz' if self.record_capture.get() else ''
             }
             from threading import Thread
             # 创建股票监控实例（此时 StockMonitorPro 内部延迟导入 akshare 也可保证）
@@ -1848,7 +1044,7 @@ class MonitorGUIPro(tk.Tk):
         """
         test_url = "https://push2.eastmoney.com/api/qt/stock/kline/get"  # 示例 URL
         try:
-            response = requests.get(test_url, timeout=5)
+            response = get_pool().get(test_url, timeout=5)
             if response.status_code == 200:
                 self.log_message("股票监控网络连接测试成功", "log")
             else:
@@ -1873,6 +1069,7 @@ class MonitorGUIPro(tk.Tk):
         callback 应该是一个函数，接受一个列表参数（股票代码列表）。
         """
         def task():
+            from stock_utils import fetch_all_stock_codes
             codes = fetch_all_stock_codes()
             callback(codes)
         threading.Thread(target=task, daemon=True).start()
@@ -1916,8 +1113,9 @@ class MonitorGUIPro(tk.Tk):
             self.log_message("监控未启动，无历史记录可查询", 'warning')
             return
 
-        history_records = self.monitor.history.records
-        if not history_records:
+        history = self.monitor.history
+        total = history.count()
+        if not total:
             messagebox.showinfo("历史记录", "当前没有历史记录")
             return
 
@@ -1926,15 +1124,36 @@ class MonitorGUIPro(tk.Tk):
         history_win.title("历史记录查询")
         history_win.geometry("800x600")
     
+        # 分页按钮（最新的记录在前，每页只取当前页的记录）
+        page_size = 200
+        pages = (total + page_size - 1) // page_size
+        page = {'index': 0}
+        nav_frame = ttk.Frame(history_win)
+        nav_frame.pack(fill=tk.X, padx=5, pady=2)
+        page_label = ttk.Label(nav_frame)
+
         # 使用ScrolledText显示记录
         st = scrolledtext.ScrolledText(history_win, wrap=tk.WORD, font=('Consolas', 10))
         st.pack(expand=True, fill=tk.BOTH, padx=5, pady=5)
-    
-        # 将记录逐行写入
-        for record in history_records:
-            line = f"[{record['timestamp']}] {record['exchange'].upper()} {record['symbol']} - {record['message']} ({record['type']})\n"
-            st.insert(tk.END, line)
-        st.configure(state='disabled')
+
+        def render():
+            st.configure(state='normal')
+            st.delete('1.0', tk.END)
+            # 将记录逐行写入
+            for record in history.query(offset=page['index'] * page_size, limit=page_size):
+                line = f"[{record['timestamp']}] {record['exchange'].upper()} {record['symbol']} - {record['message']} ({record['type']})\n"
+                st.insert(tk.END, line)
+            st.configure(state='disabled')
+            page_label.config(text=f"第 {page['index'] + 1}/{pages} 页（共 {total} 条）")
+
+        def turn(step):
+            page['index'] = min(max(page['index'] + step, 0), pages - 1)
+            render()
+
+        ttk.Button(nav_frame, text="上一页", command=lambda: turn(-1)).pack(side=tk.LEFT)
+        ttk.Button(nav_frame, text="下一页", command=lambda: turn(1)).pack(side=tk.LEFT)
+        page_label.pack(side=tk.LEFT, padx=10)
+        render()
 
 
     def _create_status_light(self, text: str) -> tk.Label:
@@ -2012,7 +1231,7 @@ class MonitorGUIPro(tk.Tk):
             self.monitored_pairs_label.config(text=str(monitored_pairs))
             self.alert_queue_label.config(text=str(len(self._pending_alerts)))
             # 内存记录（使用警报历史记录条数）
-            history_size = len(self.monitor.history.records)
+            history_size = len(self.monitor.history)
             self.mem_usage_label.config(text=f"{history_size}条")
             if stats.get('last_update'):
                 self.last_update_label.config(text=stats['last_update'].strftime("%H:%M:%S"))
@@ -2025,7 +1244,7 @@ class MonitorGUIPro(tk.Tk):
             self.log_message("代理格式必须以http://或https://开头", 'warning')
             return
         try:
-            response = requests.get('https://api.binance.com/api/v3/ping',
+            response = get_pool().get('https://api.binance.com/api/v3/ping',
                                     proxies={'http': proxy, 'https': proxy},
                                     timeout=10)
             if response.status_code == 200:
@@ -2043,7 +1262,7 @@ class MonitorGUIPro(tk.Tk):
         def network_test():
             try:
                 # 发起网络请求，设置超时和关闭 SSL 验证以防止异常
-                response = requests.get(url, timeout=10, verify=False,
+                response = get_pool().get(url, timeout=10, verify=False,
                                     proxies={'http': self.proxy_entry.get().strip(),
                                              'https': self.proxy_entry.get().strip()} if self.proxy_enable.get() else None)
                 if response.status_code == 200:
@@ -2081,6 +1300,16 @@ class MonitorGUIPro(tk.Tk):
         else:
             self.log_message("企业微信提醒连接测试失败", 'warning')
 
+    def toggle_profiling(self):
+        """开始采样接下来 3 轮监控的调用栈，采样中再次点击则立即结束并写出结果"""
+        if not self.monitor:
+            self.log_message("监控未启动，无法进行性能采样", 'warning')
+            return
+        if self.monitor.profiler is None:
+            self.monitor.start_profiling(3)
+        else:
+            Thread(target=self.monitor.stop_profiling, daemon=True).start()  # 等待采样线程结束并写文件
+
     def emergency_stop(self):
         """紧急停止监控"""
         if self.monitor:
@@ -2101,17 +1330,27 @@ class MonitorGUIPro(tk.Tk):
             'price_timeframe': self.price_tf.get(),
             'price_threshold': self._safe_get(float, self.price_threshold, 5.0),
             'price_direction': self.price_direction.get(),
+            'price_monitor_mode': 'ticker' if self.price_ticker_mode.get() else 'ohlcv',
             'ma_strategies': [],
             'data_retention': self.data_retention.get(),
             'mem_interval': self._safe_get(int, self.mem_interval, 600),
             'enable_bullish_ma':self.enable_bullish_ma.get(),
             'enable_bearish_ma':self.enable_bearish_ma.get(),
+            'ma_engine': 'vectorized' if self.vectorized_ma.get() else 'series',
             'enable_tg': self.tg_enable.get(),
             'enable_wechat': self.wechat_enable.get(),
             'wechat_webhook': self.wechat_webhook_entry.get().strip(),
             'tg_token': self.tg_token_entry.get().strip(),
             'tg_chat_id': self.tg_chat_entry.get().strip(),
             'alert_cooldown':self._safe_get(int, self.alert_cooldown_entry, 6000),
+            'engine': self.engine_combo.get() or 'thread',
+            'incremental_indicators': self.incremental_indicators.get(),
+            'sweep_mode': 'adaptive' if self.adaptive_sweep.get() else 'fixed',
+            'history_db': 'alert_history.db' if self.persist_history.get() else '',
+            'ohlcv_store_dir': 'ohlcv_store' if self.persist_klines.get() else '',
+            'market_cache_dir': 'market_cache' if self.market_snapshot.get() else '',
+            'capture_path': 'market_capture.jsonl.gz' if self.record_capture.get() else '',
+            'metrics_port': 9108 if self.metrics_endpoint.get() else 0,
             # 股票监控配置
             'stock_list': ",".join(self.stock_listbox.get(0, tk.END)),
             'stock_period': self.stock_period.get(),
@@ -2192,30 +1431,7 @@ class MonitorGUIPro(tk.Tk):
 
     def load_config(self) -> None:
         """从配置文件加载配置，并填充到各控件"""
-        default_config = {
-            "exchanges": ["binance"],
-            "proxy": "",
-            "check_interval": 300,
-            "max_pairs": 500,
-            "enable_price_monitor": True,
-            "price_timeframe": "5m",
-            "price_threshold": 5.0,
-            "price_direction": "both",
-            "excluded_pairs": "",
-            "enable_wechat": False,
-            "wechat_webhook": "",
-            "ma_strategies": [{
-                "periods": [5, 20, 60],
-                "timeframe": "1h"
-            }],
-            "data_retention": "6小时",
-            "mem_interval": 600,
-            "enable_tg": False,
-            "tg_token": "",
-            "tg_chat_id": "",
-            "enable_bearish_ma":False,
-            "enable_bullish_ma":False
-        }
+        default_config = copy.deepcopy(DEFAULT_CONFIG)
         config_path = "config.json"
         merged_config = default_config.copy()
         try:
@@ -2275,6 +1491,7 @@ class MonitorGUIPro(tk.Tk):
             self.price_threshold.delete(0, tk.END)
             self.price_threshold.insert(0, str(merged_config.get('price_threshold', 5.0)))
             self.price_direction.set(merged_config.get('price_direction', 'both'))
+            self.price_ticker_mode.set(merged_config.get('price_monitor_mode', 'ohlcv') == 'ticker')
             for i, strategy in enumerate(merged_config.get('ma_strategies', [])[:2]):
                 if i < len(self.ma_configs):
                     cfg = self.ma_configs[i]
@@ -2287,6 +1504,15 @@ class MonitorGUIPro(tk.Tk):
             self.data_retention.set(merged_config.get('data_retention', '6小时'))
             self.mem_interval.delete(0, tk.END)
             self.mem_interval.insert(0, str(merged_config.get('mem_interval', 600)))
+            self.engine_combo.set(merged_config.get('engine', 'thread'))
+            self.incremental_indicators.set(merged_config.get('incremental_indicators', False))
+            self.adaptive_sweep.set(merged_config.get('sweep_mode', 'fixed') == 'adaptive')
+            self.persist_history.set(bool(merged_config.get('history_db')))
+            self.persist_klines.set(bool(merged_config.get('ohlcv_store_dir')))
+            self.market_snapshot.set(bool(merged_config.get('market_cache_dir')))
+            self.record_capture.set(bool(merged_config.get('capture_path')))
+            self.metrics_endpoint.set(bool(merged_config.get('metrics_port')))
+            self.vectorized_ma.set(merged_config.get('ma_engine', 'series') == 'vectorized')
             self.check_interval.delete(0, tk.END)
             self.check_interval.insert(0, str(merged_config.get('check_interval', 300)))
             self.tg_enable.set(merged_config.get('enable_tg', False))
@@ -2354,9 +1580,13 @@ class MonitorGUIPro(tk.Tk):
         try:
             config = self.get_config()
 
+            # 窗口初始化或上次运行留下的监控对象仍持有 K线存储、警报数据库等资源，先关闭再创建
+            if self.monitor is not None:
+                self.monitor.shutdown()
             self.monitor = CryptoMonitorPro(config, self.log_message)
+            self.monitor.state_bridge = self.state_bridge
             # 启动后台线程
-            self.monitor_thread = Thread(target=self.monitor.start_monitoring, daemon=True)
+            self.monitor_thread = Thread(target=self.monitor.run_engine, daemon=True)
             self.monitor_thread.start()
 
             # 更新状态标志
@@ -2376,8 +1606,7 @@ class MonitorGUIPro(tk.Tk):
             return
         # 停止监控进程
         if self.monitor:
-            self.monitor.running.clear()  # 停止运行监控进程
-            self.monitor.optimizer.running = False  # 停止内存优化线程
+            self.monitor.shutdown()  # 停止线程，发出剩余警报，历史与K线落盘
             self.is_monitoring = False  # 更新状态
             self.start_btn.config(state=tk.NORMAL)
             self.stop_btn.config(state=tk.DISABLED)
@@ -2389,45 +1618,12 @@ class MonitorGUIPro(tk.Tk):
         if self.monitor.optimizer.is_alive():
             self.monitor.optimizer.stop()
         if messagebox.askokcancel("退出", "确定要退出程序吗？"):
-            self.stop_monitor()
+            if self.is_monitoring:
+                self.stop_monitor()
+            self.monitor.shutdown()  # 未启动过的监控对象也要落盘并释放资源
             self.destroy()
 
 #===========
-#==============================
-# 定义 Windows API 常量
-ES_CONTINUOUS = 0x80000000
-ES_SYSTEM_REQUIRED = 0x00000001
-ES_AWAYMODE_REQUIRED = 0x00000040  # Windows Vista 及以上
-
-def prevent_sleep():
-    """
-    调用 SetThreadExecutionState API，防止系统进入睡眠状态
-    """
-    result = ctypes.windll.kernel32.SetThreadExecutionState(
-        ES_CONTINUOUS | ES_SYSTEM_REQUIRED | ES_AWAYMODE_REQUIRED)
-    if result == 0:
-        print("调用 SetThreadExecutionState 失败")
-    else:
-        print("系统休眠已被禁止")
-
-def restore_sleep():
-    """
-    恢复系统默认睡眠状态
-    """
-    ctypes.windll.kernel32.SetThreadExecutionState(ES_CONTINUOUS)
-    print("系统休眠已恢复")
-
-# 在程序启动时调用 prevent_sleep，并确保程序退出时恢复睡眠
-prevent_sleep()
-atexit.register(restore_sleep)
-#===========
-
-# crypto.py —— 核心监控和 GUI 代码（包含 CryptoMonitorPro、MonitorGUIPro 等）
-# …（你的所有类和函数代码）…
-# 在 crypto.py 顶层定义（不要放在 if __name__ == '__main__': 块内）
-def get_monitor():
-    # 返回当前监控对象，例如你在 main 部分创建的 MonitorGUIPro 对象中的 monitor 属性
-    return _global_monitor
 
 #==============================
 if __name__ == "__main__":
@@ -2438,6 +1634,9 @@ if __name__ == "__main__":
     if sys.platform == "win32":
         from ctypes import windll
         windll.shcore.SetProcessDpiAwareness(1)  # 高DPI支持
+    # 在程序启动时调用 prevent_sleep，并确保程序退出时恢复睡眠
+    prevent_sleep()
+    atexit.register(restore_sleep)
 
     # 读取配置（示例代码，可根据实际情况调整）
     try:
@@ -2446,13 +1645,14 @@ if __name__ == "__main__":
     except Exception:
         current_config = {}
 
-    # 创建 GUI 对象，并将 monitor 属性赋值给全局变量 _global_monitor
-    app_gui = MonitorGUIPro()
-    _global_monitor = app_gui.monitor  # 使得 get_monitor() 能够返回正确的监控对象
+    # 监控对象通过共享内存发布状态，Web 进程只拿到共享内存的名字
+    from state_bridge import SharedStateWriter
+    state_bridge = SharedStateWriter()
+    app_gui = MonitorGUIPro(state_bridge)
 
     # 启动 Web 服务器进程，注意使用 multiprocessing.Process
     from web_server import run_web_server  # web_server.py 文件中的 run_web_server 方法
-    web_server_process = multiprocessing.Process(target=run_web_server, args=(get_monitor,))
+    web_server_process = multiprocessing.Process(target=run_web_server, args=(state_bridge.name,))
     web_server_process.start()
 
     # 启动 GUI
@@ -2461,5 +1661,6 @@ if __name__ == "__main__":
     # 退出时关闭 Web 服务器进程
     web_server_process.terminate()
     web_server_process.join()
+    state_bridge.close()
 
 
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Web 面板的服务端推送（SSE）：
+  - 单个后台线程检查共享内存快照的序号，有新数据时才重新生成视图（表格行），与浏览器数量无关
+  - 与上一份视图逐行比较，只推送变化的行（diff）；没有变化时不发送任何数据
+  - 新连接先收到完整视图（snapshot），之后只收 diff；发送不及时的连接会被重新同步
+"""
+import json
+import time
+from datetime import datetime
+from queue import Queue, Empty, Full
+from threading import Lock, Thread
+from typing import Callable, Iterator, List, Optional
+
+
+def build_view_model(state: dict) -> dict:
+    """把监控快照转换成面板直接显示的表格行"""
+    stats = state.get('connection_stats') or {}
+    control = state.get('control') or {}
+    if not control.get('url'):
+        profile = "监控进程未开启指标端口（metrics_port），无法从面板控制性能采样"
+    elif control.get('profiling'):
+        profile = f"采样中，剩余 {control.get('profile_sweeps_left', 0)} 轮"
+    else:
+        profile = "未在采样"
+    updated = datetime.fromtimestamp(state.get('time', 0)).strftime('%H:%M:%S')
+    return {
+        'stats': [[f"已获取交易对 {stats.get('success_pairs', 0)}/{stats.get('total_pairs', 0)}，"
+                   f"最后更新 {stats.get('last_update') or '-'}，快照时间 {updated}"]],
+        'status': [[ex, status] for ex, status in state.get('exchange_status', {}).items()],
+        'leaderboard': [[entry['symbol'], f"{entry['change']:.2f}"] for entry in state.get('leaderboard', [])],
+        'alerts': [[r['timestamp'], r['exchange'], r['symbol'], r['message']] for r in state.get('alerts', [])],
+        'metrics': state.get('metrics', []),  # metrics.REGISTRY.summary() 的表格行
+        'profile': [[profile]],
+    }
+
+
+def diff_view(old: Optional[dict], new: dict) -> dict:
+    """逐表逐行比较，返回 {表名: {'n': 行数, 'rows': {行号: 行}}}，没有变化的表不出现"""
+    diff = {}
+    for section, rows in new.items():
+        old_rows = (old or {}).get(section, [])
+        changed = {i: row for i, row in enumerate(rows) if i >= len(old_rows) or old_rows[i] != row}
+        if changed or len(rows) != len(old_rows):
+            diff[section] = {'n': len(rows), 'rows': changed}
+    return diff
+
+
+class _Subscriber:
+    def __init__(self, maxsize: int):
+        self.queue: Queue = Queue(maxsize)
+        self.resync = False
+
+
+class DashboardFeed:
+    """
+    state_reader: SharedStateReader
+    poll_interval: 检查快照序号的间隔（秒），只读取共享内存头部
+    log_callback: 后台更新出错时的日志回调 (消息, 类别)，未提供时打印到标准输出
+    """
+
+    def __init__(self, state_reader, poll_interval: float = 0.5, queue_size: int = 64,
+                 log_callback: Optional[Callable] = None):
+        self.reader = state_reader
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.log_callback = log_callback
+        self.view: Optional[dict] = None
+        self.seq = 0
+        self.subscribers: List[_Subscriber] = []
+        self.lock = Lock()
+        self.stats = {'rebuilds': 0, 'diffs': 0, 'messages': 0, 'resyncs': 0}
+        self.running = True
+        self.thread = Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def log(self, message: str, category: str = 'warning') -> None:
+        if self.log_callback:
+            self.log_callback(message, category)
+        else:
+            print(f"[{category}] {message}")
+
+    def _run(self) -> None:
+        while self.running:
+            try:
+                self.update()
+            except Exception as e:
+                self.log(f"⚠️ 面板数据更新失败: {str(e)}", "warning")
+            time.sleep(self.poll_interval)
+
+    def update(self) -> bool:
+        """快照有更新时重新生成视图并推送 diff，返回是否推送"""
+        state = self.reader.read()
+        if state is None or self.reader.seq == self.seq:
+            return False
+        self.seq = self.reader.seq
+        view = build_view_model(state)
+        self.stats['rebuilds'] += 1
+        with self.lock:
+            diff = diff_view(self.view, view)
+            self.view = view
+            if not diff:
+                return False
+            self.stats['diffs'] += 1
+            message = self._event('diff', diff)
+            for subscriber in self.subscribers:
+                try:
+                    subscriber.queue.put_nowait(message)
+                    self.stats['messages'] += 1
+                except Full:
+                    subscriber.resync = True  # 客户端跟不上，下次发送完整视图
+        return True
+
+    @staticmethod
+    def _event(name: str, data: dict) -> str:
+        return f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    def stream(self) -> Iterator[str]:
+        """单个 SSE 连接的消息流（Flask Response 的生成器）"""
+        subscriber = _Subscriber(self.queue_size)
+        with self.lock:
+            self.subscribers.append(subscriber)
+            if self.view is not None:
+                subscriber.queue.put_nowait(self._event('snapshot', self.view))
+        try:
+            while self.running:
+                if subscriber.resync:
+                    with self.lock:
+                        subscriber.resync = False
+                        while not subscriber.queue.empty():
+                            subscriber.queue.get_nowait()
+                        self.stats['resyncs'] += 1
+                        message = self._event('snapshot', self.view)
+                else:
+                    try:
+                        message = subscriber.queue.get(timeout=1)
+                    except Empty:
+                        continue
+                yield message
+        finally:
+            with self.lock:
+                self.subscribers.remove(subscriber)
+
+    def subscriber_count(self) -> int:
+        with self.lock:
+            return len(self.subscribers)
+
+    def stop(self) -> None:
+        self.running = False
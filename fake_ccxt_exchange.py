@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+本地模拟的 ccxt 交易所（同步接口），用于离线压测监控循环：
+  - 提供 CryptoMonitorPro 用到的 load_markets / set_markets / fetch_ohlcv / fetch_tickers /
+    parse_timeframe / milliseconds / last_response_headers
+  - 可配置网络延迟（含抖动）、服务端限频（超出时抛 RateLimitExceeded 并返回 Retry-After）、随机错误率
+  - K线由 (交易对, 时间戳) 确定性生成，任意 since / limit 都能得到一致的数据，可以测试增量补齐
+  - parse_json 为 True 时响应先编码成 JSON 再解析，模拟 ccxt 解析响应的开销
+用法见 bench_sweep.py
+"""
+import json
+import math
+import random
+import time
+import zlib
+from threading import Lock
+from typing import Dict, List, Optional
+
+import ccxt
+
+TIMEFRAME_SECONDS = {'1m': 60, '3m': 180, '5m': 300, '15m': 900, '30m': 1800,
+                     '1h': 3600, '2h': 7200, '4h': 14400, '6h': 21600, '1d': 86400}
+
+
+class FakeExchange:
+    """
+    exchange_id: 交易所 ID（不要与 rate_limiter.EXCHANGE_LIMITS 中的真实交易所重名，否则使用真实限额）
+    pairs: USDT 交易对数量
+    latency / jitter: 每次请求的延迟与随机抖动（秒）
+    server_rps: 服务端每秒允许的请求数（0 为不限），客户端 rateLimit 按它设置
+    error_rate: 请求随机失败（NetworkError）的概率
+    """
+
+    def __init__(self, exchange_id: str = 'fakex', pairs: int = 100, latency: float = 0.05, jitter: float = 0.01,
+                 server_rps: float = 0, error_rate: float = 0.0, parse_json: bool = True, seed: int = 0):
+        self.id = exchange_id
+        self.pair_count = pairs
+        self.latency = latency
+        self.jitter = jitter
+        self.server_rps = server_rps
+        self.error_rate = error_rate
+        self.parse_json = parse_json
+        self.rateLimit = 1000 / server_rps if server_rps else 1
+        self.random = random.Random(seed)
+        self.markets: Dict[str, dict] = {}
+        self.currencies: Dict[str, dict] = {}
+        self.last_response_headers: Dict[str, str] = {}
+        self.lock = Lock()
+        self.allowance = server_rps
+        self.allowance_time = time.time()
+        self.requests: Dict[str, int] = {}
+        self.stats = {'requests': 0, 'rate_limited': 0, 'errors': 0}
+
+    # ---------- 市场数据 ----------
+    def _build_markets(self) -> Dict[str, dict]:
+        markets = {}
+        for i in range(self.pair_count):
+            base = f"SYM{i}"
+            markets[f"{base}/USDT"] = {'id': f"{base}USDT", 'symbol': f"{base}/USDT", 'base': base, 'quote': 'USDT',
+                                       'active': True, 'type': 'spot', 'spot': True}
+        return markets
+
+    def load_markets(self, reload: bool = False, params: Optional[dict] = None) -> Dict[str, dict]:
+        if not self.markets or reload:
+            self._request('load_markets')
+            self.markets = self._build_markets()
+        return self.markets
+
+    def set_markets(self, markets, currencies=None) -> Dict[str, dict]:
+        self.markets = dict(markets)
+        self.currencies = dict(currencies or {})
+        return self.markets
+
+    # ---------- ccxt 工具方法 ----------
+    @staticmethod
+    def parse_timeframe(timeframe: str) -> int:
+        return TIMEFRAME_SECONDS[timeframe]
+
+    @staticmethod
+    def milliseconds() -> int:
+        return int(time.time() * 1000)
+
+    # ---------- 请求模拟 ----------
+    def _request(self, method: str) -> None:
+        """计数、服务端限频、随机错误与网络延迟"""
+        with self.lock:
+            self.stats['requests'] += 1
+            self.requests[method] = self.requests.get(method, 0) + 1
+            if self.server_rps:
+                now = time.time()
+                self.allowance = min(self.server_rps, self.allowance + (now - self.allowance_time) * self.server_rps)
+                self.allowance_time = now
+                if self.allowance < 1:
+                    self.stats['rate_limited'] += 1
+                    self.last_response_headers = {'Retry-After': '1'}
+                    raise ccxt.RateLimitExceeded(f"{self.id} 429 Too Many Requests")
+                self.allowance -= 1
+            failed = self.error_rate and self.random.random() < self.error_rate
+            delay = max(self.latency + self.random.uniform(-self.jitter, self.jitter), 0)
+        time.sleep(delay)
+        if failed:
+            with self.lock:
+                self.stats['errors'] += 1
+            raise ccxt.NetworkError(f"{self.id} simulated network error")
+        self.last_response_headers = {}
+
+    def _respond(self, payload):
+        return json.loads(json.dumps(payload)) if self.parse_json else payload
+
+    def _close(self, symbol: str, index: int) -> float:
+        """确定性的价格曲线：每个交易对不同的基准价、周期与相位，叠加少量伪随机噪声"""
+        h = zlib.crc32(symbol.encode('utf-8'))
+        base = 1 + h % 5000 / 10
+        wave = 0.03 * math.sin(index / (20 + h % 50) + h % 7) + 0.01 * math.sin(index / (3 + h % 5))
+        noise = (zlib.crc32(f"{symbol}{index}".encode('utf-8')) % 1000 - 500) / 1e5
+        return round(base * (1 + wave + noise), 6)
+
+    def _candle(self, symbol: str, ts: int, timeframe_ms: int) -> List[float]:
+        index = ts // timeframe_ms
+        close = self._close(symbol, index)
+        open_ = self._close(symbol, index - 1)
+        return [ts, open_, max(open_, close) * 1.001, min(open_, close) * 0.999, close,
+                float(zlib.crc32(f"v{symbol}{index}".encode('utf-8')) % 10000)]
+
+    def fetch_ohlcv(self, symbol: str, timeframe: str = '1m', since: Optional[int] = None,
+                    limit: Optional[int] = None, params: Optional[dict] = None) -> List[list]:
+        self._request('fetch_ohlcv')
+        if symbol not in self.markets:
+            raise ccxt.BadSymbol(f"{self.id} does not have market symbol {symbol}")
+        timeframe_ms = self.parse_timeframe(timeframe) * 1000
+        limit = min(limit or 500, 1000)
+        last = self.milliseconds() // timeframe_ms * timeframe_ms  # 最后一根为未收盘K线
+        if since is None:
+            start = last - (limit - 1) * timeframe_ms
+        else:
+            start = -(-since // timeframe_ms) * timeframe_ms
+        stamps = range(start, min(last, start + (limit - 1) * timeframe_ms) + 1, timeframe_ms)
+        return self._respond([self._candle(symbol, ts, timeframe_ms) for ts in stamps])
+
+    def fetch_tickers(self, symbols: Optional[List[str]] = None, params: Optional[dict] = None) -> Dict[str, dict]:
+        self._request('fetch_tickers')
+        index = self.milliseconds() // 60000
+        return self._respond({s: {'symbol': s, 'last': self._close(s, index)} for s in (symbols or self.markets)})
+
+    def reset_stats(self) -> None:
+        with self.lock:
+            self.requests.clear()
+            self.stats = {'requests': 0, 'rate_limited': 0, 'errors': 0}
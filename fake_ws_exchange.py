@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+本地模拟的 WebSocket 交易所（币安组合流格式），用于离线调试K线推送：
+  python fake_ws_exchange.py --port 8765 --interval 0.5 --drop-after 30
+然后在配置中设置：
+  "enable_streaming": true, "stream_url": "ws://127.0.0.1:8765/stream"
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+import websockets
+
+TIMEFRAME_SECONDS = {'1m': 60, '3m': 180, '5m': 300, '15m': 900, '30m': 1800,
+                     '1h': 3600, '2h': 7200, '4h': 14400, '6h': 21600, '1d': 86400}
+
+
+class FakeKlineExchange:
+    """
+    按订阅的流推送随机游走K线：
+      interval: 推送间隔（秒）
+      drop_after: 每个连接推送该秒数后主动断开，用于测试断流回退（0 为不断开）
+      time_scale: K线时间加速倍数，便于快速产生收盘K线
+    """
+
+    def __init__(self, interval: float = 1.0, drop_after: float = 0, time_scale: float = 1.0,
+                 volatility: float = 0.002, seed: int = 0):
+        self.interval = interval
+        self.drop_after = drop_after
+        self.time_scale = time_scale
+        self.volatility = volatility
+        self.random = random.Random(seed)
+        self.prices: Dict[str, float] = {}
+        self.start = time.time()
+
+    def now_ms(self) -> int:
+        return int((self.start + (time.time() - self.start) * self.time_scale) * 1000)
+
+    def kline_message(self, stream: str) -> dict:
+        pair, _, timeframe = stream.partition('@kline_')
+        price = self.prices.get(pair, 100.0) * (1 + self.random.gauss(0, self.volatility))
+        self.prices[pair] = price
+        tf_ms = TIMEFRAME_SECONDS.get(timeframe, 60) * 1000
+        now_ms = self.now_ms()
+        open_time = now_ms // tf_ms * tf_ms
+        return {
+            'stream': stream,
+            'data': {
+                'e': 'kline', 'E': now_ms, 's': pair.upper(),
+                'k': {
+                    't': open_time, 'T': open_time + tf_ms - 1, 's': pair.upper(), 'i': timeframe,
+                    'o': f"{price:.8f}", 'h': f"{price:.8f}", 'l': f"{price:.8f}", 'c': f"{price:.8f}",
+                    'v': "1.0",
+                    # 距离收盘不足一个推送间隔时视为收盘K线
+                    'x': open_time + tf_ms - now_ms <= self.interval * 1000 * self.time_scale,
+                },
+            },
+        }
+
+    async def handler(self, ws) -> None:
+        request = getattr(ws, 'request', None)
+        path = request.path if request is not None else getattr(ws, 'path', '')
+        streams: List[str] = parse_qs(urlparse(path).query).get('streams', [''])[0].split('/')
+        streams = [s for s in streams if '@kline_' in s]
+        connected_at = time.time()
+        try:
+            while True:
+                if self.drop_after and time.time() - connected_at > self.drop_after:
+                    await ws.close()
+                    return
+                for stream in streams:
+                    await ws.send(json.dumps(self.kline_message(stream)))
+                await asyncio.sleep(self.interval)
+        except websockets.ConnectionClosed:
+            return
+
+    async def serve(self, host: str, port: int) -> None:
+        async with websockets.serve(self.handler, host, port):
+            await asyncio.Future()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地模拟的K线 WebSocket 交易所")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--interval', type=float, default=1.0)
+    parser.add_argument('--drop-after', type=float, default=0)
+    parser.add_argument('--time-scale', type=float, default=1.0)
+    args = parser.parse_args()
+    fake = FakeKlineExchange(args.interval, args.drop_after, args.time_scale)
+    print(f"模拟交易所已启动: ws://{args.host}:{args.port}/stream")
+    asyncio.run(fake.serve(args.host, args.port))
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+每轮监控的K线请求合并：
+  - 根据配置计算每个时间周期需要的最大窗口（全部监控交易对共用）；
+    单对监控的窗口按 (交易对, 时间周期) 单独计算，不放大其他交易对的请求
+  - 同一轮中每个 (交易所, 交易对, 时间周期) 只请求一次，其余调用方直接切片
+  - 多线程同时请求同一个 key 时只放行一个，其他线程等待结果
+"""
+import time
+from threading import Event, Lock
+from typing import Callable, Dict, Optional, Tuple
+
+
+def plan_windows(config: dict, include_price: bool = True) -> Dict[str, int]:
+    """
+    计算全部监控交易对在各时间周期所需的最大K线数量：
+      - 价格监控：price_period 根（include_price 为 False 时跳过，例如批量行情模式）
+      - 均线策略：max(periods) + 10 根
+    """
+    windows: Dict[str, int] = {}
+
+    def need(timeframe: str, limit: int) -> None:
+        if timeframe:
+            windows[timeframe] = max(windows.get(timeframe, 0), int(limit))
+
+    if include_price:
+        need(config.get('price_timeframe', "1m"), config.get('price_period', 15))
+    for strategy in config.get('ma_strategies', []):
+        periods = strategy.get('periods')
+        if periods:
+            need(strategy.get('timeframe'), max(periods) + 10)
+    return windows
+
+
+def plan_pair_windows(single_pair_strategies: Optional[dict]) -> Dict[Tuple[str, str], int]:
+    """单对监控各 (交易对, 时间周期) 所需的K线数量：策略1 ma_period + 10 根，策略2 2 根"""
+    windows: Dict[Tuple[str, str], int] = {}
+    for pair, strat in (single_pair_strategies or {}).items():
+        if not strat.get("enabled", False):
+            continue
+        s1 = strat.get("strategy1", {})
+        s2 = strat.get("strategy2", {})
+        for timeframe, limit in ((s1.get("timeframe", "5m"), s1.get("ma_period", 20) + 10),
+                                 (s2.get("timeframe", "5m"), 2)):
+            windows[(pair, timeframe)] = max(windows.get((pair, timeframe), 0), int(limit))
+    return windows
+
+
+class _InFlight:
+    """正在进行中的请求，等待方通过 event 获取结果"""
+
+    def __init__(self):
+        self.event = Event()
+        self.data = None
+
+
+class SweepFetchPlanner:
+    """
+    单轮请求合并器：
+      fetcher 签名与 safe_fetch_ohlcv 一致 (exchange, symbol, timeframe, limit)
+      ttl 为结果在同一轮内的最长复用时间（秒），避免跨线程拿到过旧数据
+    """
+
+    def __init__(self, fetcher: Callable, ttl: float = 30):
+        self.fetcher = fetcher
+        self.ttl = ttl
+        self.windows: Dict[str, int] = {}
+        self.pair_windows: Dict[Tuple[str, str], int] = {}
+        self.results: Dict[Tuple[str, str, str], Tuple[float, list]] = {}
+        self.in_flight: Dict[Tuple[str, str, str], _InFlight] = {}
+        self.lock = Lock()
+        self.stats = {'requests': 0, 'coalesced': 0}
+
+    def begin_sweep(self, config: dict, single_pair_strategies: Optional[dict] = None) -> None:
+        """新一轮开始：重新计算窗口并丢弃上一轮的结果"""
+        windows = plan_windows(config)
+        pair_windows = plan_pair_windows(single_pair_strategies)
+        with self.lock:
+            self.windows = windows
+            self.pair_windows = pair_windows
+            self.results.clear()
+            self.stats = {'requests': 0, 'coalesced': 0}
+
+    def fetch(self, exchange, symbol: str, timeframe: str, limit: int) -> Optional[list]:
+        """返回最近 limit 根K线，同一轮内同一 key 只真正请求一次"""
+        key = (exchange.id, symbol, timeframe)
+        owner = False
+        with self.lock:
+            window = max(self.windows.get(timeframe, 0), self.pair_windows.get((symbol, timeframe), 0), limit)
+            cached = self.results.get(key)
+            if cached and time.time() - cached[0] < self.ttl and len(cached[1]) >= limit:
+                self.stats['coalesced'] += 1
+                return cached[1][-limit:]
+            pending = self.in_flight.get(key)
+            if pending is None:
+                pending = self.in_flight[key] = _InFlight()
+                owner = True
+                self.stats['requests'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if owner:
+            data = None
+            try:
+                data = self.fetcher(exchange, symbol, timeframe, window)
+            finally:
+                with self.lock:
+                    if data:
+                        self.results[key] = (time.time(), data)
+                    self.in_flight.pop(key, None)
+                pending.data = data
+                pending.event.set()
+        else:
+            pending.event.wait()
+            data = pending.data
+
+        if data and len(data) >= limit:
+            return data[-limit:]
+        if data and not owner:
+            # 合并的窗口不够（例如本轮中途改了配置），单独补一次
+            return self.fetcher(exchange, symbol, timeframe, limit)
+        return data
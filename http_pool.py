@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+共享的 HTTP 长连接池：
+  - 通知（Telegram / 企业微信）、股票实时价格、代理与交易所连通性检测共用一个 requests.Session，
+    同一主机（含经代理访问）复用 keep-alive 连接，避免每次请求重新建立 TCP + TLS
+  - pool_maxsize 为单个主机的连接上限（达到上限时等待空闲连接），按工作线程数配置
+  - stats() 统计请求数与新建连接数，复用率 = 1 - 新建连接 / 请求
+"""
+from threading import Lock
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HTTPSessionPool:
+    """
+    pool_connections: 缓存的主机连接池数量（每个主机一个连接池）
+    pool_maxsize: 每个主机的最大连接数
+    """
+
+    def __init__(self, pool_maxsize: int = 10, pool_connections: int = 32):
+        self.lock = Lock()
+        self.session = requests.Session()
+        self.pool_maxsize = pool_maxsize
+        self.pool_connections = pool_connections
+        self.retired = {'requests': 0, 'connections': 0}  # 重新配置前旧连接池的累计数据
+        self._mount()
+
+    def _mount(self) -> None:
+        adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                              pool_maxsize=self.pool_maxsize, pool_block=True)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def configure(self, pool_maxsize: Optional[int] = None, pool_connections: Optional[int] = None) -> None:
+        """调整连接池大小（连接数不变时不重建，已有的长连接继续复用）"""
+        with self.lock:
+            pool_maxsize = pool_maxsize or self.pool_maxsize
+            pool_connections = pool_connections or self.pool_connections
+            if (pool_maxsize, pool_connections) == (self.pool_maxsize, self.pool_connections):
+                return
+            current = self._counters()
+            self.retired = {k: self.retired[k] + current[k] for k in self.retired}
+            old_adapter = self.session.get_adapter('https://')
+            self.pool_maxsize = pool_maxsize
+            self.pool_connections = pool_connections
+            self._mount()
+            old_adapter.close()
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def _counters(self) -> dict:
+        """汇总当前各主机连接池（直连与经代理）的请求数与新建连接数"""
+        adapter = self.session.get_adapter('https://')
+        managers = [adapter.poolmanager] + list(adapter.proxy_manager.values())
+        requests_count = connections = 0
+        for manager in managers:
+            for key in list(manager.pools.keys()):
+                pool = manager.pools.get(key)
+                if pool is not None:
+                    requests_count += pool.num_requests
+                    connections += pool.num_connections
+        return {'requests': requests_count, 'connections': connections}
+
+    def stats(self) -> dict:
+        with self.lock:
+            current = self._counters()
+            total = {k: self.retired[k] + current[k] for k in self.retired}
+        total['reused'] = max(total['requests'] - total['connections'], 0)
+        total['hit_rate'] = total['reused'] / total['requests'] if total['requests'] else 0.0
+        return total
+
+
+_pool: Optional[HTTPSessionPool] = None
+_pool_lock = Lock()
+
+
+def get_pool() -> HTTPSessionPool:
+    """进程内共享的连接池"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HTTPSessionPool()
+    return _pool
@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+增量指标计算：
+  - 每个 (交易所, 交易对, 时间周期) 维护各均线周期的滑动累加和
+  - 追加一根K线、修订最后一根K线（未收盘K线被改写）、撤销最后一根均为 O(1)
+  - sync() 用新获取的窗口与已有状态对齐：最近几根逐根比较，只有这几根变化时增量修订；
+    更早的K线只抽查最长均线窗口起点与重叠部分最早的一根，被改写（例如前复权重算）
+    或新K线出现 NaN / None 时全量重建，结果与 pandas rolling().mean() 一致
+  - 累加和定期用 math.fsum 重算，避免浮点误差累积
+"""
+import math
+import time
+from collections import deque
+from threading import Lock
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+
+def _to_float(value) -> float:
+    """None 按 NaN 处理（与 pandas 一致）"""
+    return float('nan') if value is None else float(value)
+
+
+class CandleColumn:
+    """把 ccxt K线列表的某一列包装成可索引序列，避免整列拷贝"""
+
+    def __init__(self, data: list, index: int):
+        self.data = data
+        self.index = index
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, i):
+        return self.data[i][self.index]
+
+
+class IndicatorState:
+    """单个交易对的增量 SMA 状态"""
+
+    def __init__(self, periods: Sequence[int], extra: int = 64, resync_every: int = 1000):
+        self.periods = tuple(sorted(set(int(p) for p in periods)))
+        self.maxlen = max(self.periods) + extra  # 多保留一些历史，撤销最后一根时可以恢复滑出窗口的值
+        self.keys: deque = deque(maxlen=self.maxlen)
+        self.values: deque = deque(maxlen=self.maxlen)
+        self.totals: Dict[int, float] = {p: 0.0 for p in self.periods}
+        self.resync_every = resync_every
+        self._updates = 0
+        self.nonfinite = False  # 保留的历史中有 NaN / inf 时累加和无法增量维护，每次对齐都全量重建
+        self.lock = Lock()
+        self.last_access = time.time()
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def last_key(self):
+        return self.keys[-1] if self.keys else None
+
+    def reset(self) -> None:
+        self.keys.clear()
+        self.values.clear()
+        self.totals = {p: 0.0 for p in self.periods}
+        self._updates = 0
+        self.nonfinite = False
+
+    def _resync(self) -> None:
+        n = len(self.values)
+        for p in self.periods:
+            window = [self.values[i] for i in range(max(n - p, 0), n)]
+            # 窗口内有 NaN / inf 时与 rolling().mean() 一样得到 NaN
+            self.totals[p] = math.fsum(window) if all(map(math.isfinite, window)) else float('nan')
+        self._updates = 0
+
+    def _tick(self) -> None:
+        self._updates += 1
+        if self._updates >= self.resync_every:
+            self._resync()
+
+    def append(self, key: Hashable, value: float) -> None:
+        """追加一根新K线"""
+        value = _to_float(value)
+        n = len(self.values)
+        for p in self.periods:
+            self.totals[p] += value
+            if n >= p:
+                self.totals[p] -= self.values[n - p]
+        self.keys.append(key)
+        self.values.append(value)
+        self._tick()
+
+    def revise(self, value: float) -> None:
+        """改写最后一根K线的收盘价"""
+        value = _to_float(value)
+        delta = value - self.values[-1]
+        if delta:
+            for p in self.periods:
+                self.totals[p] += delta
+            self.values[-1] = value
+            self._tick()
+
+    def pop(self) -> None:
+        """撤销最后一根K线，恢复此前滑出窗口的值"""
+        n = len(self.values)
+        last = self.values[-1]
+        for p in self.periods:
+            self.totals[p] -= last
+            if n - 1 - p >= 0:
+                self.totals[p] += self.values[n - 1 - p]
+        self.keys.pop()
+        self.values.pop()
+        self._tick()
+
+    def load(self, keys: Sequence, values: Sequence) -> None:
+        """全量重建（首次加载或无法对齐时使用）"""
+        self.reset()
+        start = max(len(keys) - self.maxlen, 0)
+        for i in range(start, len(keys)):
+            self.keys.append(keys[i])
+            self.values.append(_to_float(values[i]))
+        self.nonfinite = not all(map(math.isfinite, self.values))
+        self._resync()
+
+    def sync(self, keys: Sequence, values: Sequence, max_scan: int = 50, max_pops: int = 3) -> None:
+        """
+        与新获取的窗口对齐：
+          - 在新窗口尾部查找当前最后一根K线，之后的K线依次追加，最近几根有变化的按修订处理
+          - 找不到时（例如最后一根是临时插入的实时价格）先撤销最后一根再找
+          - 仍然对不上、或已保留的历史中有 NaN / inf 时全量重建
+        """
+        if not len(keys):
+            return
+        if self.nonfinite:
+            self.load(keys, values)
+            return
+        for _ in range(max_pops + 1):
+            if not self.keys:
+                break
+            last_key = self.keys[-1]
+            n = len(keys)
+            for j in range(n - 1, max(n - 1 - max_scan, -1), -1):
+                if keys[j] == last_key:
+                    self._merge(keys, values, j)
+                    return
+            if len(self.keys) <= max(self.periods):
+                break
+            self.pop()
+        self.load(keys, values)
+
+    def _merge(self, keys: Sequence, values: Sequence, j: int, depth: int = 3) -> None:
+        """
+        新窗口第 j 根与当前最后一根对应：逐根比较最近 depth + 1 根，
+        只有最近 depth 根被修订时增量改写，再追加 j 之后的新K线；
+        更早的历史只抽查两根（复权重算会改写全部历史K线），保持每次对齐 O(depth)；
+        有变化、时间戳对不上或新值不是有限数时全量重建
+        """
+        overlap = min(len(self.values), j + 1)
+        recent = min(overlap, depth + 1)
+        rewrite = 0
+        for i in range(recent):
+            if keys[j - i] != self.keys[-1 - i]:
+                self.load(keys, values)
+                return
+            if _to_float(values[j - i]) != self.values[-1 - i]:
+                rewrite = i + 1
+        for i in (min(self.periods[-1], overlap) - 1, overlap - 1):
+            if i >= recent and (keys[j - i] != self.keys[-1 - i] or _to_float(values[j - i]) != self.values[-1 - i]):
+                self.load(keys, values)
+                return
+        if rewrite > depth or not all(math.isfinite(_to_float(values[i])) for i in range(j - rewrite + 1, len(keys))):
+            self.load(keys, values)
+            return
+        if rewrite == 1:
+            self.revise(values[j])
+        elif rewrite > 1:
+            for _ in range(rewrite):
+                self.pop()
+            for i in range(j - rewrite + 1, j + 1):
+                self.append(keys[i], values[i])
+        for i in range(j + 1, len(keys)):
+            self.append(keys[i], values[i])
+
+    def sma(self, period: int) -> float:
+        """最新一根K线上的 period 周期均值，数据不足时返回 NaN（与 rolling().mean() 一致）"""
+        if len(self.values) < period:
+            return float('nan')
+        return self.totals[period] / period
+
+    def tail(self, n: int) -> List[float]:
+        m = len(self.values)
+        return [self.values[i] for i in range(max(m - n, 0), m)]
+
+
+class IndicatorStore:
+    """多交易对的增量指标状态（线程安全），周期组合变化时自动重建"""
+
+    def __init__(self):
+        self.states: Dict[Hashable, IndicatorState] = {}
+        self.lock = Lock()
+
+    def sync(self, key: Hashable, periods: Sequence[int], keys: Sequence, values: Sequence) -> Tuple[Dict[int, float], List[float]]:
+        """
+        对齐状态后返回 ({period: 最新均值}, 最近10根收盘价)
+        """
+        with self.lock:
+            state = self.states.get(key)
+            if state is None or state.periods != tuple(sorted(set(int(p) for p in periods))):
+                state = self.states[key] = IndicatorState(periods)
+        with state.lock:
+            state.last_access = time.time()
+            state.sync(keys, values)
+            return {p: state.sma(p) for p in periods}, state.tail(10)
+
+    def get(self, key: Hashable) -> Optional[IndicatorState]:
+        with self.lock:
+            return self.states.get(key)
+
+    def evict_idle(self, max_idle: float) -> int:
+        """清理超过 max_idle 秒未使用的状态，返回清理数量"""
+        now_time = time.time()
+        with self.lock:
+            stale = [k for k, st in self.states.items() if now_time - st.last_access > max_idle]
+            for k in stale:
+                del self.states[k]
+        return len(stale)
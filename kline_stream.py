@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+WebSocket K线推送接入：
+  - 订阅监控交易对的 kline 流，实时写入 K线缓存、price_data 与 base_prices
+  - 价格周期的K线收盘时立即做一次价格警报判断，不必等下一轮轮询
+  - 连接断开或某个交易对长时间无推送时，回退到 safe_fetch_ohlcv 轮询，直到推送恢复
+  - 本地调试可配合 fake_ws_exchange.py 离线运行
+"""
+import asyncio
+import json
+import time
+import ccxt
+from threading import Thread
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import websockets
+    WEBSOCKETS_AVAILABLE = True
+except ImportError:
+    WEBSOCKETS_AVAILABLE = False
+
+# 目前只接入币安的组合流格式（fake_ws_exchange.py 使用同样的格式）
+KLINE_STREAM_URLS = {
+    'binance': 'wss://stream.binance.com:9443/stream',
+}
+STREAMS_PER_CONNECTION = 200  # 单个连接订阅的流数量上限（币安限制为 1024）
+
+
+def stream_name(symbol: str, timeframe: str) -> str:
+    """'BTC/USDT' + '1m' -> 'btcusdt@kline_1m'；合约 'BTC/USDT:USDT' 去掉结算币后缀 -> 'btcusdt@kline_1m'"""
+    return f"{symbol.split(':', 1)[0].replace('/', '').replace('-', '').lower()}@kline_{timeframe}"
+
+
+def is_derivative(symbol: str) -> bool:
+    """ccxt 统一符号中带结算币（'BTC/USDT:USDT'）的是合约"""
+    return ':' in symbol
+
+
+class KlineStreamIngestor:
+    """
+    单个交易所的 K线推送接入器，运行在独立线程的事件循环中
+      stale_after: 某个交易对超过该秒数没有推送即视为断流，改用 REST 轮询
+      poll_interval: 断流期间 REST 轮询间隔（秒）
+    订阅的交易对在创建时确定（symbols），监控范围变化后由 CryptoMonitorPro.start_streaming 停止并重建；
+    是否可以跳过 REST 请求由K线缓存的 stream_updated 判断（断档时清零）。
+    组合流地址只提供现货K线，合约交易对不订阅（与同名现货流名称相同），继续由轮询获取
+    """
+
+    def __init__(self, monitor, exchange_id: str, symbols: Iterable[str], timeframes: Iterable[str],
+                 url: Optional[str] = None, stale_after: float = 30, poll_interval: float = 60):
+        self.monitor = monitor
+        self.exchange_id = exchange_id
+        self.symbols = frozenset(symbols)
+        self.timeframes = list(dict.fromkeys(timeframes))
+        self.url = url or KLINE_STREAM_URLS.get(exchange_id)
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+        # 流名称 -> (symbol, timeframe)
+        self.streams: Dict[str, tuple] = {
+            stream_name(s, tf): (s, tf) for s in self.symbols if not is_derivative(s) for tf in self.timeframes
+        }
+        self.timeframe_ms = {tf: ccxt.Exchange.parse_timeframe(tf) * 1000 for tf in self.timeframes}
+        self.last_update: Dict[str, float] = {}
+        self.live_streams = set()  # 所在连接当前处于连接状态的流
+        self.running = False
+        self.thread: Optional[Thread] = None
+        self.stats = {'messages': 0, 'reconnects': 0, 'fallback_polls': 0}
+
+    def log(self, message: str, category: str = 'log') -> None:
+        self.monitor.log(message, category)
+
+    def start(self) -> bool:
+        if not WEBSOCKETS_AVAILABLE:
+            self.log("websockets 未安装，无法启用K线推送，继续使用轮询", 'warning')
+            return False
+        if not self.url:
+            self.log(f"{self.exchange_id} 暂不支持K线推送，继续使用轮询", 'warning')
+            return False
+        self.running = True
+        self.thread = Thread(target=lambda: asyncio.run(self._run()), daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self) -> None:
+        self.running = False
+
+    def dropped_symbols(self) -> List[tuple]:
+        """返回当前断流、需要 REST 轮询的 (symbol, timeframe)"""
+        now_time = time.time()
+        return [(s, tf) for name, (s, tf) in self.streams.items()
+                if name not in self.live_streams or now_time - self.last_update.get(name, 0) >= self.stale_after]
+
+    def handle_message(self, raw: str) -> None:
+        """解析一条组合流消息，把K线写入缓存与价格数据"""
+        msg = json.loads(raw)
+        data = msg.get('data', msg)
+        if data.get('e') != 'kline':
+            return
+        name = msg.get('stream') or stream_name(data['s'], data['k']['i'])
+        target = self.streams.get(name)
+        if target is None:
+            return
+        symbol, timeframe = target
+        k = data['k']
+        candle = [int(k['t']), float(k['o']), float(k['h']), float(k['l']), float(k['c']), float(k['v'])]
+        now_time = time.time()
+        self.last_update[name] = now_time
+        self.stats['messages'] += 1
+
+        buffer = self.monitor.ohlcv_cache.get(self.exchange_id, symbol, timeframe)
+        if buffer is not None and len(buffer):
+            with buffer.lock:
+                if candle[0] <= buffer.last_timestamp + self.timeframe_ms[timeframe]:
+                    buffer.extend([candle])
+                    buffer.stream_updated = now_time
+                    self.monitor.persist_ohlcv(self.exchange_id, symbol, timeframe, [candle])
+                else:
+                    # 断流期间缺了K线，交给下一次 REST 增量请求补齐后再继续使用推送
+                    buffer.stream_updated = 0.0
+                    buffer = None
+        self.monitor.store_price(symbol, candle[4])  # 连接统计由轮询时按轮计入，不随推送频率增长
+
+        # 价格周期K线收盘：立即判断价格警报
+        config = self.monitor.config
+        if (k.get('x') and buffer is not None and config.get('enable_price_monitor', False)
+                and timeframe == config.get('price_timeframe', "1m")
+                and config.get('price_monitor_mode', 'ohlcv') != 'ticker'):
+            price_period = config.get('price_period', 15)
+            with buffer.lock:
+                window = buffer.tail(price_period)
+            self.monitor.evaluate_price_alert(self.exchange_id, symbol, window)
+
+    async def _consume(self, names: List[str]) -> None:
+        """维持一个连接，断开后指数退避重连"""
+        delay = 1
+        url = f"{self.url}?streams={'/'.join(names)}"
+        while self.running and self.monitor.running.is_set():
+            try:
+                async with websockets.connect(url, ping_interval=20, ping_timeout=20) as ws:
+                    self.live_streams.update(names)
+                    delay = 1
+                    async for raw in ws:
+                        if not self.running:
+                            break
+                        try:
+                            self.handle_message(raw)
+                        except Exception as e:
+                            self.log(f"⚠️ K线推送解析失败: {str(e)}", 'warning')
+            except Exception as e:
+                self.log(f"⚠️ {self.exchange_id} K线推送断开，{delay} 秒后重连: {str(e)}", 'warning')
+            self.live_streams.difference_update(names)
+            self.stats['reconnects'] += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60)
+
+    async def _fallback_loop(self) -> None:
+        """断流期间对受影响的交易对使用 safe_fetch_ohlcv 轮询"""
+        while self.running and self.monitor.running.is_set():
+            await asyncio.sleep(self.poll_interval)
+            exchange = self.monitor.exchanges.get(self.exchange_id)
+            if exchange is None:
+                continue
+            dropped = self.dropped_symbols()
+            if dropped:
+                self.log(f"⚠️ {self.exchange_id} {len(dropped)} 个K线流断流，回退 REST 轮询", 'warning')
+            for symbol, timeframe in dropped:
+                if not self.running:
+                    break
+                limit = self.monitor.fetch_planner.windows.get(timeframe) or self.monitor.config.get('price_period', 15)
+                await asyncio.to_thread(self.monitor.safe_fetch_ohlcv, exchange, symbol, timeframe, limit)
+                self.stats['fallback_polls'] += 1
+
+    async def _run(self) -> None:
+        names = list(self.streams)
+        chunks = [names[i:i + STREAMS_PER_CONNECTION] for i in range(0, len(names), STREAMS_PER_CONNECTION)]
+        skipped = sum(1 for s in self.symbols if is_derivative(s))
+        note = f"，{skipped} 个合约交易对继续轮询" if skipped else ""
+        self.log(f"📡 {self.exchange_id} 订阅 {len(names)} 个K线流（{len(chunks)} 个连接）{note}", 'log')
+        await asyncio.gather(self._fallback_loop(), *(self._consume(chunk) for chunk in chunks))
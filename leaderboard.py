@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+增量维护的涨跌幅排行榜：
+  - 写入价格时按涨跌幅插入有序列表（二分查找定位），不再每次读取时全量排序
+  - 涨幅榜 / 跌幅榜前 N 名直接从有序列表两端切片，O(N)
+  - 读取使用缓存快照：同一轮内有变化时最多每 snapshot_ttl 秒重建一次，
+    新一轮开始（new_sweep）后第一次读取一定重建
+  - 使用独立的锁，读写都不占用 CryptoMonitorPro.data_lock
+"""
+import math
+import time
+from bisect import bisect_left, insort
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class LeaderboardIndex:
+    def __init__(self, snapshot_ttl: float = 5.0):
+        self.snapshot_ttl = snapshot_ttl
+        self.changes: Dict[str, float] = {}
+        self.prices: Dict[str, Tuple[float, float]] = {}  # symbol -> (当前价, 基准价)
+        self.order: List[Tuple[float, str]] = []  # 按 (涨跌幅, 交易对) 升序
+        self.lock = Lock()
+        self.version = 0
+        self.generation = 0
+        self._snapshot: Optional[dict] = None
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def _discard(self, symbol: str) -> None:
+        old = self.changes.pop(symbol, None)
+        if old is not None:
+            del self.order[bisect_left(self.order, (old, symbol))]
+            self.prices.pop(symbol, None)
+            self.version += 1
+
+    def _update(self, symbol: str, price: float, base_price: float) -> None:
+        if not base_price or base_price <= 0 or price is None:
+            self._discard(symbol)  # 基准价失效的交易对退出排行，不保留旧排名
+            return
+        change = (price - base_price) / base_price * 100
+        if math.isnan(change):
+            self._discard(symbol)
+            return
+        self.prices[symbol] = (price, base_price)
+        old = self.changes.get(symbol)
+        if old == change:
+            return
+        if old is not None:
+            del self.order[bisect_left(self.order, (old, symbol))]
+        insort(self.order, (change, symbol))
+        self.changes[symbol] = change
+        self.version += 1
+
+    def update(self, symbol: str, price: float, base_price: float) -> None:
+        """写入一个交易对的最新价格，O(log n) 定位 + 列表移位"""
+        with self.lock:
+            self._update(symbol, price, base_price)
+
+    def update_many(self, items: Iterable[Tuple[str, float, float]]) -> None:
+        """批量写入 (symbol, price, base_price)，只加一次锁"""
+        with self.lock:
+            for symbol, price, base_price in items:
+                self._update(symbol, price, base_price)
+
+    def remove(self, symbols: Iterable[str]) -> None:
+        with self.lock:
+            for symbol in symbols:
+                self._discard(symbol)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.changes.clear()
+            self.prices.clear()
+            self.order.clear()
+            self.version += 1
+
+    def new_sweep(self) -> None:
+        """新一轮开始：下一次读取重新生成快照"""
+        with self.lock:
+            self.generation += 1
+
+    def _entry(self, change: float, symbol: str) -> dict:
+        price, base_price = self.prices[symbol]
+        return {
+            "symbol": symbol,
+            "exchange": "N/A",
+            "current_price": price,
+            "base_price": base_price,
+            "change": change
+        }
+
+    def snapshot(self, top_n: int = 10) -> Tuple[List[dict], List[dict]]:
+        """返回 (涨幅榜前 top_n, 跌幅榜前 top_n)，快照内的列表不要修改"""
+        with self.lock:
+            snap = self._snapshot
+            if snap is not None and snap['top_n'] >= top_n and (
+                    snap['version'] == self.version or
+                    (snap['generation'] == self.generation and time.time() - snap['time'] < self.snapshot_ttl)):
+                return snap['top'][:top_n], snap['bottom'][:top_n]
+            size = max(top_n, snap['top_n'] if snap else 0)
+            top = [self._entry(c, s) for c, s in reversed(self.order[-size:])] if size else []
+            bottom = [self._entry(c, s) for c, s in self.order[:size]]
+            self._snapshot = {'top_n': size, 'version': self.version, 'generation': self.generation,
+                              'time': time.time(), 'top': top, 'bottom': bottom}
+            return top[:top_n], bottom[:top_n]
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+跨交易对的向量化均线判断：
+  - 同一时间周期下所有交易对的收盘价放在一个二维数组中（每行一个交易对）
+  - 短/中/长期均线、中轨 1% 偏离、最近10根K线与中轨的关系一次性计算
+  - 判断规则与 CryptoMonitorPro.evaluate_ma_strategy 完全一致
+"""
+import numpy as np
+from typing import List, Tuple
+
+
+def evaluate_ma_universe(symbols: List[str], closes: np.ndarray, periods: List[int],
+                         enable_bullish: bool, enable_bearish: bool) -> List[Tuple[str, str, str]]:
+    """
+    closes: 形状为 (交易对数, K线数) 的收盘价数组，最后一列为最新K线
+    返回 [(symbol, alert_type, message), ...]
+    """
+    if not len(symbols) or not (enable_bullish or enable_bearish):
+        return []
+    ma_short, ma_medium, ma_long = periods
+    short_val = closes[:, -ma_short:].mean(axis=1)
+    medium_val = closes[:, -ma_medium:].mean(axis=1)
+    long_val = closes[:, -ma_long:].mean(axis=1)
+    current_price = closes[:, -1]
+    recent = closes[:, -10:]
+
+    # 中轨偏离超过 1% 的交易对直接排除（NaN 行的比较结果均为 False，不会触发）
+    with np.errstate(divide='ignore', invalid='ignore'):
+        near_medium = np.abs(current_price - medium_val) / medium_val <= 0.01
+
+    alerts = []
+    if enable_bullish:
+        bullish = (near_medium & (short_val > medium_val) & (medium_val > long_val)
+                   & (recent > medium_val[:, None]).all(axis=1))
+        alerts.extend((symbols[i], "bullish", f"{symbols[i]} 形成多头排列") for i in np.flatnonzero(bullish))
+    if enable_bearish:
+        bearish = (near_medium & (short_val < medium_val) & (medium_val < long_val)
+                   & (recent < medium_val[:, None]).all(axis=1))
+        alerts.extend((symbols[i], "bearish", f"{symbols[i]} 形成空头排列") for i in np.flatnonzero(bearish))
+    return alerts
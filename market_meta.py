@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+交易所市场数据（load_markets 结果）的本地快照：
+  - 每个交易所一个 JSON 文件，记录快照格式版本、ccxt 版本与保存时间
+  - 启动时快照未过期（ttl）且 ccxt 版本一致时直接 set_markets，不再等待数 MB 的市场数据下载
+  - 后台刷新后与旧数据比较，只返回新增 / 下架 / 变化的交易对，由调用方增量更新交易对缓存
+"""
+import json
+import os
+import time
+from typing import Dict, Optional, Set, Tuple
+
+import ccxt
+
+SNAPSHOT_VERSION = 1
+
+
+def diff_markets(old: Dict[str, dict], new: Dict[str, dict]) -> Tuple[Set[str], Set[str], Set[str]]:
+    """返回 (新增, 移除, 内容变化) 的交易对集合"""
+    added = new.keys() - old.keys()
+    removed = old.keys() - new.keys()
+    changed = {s for s in new.keys() & old.keys() if new[s] != old[s]}
+    return set(added), set(removed), changed
+
+
+class MarketMetadataCache:
+    """
+    root: 快照目录
+    ttl: 快照有效期（秒），超过后启动时仍同步加载市场数据
+    """
+
+    def __init__(self, root: str, ttl: float = 86400):
+        self.root = root
+        self.ttl = ttl
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, exchange_id: str) -> str:
+        return os.path.join(self.root, f"{exchange_id}.json")
+
+    def load(self, exchange_id: str) -> Optional[dict]:
+        """读取未过期的快照，返回 {'markets', 'currencies', 'saved_at'}；不可用时返回 None"""
+        path = self._path(exchange_id)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (ValueError, OSError):
+            return None
+        if (snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get('ccxt_version') != ccxt.__version__
+                or time.time() - snapshot.get('saved_at', 0) > self.ttl or not snapshot.get('markets')):
+            return None
+        return snapshot
+
+    def save(self, exchange_id: str, markets: Dict[str, dict], currencies: Optional[dict] = None) -> None:
+        path = self._path(exchange_id)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': SNAPSHOT_VERSION, 'ccxt_version': ccxt.__version__, 'saved_at': time.time(),
+                       'markets': markets, 'currencies': currencies or {}}, f, default=str)
+        os.replace(tmp, path)
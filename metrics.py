@@ -0,0 +1,352 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+进程内运行指标（无第三方依赖）：
+  - Counter / Histogram 按标签分组累计，Gauge 在导出时调用登记的函数取当前值（例如队列长度）
+  - REGISTRY.render() 输出 Prometheus 文本格式，start_metrics_server 在本地端口提供 /metrics
+  - REGISTRY.summary() 输出表格行（次数、平均、P50/P95 估计），随监控状态发布到 Web 面板
+  - InstrumentedLock 替代 threading.Lock，记录每次获取锁的等待时间
+  - register_action 在同一端口登记 POST 操作（例如 /profile 开关性能采样）
+指标名与标签见文件末尾的定义。分片模式下工作进程不开端口，每轮把 Counter / Histogram 的累计值
+（REGISTRY.snapshot()）随 sweep 消息交回主进程，主进程的 /metrics 与面板输出全部进程的合计；Gauge 只反映主进程。
+"""
+import bisect
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from urllib.parse import parse_qs, urlsplit
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SWEEP_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+LOCK_BUCKETS = (0.000001, 0.00001, 0.0001, 0.001, 0.01, 0.1, 1)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = '') -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.lock = Lock()
+        self.remote: Dict[str, dict] = {}  # 来源（例如 shard0）-> 该进程最近一次的累计值，导出时与本进程合计
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self.values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def export(self) -> dict:
+        with self.lock:
+            return dict(self.values)
+
+    def items(self) -> List[Tuple[Tuple, float]]:
+        with self.lock:
+            merged = dict(self.values)
+            remotes = list(self.remote.values())
+        for values in remotes:
+            for k, v in values.items():
+                merged[k] = merged.get(k, 0) + v
+        return sorted(merged.items())
+
+    def render(self) -> List[str]:
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_format(v)}" for k, v in self.items()]
+
+    def rows(self) -> List[list]:
+        items = self.items()
+        return [[self.name, ','.join(map(str, k)), _format(v), '', '', ''] for k, v in items]
+
+
+class Gauge(_Metric):
+    """当前值由登记的函数在导出时计算，同一组标签重复登记时以最后一次为准"""
+    kind = 'gauge'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self.functions: Dict[Tuple, Callable[[], float]] = {}
+
+    def track(self, *labels, function: Callable[[], float]) -> None:
+        with self.lock:
+            self.functions[labels] = function
+
+    def untrack(self, *labels) -> None:
+        with self.lock:
+            self.functions.pop(labels, None)
+
+    def collect(self) -> List[Tuple[Tuple, float]]:
+        with self.lock:
+            functions = sorted(self.functions.items())
+        values = []
+        for labels, function in functions:
+            try:
+                values.append((labels, float(function())))
+            except Exception:
+                continue  # 对象已释放或暂不可用时跳过
+        return values
+
+    def render(self) -> List[str]:
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_format(v)}" for k, v in self.collect()]
+
+    def rows(self) -> List[list]:
+        return [[self.name, ','.join(map(str, k)), _format(v), '', '', ''] for k, v in self.collect()]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[Tuple, list] = {}  # 标签 -> [各桶计数（非累计，最后一个为 +Inf）, 总和, 次数]
+
+    def observe(self, value: float, *labels) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labels) -> '_Timer':
+        """with metric.time(标签...): 记录代码块的耗时"""
+        return _Timer(self, labels)
+
+    def export(self) -> dict:
+        with self.lock:
+            return {k: (list(v[0]), v[1], v[2]) for k, v in self.series.items()}
+
+    def snapshot(self) -> List[Tuple[Tuple, List[int], float, int]]:
+        with self.lock:
+            merged = {k: [list(v[0]), v[1], v[2]] for k, v in self.series.items()}
+            remotes = list(self.remote.values())
+        for series in remotes:
+            for k, (counts, total_sum, count) in series.items():
+                target = merged.setdefault(k, [[0] * (len(self.buckets) + 1), 0.0, 0])
+                target[0] = [a + b for a, b in zip(target[0], counts)]
+                target[1] += total_sum
+                target[2] += count
+        return [(k, v[0], v[1], v[2]) for k, v in sorted(merged.items())]
+
+    def quantile(self, counts: List[int], total: int, q: float) -> float:
+        """按桶内线性插值估计分位数（与 Prometheus histogram_quantile 相同的近似）"""
+        rank = q * total
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return lower  # 落在 +Inf 桶，只能给出下界
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return 0.0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, counts, total_sum, count in self.snapshot():
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else _format(bound)
+                extra = f'le="{le}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, extra)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_format(total_sum)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+    def rows(self) -> List[list]:
+        rows = []
+        for labels, counts, total_sum, count in self.snapshot():
+            if not count:
+                continue
+            rows.append([self.name, ','.join(map(str, labels)), str(count), _seconds(total_sum / count),
+                         _seconds(self.quantile(counts, count, 0.5)), _seconds(self.quantile(counts, count, 0.95))])
+        return rows
+
+
+def _seconds(value: float) -> str:
+    if value >= 1:
+        return f"{value:.2f}s"
+    if value >= 0.001:
+        return f"{value * 1000:.1f}ms"
+    return f"{value * 1e6:.0f}µs"
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram: Histogram, labels: Tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> Dict[str, dict]:
+        """本进程 Counter / Histogram 的累计值（可跨进程传递），交给另一进程的 merge_remote"""
+        return {m.name: m.export() for m in self.metrics if hasattr(m, 'export')}
+
+    def merge_remote(self, source: str, snapshot: Dict[str, dict]) -> None:
+        """记录来源 source 的最新累计值（替换该来源上一次的值，不重复累加）"""
+        by_name = {m.name: m for m in self.metrics}
+        for name, values in snapshot.items():
+            metric = by_name.get(name)
+            if metric is not None:
+                with metric.lock:
+                    metric.remote[source] = values
+
+    def summary(self) -> List[list]:
+        """[指标, 标签, 次数/值, 平均, P50, P95] 表格行（没有数据的指标不出现）"""
+        rows = []
+        for metric in self.metrics:
+            rows.extend(metric.rows())
+        return rows
+
+
+REGISTRY = Registry()
+
+
+class InstrumentedLock:
+    """与 threading.Lock 用法相同，额外记录获取锁的等待时间（未竞争时记为 0）"""
+
+    def __init__(self, name: str, histogram: Optional[Histogram] = None):
+        self.name = name
+        self._lock = Lock()
+        self._histogram = histogram or LOCK_WAIT_SECONDS
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        if self._lock.acquire(False):
+            self._histogram.observe(0.0, self.name)
+            return True
+        if not blocking:
+            return False
+        start = time.perf_counter()
+        acquired = self._lock.acquire(True, timeout)
+        self._histogram.observe(time.perf_counter() - start, self.name)
+        return acquired
+
+    def release(self) -> None:
+        self._lock.release()
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+ACTIONS: Dict[str, Callable[[Dict[str, str]], str]] = {}
+
+
+def register_action(path: str, handler: Callable[[Dict[str, str]], str]) -> None:
+    """POST path?参数 时调用 handler(参数字典)，返回值作为响应文本；同一路径以最后一次登记为准"""
+    ACTIONS[path] = handler
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def _reply(self, code: int, text: str) -> None:
+        body = text.encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        handler = ACTIONS.get(url.path)
+        if handler is None:
+            self.send_error(404)
+            return
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            self._reply(200, handler(params) + '\n')
+        except Exception as e:
+            self._reply(400, f"{type(e).__name__}: {e}\n")
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        self._reply(200, REGISTRY.render())
+
+    def log_message(self, format, *args):
+        pass  # 抓取请求不写日志
+
+
+def start_metrics_server(port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """在后台线程提供 http://host:port/metrics，返回服务器对象（shutdown() 停止）"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+
+# ======================== 指标定义 ========================
+FETCH_SECONDS = REGISTRY.register(Histogram(
+    'monitor_fetch_seconds', '交易所请求耗时（秒）', ('exchange', 'endpoint')))
+FETCH_ERRORS = REGISTRY.register(Counter(
+    'monitor_fetch_errors_total', '交易所请求失败次数（按异常类型）', ('exchange', 'endpoint', 'error')))
+FETCH_RETRIES = REGISTRY.register(Counter(
+    'monitor_fetch_retries_total', 'K线获取重试次数（按异常类型）', ('exchange', 'error')))
+SWEEP_SECONDS = REGISTRY.register(Histogram(
+    'monitor_sweep_seconds', '一轮监控耗时（秒）', ('engine',), SWEEP_BUCKETS))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'monitor_queue_depth', '队列中等待处理的条数', ('queue',)))
+NOTIFY_SECONDS = REGISTRY.register(Histogram(
+    'monitor_notify_seconds', '通知发送耗时（秒，含失败）', ('channel', 'result')))
+LOCK_WAIT_SECONDS = REGISTRY.register(Histogram(
+    'monitor_lock_wait_seconds', '获取锁的等待时间（秒）', ('lock',), LOCK_BUCKETS))
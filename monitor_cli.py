@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+无界面命令行入口（Linux 服务器可用）：
+  python -m monitor_cli run --config config.json      启动监控，Ctrl+C / SIGTERM 停止（--web 同时启动 Web 面板）
+  python -m monitor_cli startup --repeat 5             在新进程中测量冷启动导入耗时
+  python -m monitor_cli replay capture.jsonl.gz        用记录的行情日志离线重跑监控（虚拟时钟，不等待真实时间）
+  python -m monitor_cli run --profile 3                采样前 3 轮的调用栈，写出火焰图折叠栈（profiler.py）
+
+只导入 monitor_core，不加载 tkinter / akshare；run 启动时输出各阶段耗时（导入、初始化、交易所连接）。
+"""
+import argparse
+import copy
+import json
+import signal
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from threading import Thread
+
+# 这些模块出现在 sys.modules 中说明被提前加载了
+HEAVY_MODULES = ('tkinter', 'akshare', 'pandas', 'talib', 'websockets', 'dash')
+
+
+def load_config(path: str, defaults: dict) -> dict:
+    config = copy.deepcopy(defaults)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            user_config = json.load(f)
+    except FileNotFoundError:
+        print(f"⚠️ 未找到配置文件 {path}，使用默认配置")
+        return config
+    if not isinstance(user_config, dict):
+        raise ValueError(f"配置文件格式错误: {path}")
+    config.update(user_config)
+    return config
+
+
+def run(args) -> int:
+    t0 = time.perf_counter()
+    from monitor_core import CryptoMonitorPro, DEFAULT_CONFIG, prevent_sleep, restore_sleep
+    import_seconds = time.perf_counter() - t0
+
+    config = load_config(args.config, DEFAULT_CONFIG)
+    if args.engine:
+        config['engine'] = args.engine
+    if args.shards:
+        config['shard_workers'] = args.shards
+    if args.capture:
+        config['capture_path'] = args.capture
+    if args.metrics_port:
+        config['metrics_port'] = args.metrics_port
+    if args.profile:
+        config['profile_sweeps'] = args.profile
+    if args.profile_dir:
+        config['profile_dir'] = args.profile_dir
+
+    def log(message: str, category: str = 'log') -> None:
+        if category == 'debug' and not args.verbose:
+            return
+        print(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} [{category}] {message}", flush=True)
+
+    t1 = time.perf_counter()
+    monitor = CryptoMonitorPro(config, log)
+    init_seconds = time.perf_counter() - t1
+    state_bridge = web_process = None
+    if args.web:
+        # Web 面板在独立进程中运行，通过共享内存读取监控状态
+        import multiprocessing
+        from state_bridge import SharedStateWriter
+        from web_server import run_web_server
+        state_bridge = SharedStateWriter()
+        monitor.state_bridge = state_bridge
+        web_process = multiprocessing.Process(target=run_web_server, args=(state_bridge.name, args.host, args.port),
+                                              daemon=True)
+        web_process.start()
+    monitor.init_complete.wait()
+    connect_seconds = time.perf_counter() - t1
+    monitor.publish_state()
+    log(f"⏱ 冷启动耗时: 导入 {import_seconds:.2f}s，初始化 {init_seconds:.2f}s，"
+        f"交易所连接完成 {connect_seconds:.2f}s（总计 {time.perf_counter() - t0:.2f}s）")
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    if loaded:
+        log(f"已加载的可选依赖: {', '.join(loaded)}", 'debug')
+
+    prevent_sleep()
+    worker = Thread(target=monitor.run_engine, daemon=True)
+    worker.start()
+
+    def stop(signum, frame):
+        log("收到退出信号，正在停止监控...")
+        monitor.running.clear()
+
+    def toggle_profiling(signum, frame):
+        # 运行中 kill -USR1 <pid>：未采样时开始采样，采样中则立即结束并写出结果
+        if monitor.profiler is None:
+            Thread(target=monitor.start_profiling, args=(args.profile or 3,), daemon=True).start()
+        else:
+            Thread(target=monitor.stop_profiling, daemon=True).start()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    if hasattr(signal, 'SIGUSR1'):  # Windows 没有 SIGUSR1
+        signal.signal(signal.SIGUSR1, toggle_profiling)
+    deadline = time.time() + args.duration if args.duration else None
+    try:
+        while monitor.running.is_set() and worker.is_alive():
+            if deadline and time.time() >= deadline:
+                break
+            worker.join(0.5)
+    finally:
+        monitor.shutdown()
+        restore_sleep()
+        if web_process is not None:
+            web_process.terminate()
+            web_process.join()
+            state_bridge.close()
+        log("监控系统已停止")
+    return 0
+
+
+def replay(args) -> int:
+    """按记录的轮次重跑监控，输出每轮警报数与全部警报"""
+    from capture import ReplayLog, replay_monitor
+    from monitor_core import DEFAULT_CONFIG
+
+    config = load_config(args.config, DEFAULT_CONFIG)
+    t0 = time.perf_counter()
+    capture_log = ReplayLog(*args.logs)
+    if capture_log.start is None:
+        print("行情日志为空")
+        return 1
+    print(f"读取 {capture_log.count} 条记录（{len(capture_log.exchanges)} 个交易所，{len(capture_log.sweeps)} 轮），"
+          f"耗时 {time.perf_counter() - t0:.2f}s")
+
+    def log(message: str, category: str = 'log') -> None:
+        if args.verbose:
+            print(f"[{category}] {message}", flush=True)
+
+    def on_sweep(index: int, start: float, alert_counts: dict) -> None:
+        print(f"第 {index + 1} 轮 {datetime.fromtimestamp(start).strftime('%Y-%m-%d %H:%M:%S')} "
+              f"多头 {alert_counts['bullish']} 空头 {alert_counts['bearish']}", flush=True)
+
+    t1 = time.perf_counter()
+    monitor = replay_monitor(capture_log, config, log, speed=args.speed, on_sweep=on_sweep)
+    elapsed = time.perf_counter() - t1
+    records = monitor.history.get_records()
+    monitor.shutdown()
+    span = capture_log.end - capture_log.start
+    print(f"回放 {span / 3600:.2f} 小时的行情用时 {elapsed:.1f}s（{span / elapsed if elapsed else 0:.0f} 倍速），"
+          f"警报 {len(records)} 条")
+    for record in records:
+        print(f"  {record['exchange']} {record['symbol']} [{record['type']}] {record['message']}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+def measure_startup(args) -> int:
+    """在新的解释器进程中导入模块，取多次的中位数（避免同一进程内模块已缓存）"""
+    probe = ("import sys, time; t = time.perf_counter(); import {module}; "
+             "print(time.perf_counter() - t); print(','.join(m for m in {heavy!r} if m in sys.modules) or '-')")
+    for module in args.modules:
+        samples, loaded = [], ''
+        for _ in range(args.repeat):
+            result = subprocess.run([sys.executable, '-c', probe.format(module=module, heavy=HEAVY_MODULES)],
+                                    capture_output=True, text=True)
+            if result.returncode != 0:
+                print(f"{module}: 导入失败\n{result.stderr.strip()}")
+                break
+            lines = result.stdout.strip().splitlines()
+            samples.append(float(lines[-2]))
+            loaded = lines[-1]
+        else:
+            print(f"{module}: 中位数 {statistics.median(samples):.3f}s，最小 {min(samples):.3f}s"
+                  f"（{args.repeat} 次），已加载: {loaded if loaded != '-' else '无'}")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='monitor_cli', description='加密货币监控（无界面）')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_run = sub.add_parser('run', help='启动监控')
+    p_run.add_argument('--config', default='config.json', help='配置文件（与 GUI 保存的 config.json 格式相同）')
+    p_run.add_argument('--engine', choices=['thread', 'async', 'sharded'], help='覆盖配置中的监控引擎')
+    p_run.add_argument('--shards', type=int, help='sharded 引擎的工作进程数（默认 CPU 核数）')
+    p_run.add_argument('--duration', type=float, default=0, help='运行指定秒数后退出（0 表示一直运行）')
+    p_run.add_argument('--verbose', action='store_true', help='输出 debug 日志')
+    p_run.add_argument('--web', action='store_true', help='同时启动 Web 面板（web_server.py）')
+    p_run.add_argument('--host', default='0.0.0.0', help='Web 面板监听地址')
+    p_run.add_argument('--port', type=int, default=5000, help='Web 面板端口')
+    p_run.add_argument('--capture', help='把交易所响应记录到该文件（gzip JSON 行），供 replay 使用')
+    p_run.add_argument('--metrics-port', type=int, help='在本地端口提供 Prometheus 格式的 /metrics')
+    p_run.add_argument('--profile', type=int, default=0, metavar='SWEEPS',
+                       help='启动后采样前 SWEEPS 轮的调用栈并写出火焰图折叠栈；运行中发送 SIGUSR1 也可开关采样')
+    p_run.add_argument('--profile-dir', help='采样结果目录（默认 profiles）')
+    p_run.set_defaults(func=run)
+
+    p_replay = sub.add_parser('replay', help='用记录的行情日志离线重跑监控')
+    p_replay.add_argument('logs', nargs='+', help='行情日志（分片模式下的多个文件可以一起传入）')
+    p_replay.add_argument('--config', default='config.json', help='监控配置（可与记录时不同，用于比较策略参数）')
+    p_replay.add_argument('--speed', type=float, default=0, help='按真实时间的倍数等待（0 表示不等待）')
+    p_replay.add_argument('--verbose', action='store_true', help='输出监控日志')
+    p_replay.add_argument('--json', help='把警报写入 JSON 文件')
+    p_replay.set_defaults(func=replay)
+
+    p_start = sub.add_parser('startup', help='测量冷启动导入耗时')
+    p_start.add_argument('--repeat', type=int, default=5)
+    p_start.add_argument('modules', nargs='*', default=['monitor_core'], help='要测量的模块（默认 monitor_core）')
+    p_start.set_defaults(func=measure_startup)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1762 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+监控核心（不依赖 GUI）：
+  - AlertHistory、Telegram / 企业微信通知、MemoryOptimizer、CryptoMonitorPro
+  - 只在模块加载时导入 ccxt / numpy 等必需依赖；pandas、TA-Lib、推送与异步引擎在用到时才导入，
+    因此可以在没有 tkinter / akshare 的 Linux 服务器上无界面运行（见 monitor_cli.py）
+  - DEFAULT_CONFIG 为 GUI 与命令行共用的默认配置
+"""
+import ccxt
+import time
+import json
+import os
+import sys
+import threading
+import numpy as np
+from datetime import datetime
+from threading import Thread, Event, Lock
+from bisect import bisect_left, bisect_right
+from typing import TYPE_CHECKING, Any, Callable, Optional, Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from ohlcv_cache import OHLCVCache
+from fetch_planner import SweepFetchPlanner, plan_windows
+from ticker_snapshot import TickerPriceHistory, evaluate_price_alerts
+from ma_engine import evaluate_ma_universe
+from indicators import IndicatorStore, CandleColumn
+from rate_limiter import RateLimiterRegistry
+from sweep_scheduler import AdaptiveSweepScheduler, pair_urgency
+from leaderboard import LeaderboardIndex
+from alert_dispatch import AlertDispatcher, RetryAfter
+from http_pool import get_pool
+from alert_store import SQLiteAlertStore, retention_seconds
+from ohlcv_store import OHLCVDiskStore
+from market_meta import MarketMetadataCache, diff_markets
+from metrics import (REGISTRY, FETCH_SECONDS, FETCH_ERRORS, FETCH_RETRIES, SWEEP_SECONDS, QUEUE_DEPTH,
+                     InstrumentedLock, register_action, start_metrics_server)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+_talib = None
+
+
+def load_talib():
+    """第一次计算均线时才尝试导入 TA-Lib，不可用时返回 None"""
+    global _talib
+    if _talib is None:
+        try:
+            import talib
+            _talib = talib
+        except ImportError:
+            _talib = False
+    return _talib or None
+
+
+DEFAULT_CONFIG = {
+    "exchanges": ["binance"],
+    "proxy": "",
+    "check_interval": 300,
+    "max_pairs": 500,
+    "enable_price_monitor": True,
+    "price_timeframe": "5m",
+    "price_threshold": 5.0,
+    "price_direction": "both",
+    "price_monitor_mode": "ohlcv",
+    "excluded_pairs": "",
+    "enable_wechat": False,
+    "wechat_webhook": "",
+    "ma_strategies": [{
+        "periods": [5, 20, 60],
+        "timeframe": "1h"
+    }],
+    "data_retention": "6小时",
+    "mem_interval": 600,
+    "engine": "thread",
+    "incremental_indicators": False,
+    "sweep_mode": "fixed",
+    "history_db": "",
+    "ohlcv_store_dir": "",
+    "market_cache_dir": "market_cache",
+    "capture_path": "",
+    "metrics_port": 0,
+    "profile_sweeps": 0,
+    "profile_dir": "profiles",
+    "enable_tg": False,
+    "tg_token": "",
+    "tg_chat_id": "",
+    "enable_bearish_ma": False,
+    "enable_bullish_ma": False
+}
+
+
+# ======================== 警报历史记录 ========================
+class AlertHistory:
+    """
+    用于记录并查询历史警报信息（线程安全）：
+      - 记录按时间顺序保存为元组，附带数值时间戳，时间范围查询用二分查找
+      - 按交易对 / 交易所 / 类型建立二级索引（记录序号列表），筛选时只遍历命中的记录
+      - query 支持分页，界面只取当前页的记录
+      - 传入 store（SQLiteAlertStore）时记录同时异步写入数据库，查询改由数据库分页返回，
+        内存中只保留最近 max_records 条
+    """
+    FIELDS = ('timestamp', 'exchange', 'symbol', 'message', 'type', 'timeframe', 'period')
+    INDEXED = {'exchange': 1, 'symbol': 2, 'type': 4}  # 建索引的字段 -> 在 FIELDS 中的位置
+
+    def __init__(self, max_records: int = 1000, log_callback: Optional[Callable] = None,
+                 store: Optional[SQLiteAlertStore] = None):
+        self.max_records = max_records
+        self.store = store
+        self._ts: List[float] = []     # 数值时间戳（升序）
+        self._rows: List[tuple] = []   # 与 _ts 对应的记录
+        self._head = 0                 # 列表前部已淘汰的记录数，累积到一定数量后统一压缩
+        self._base = 0                 # _rows[0] 的全局序号
+        self._index: Dict[str, Dict[str, List[int]]] = {field: {} for field in self.INDEXED}
+        self.lock = Lock()
+        self.stats = {
+            "bullish_signals": 0,  # 多头信号数
+            "bearish_signals": 0   # 空头信号数
+        }
+        self.log_callback = log_callback  # 新增日志回调
+
+    def __len__(self) -> int:
+        return len(self._rows) - self._head
+
+    def add_record(self, record: dict) -> None:
+        """添加一条警报记录"""
+        ts = datetime.strptime(record['timestamp'], '%Y-%m-%d %H:%M:%S').timestamp()
+        row = tuple(record.get(field) for field in self.FIELDS)
+        with self.lock:
+            if self._ts and ts < self._ts[-1]:
+                ts = self._ts[-1]  # 保持时间戳有序（同一秒内的记录顺序不变）
+            seq = self._base + len(self._rows)
+            self._ts.append(ts)
+            self._rows.append(row)
+            for field, pos in self.INDEXED.items():
+                self._index[field].setdefault(row[pos], []).append(seq)
+            if len(self) > self.max_records:
+                self._head += 1
+                if self._head >= max(1024, len(self._rows) // 2):
+                    self._compact()
+            if record['type'] == 'bullish':
+                self.stats["bullish_signals"] += 1
+            elif record['type'] == 'bearish':
+                self.stats["bearish_signals"] += 1
+        if self.store is not None:
+            self.store.add(ts, row)
+        if self.log_callback:  # 通过回调记录日志
+            self.log_callback(f"⚠️ 记录警报: {record}", "log")
+
+    def _compact(self) -> None:
+        """丢弃已淘汰的记录，并从索引中移除对应序号"""
+        del self._ts[:self._head]
+        del self._rows[:self._head]
+        self._base += self._head
+        self._head = 0
+        for values in self._index.values():
+            for key in list(values):
+                seqs = values[key]
+                del seqs[:bisect_left(seqs, self._base)]
+                if not seqs:
+                    del values[key]
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取当前的监控统计信息"""
+        with self.lock:
+            return self.stats.copy()
+
+    def _select(self, start_time: Optional[datetime], end_time: Optional[datetime], filters: dict):
+        """返回满足条件的记录序号（升序），调用方需持有锁"""
+        lo = bisect_left(self._ts, start_time.timestamp(), self._head) if start_time else self._head
+        hi = bisect_right(self._ts, end_time.timestamp(), self._head) if end_time else len(self._rows)
+        lo += self._base
+        hi += self._base
+        filters = {field: value for field, value in filters.items() if value}
+        if not filters:
+            return range(lo, max(lo, hi))
+        # 从命中最少的索引开始，再逐条检查其余条件
+        field = min(filters, key=lambda f: len(self._index[f].get(filters[f], ())))
+        seqs = self._index[field].get(filters.pop(field), [])
+        seqs = seqs[bisect_left(seqs, lo):bisect_left(seqs, hi)]
+        if filters:
+            seqs = [seq for seq in seqs
+                    if all(self._rows[seq - self._base][self.INDEXED[f]] == v for f, v in filters.items())]
+        return seqs
+
+    def _to_dict(self, seq: int) -> dict:
+        return dict(zip(self.FIELDS, self._rows[seq - self._base]))
+
+    def query(self, start_time: datetime = None, end_time: datetime = None, alert_type: str = None,
+              symbol: str = None, exchange: str = None, offset: int = 0, limit: Optional[int] = None,
+              newest_first: bool = True) -> List[dict]:
+        """分页查询历史记录，默认最新的在前"""
+        if self.store is not None:
+            self.store.flush_pending(end_time.timestamp() if end_time else None)
+            return self.store.query(start_time.timestamp() if start_time else None,
+                                    end_time.timestamp() if end_time else None,
+                                    alert_type, symbol, exchange, offset, limit, newest_first)
+        with self.lock:
+            seqs = self._select(start_time, end_time, {'type': alert_type, 'symbol': symbol, 'exchange': exchange})
+            if newest_first:
+                seqs = seqs[::-1]
+            page = seqs[offset:offset + limit] if limit is not None else seqs[offset:]
+            return [self._to_dict(seq) for seq in page]
+
+    def count(self, start_time: datetime = None, end_time: datetime = None, alert_type: str = None,
+              symbol: str = None, exchange: str = None) -> int:
+        """满足条件的记录数（用于计算分页）"""
+        if self.store is not None:
+            self.store.flush_pending(end_time.timestamp() if end_time else None)
+            return self.store.count(start_time.timestamp() if start_time else None,
+                                    end_time.timestamp() if end_time else None, alert_type, symbol, exchange)
+        with self.lock:
+            return len(self._select(start_time, end_time, {'type': alert_type, 'symbol': symbol, 'exchange': exchange}))
+
+    def get_records(self, start_time: datetime = None,
+                    end_time: datetime = None,
+                    alert_type: str = None) -> List[dict]:
+        """按条件筛选历史记录"""
+        return self.query(start_time, end_time, alert_type, newest_first=False)
+
+    def purge(self, max_age: float) -> None:
+        """删除数据库中超过 max_age 秒的记录（内存中的记录由 max_records 限制）"""
+        if self.store is not None:
+            self.store.purge(time.time() - max_age)
+
+    def close(self) -> None:
+        """写入队列中剩余的记录并关闭数据库"""
+        if self.store is not None:
+            self.store.close()
+
+
+# ======================== Telegram通知 ========================
+class TelegramNotifier:
+    """用于发送Telegram通知"""
+
+    def __init__(self, token: str, chat_ids: list):
+        self.base_url = f"https://api.telegram.org/bot{token}/sendMessage"
+        # chat_ids 现在可以是一个包含多个聊天ID的列表
+        self.chat_ids = chat_ids if isinstance(chat_ids, list) else [chat_ids]
+        self.enabled = False
+
+    def test_connection(self) -> bool:
+        """测试连接，发送测试消息"""
+        try:
+            return self._send_telegram_message({'text': '📡 监控系统连接测试成功'})
+        except Exception:
+            return False
+
+    def send_message(self, message: str) -> bool:
+        """发送消息到Telegram"""
+        if not self.chat_ids:  # 检查配置有效性
+            return False
+        if not self.enabled:
+            return False
+        return self._send_telegram_message({'text': message})
+
+    def _send_telegram_message(self, params: dict) -> bool:
+        """内部方法，尝试多次发送消息"""
+        params.update({
+            'parse_mode': 'Markdown'
+        })
+        for chat_id in self.chat_ids:
+            params['chat_id'] = chat_id
+            for _ in range(3):
+                try:
+                    response = get_pool().post(self.base_url, params=params, timeout=5)
+                    response.raise_for_status()
+                    break  # 如果消息发送成功，停止重试
+                except Exception:
+                    time.sleep(2)
+            else:
+                # 如果尝试了3次都失败，返回False
+                return False
+        return True
+
+    def deliver(self, chat_id, message: str) -> bool:
+        """单次发送到一个聊天（供 AlertDispatcher 调用，重试由调度器负责），限频时抛出 RetryAfter"""
+        response = get_pool().post(self.base_url, params={'text': message, 'parse_mode': 'Markdown',
+                                                        'chat_id': chat_id}, timeout=5)
+        if response.status_code == 429:
+            raise RetryAfter(response.json().get('parameters', {}).get('retry_after', 5))
+        response.raise_for_status()
+        return True
+# ======================== 企业微信通知 ========================
+class EnterpriseWeChatNotifier:
+    def __init__(self, webhook_url: str):
+        self.webhook_url = webhook_url
+        self.enabled = False
+
+    def test_connection(self) -> bool:
+        """发送测试消息，检查 webhook 是否可用"""
+        return self.send_message("【测试】企业微信提醒连接测试成功")
+
+    def send_message(self, message: str) -> bool:
+        payload = {
+            "msgtype": "text",
+            "text": {
+                "content": message
+            }
+        }
+        try:
+            response = get_pool().post(self.webhook_url, json=payload, timeout=5)
+            response.raise_for_status()
+            # 根据企业微信返回信息判断是否成功
+            result = response.json()
+            if result.get("errcode") == 0:
+                return True
+        except Exception as e:
+            print("企业微信发送异常:", e)
+        return False
+
+    def deliver(self, message: str) -> bool:
+        """单次发送（供 AlertDispatcher 调用），超过频率限制（errcode 45009）时抛出 RetryAfter"""
+        response = get_pool().post(self.webhook_url, json={"msgtype": "text", "text": {"content": message}}, timeout=5)
+        response.raise_for_status()
+        errcode = response.json().get("errcode")
+        if errcode == 45009:
+            raise RetryAfter(60)
+        return errcode == 0
+
+
+# ======================== 内存清理线程 ========================
+class MemoryOptimizer(Thread):
+    """定期清理缓存与历史数据，避免内存过高"""
+
+    def __init__(self, monitor, interval: int = 600):
+        super().__init__(daemon=True)
+        self.monitor = monitor
+        self.running = True
+        self.interval = interval
+
+    def run(self) -> None:
+        while self.running:
+            self.monitor.cleanup_data()
+            time.sleep(self.interval)
+    
+    def stop(self):
+        self.running = False
+
+# 全局辅助函数
+def clean_symbol(symbol):
+    # 如果 symbol 中出现多次 USDT，则保留第一次出现前的部分+"/USDT"
+    if symbol.count("USDT") > 1:
+        base = symbol.split("/")[0]
+        return f"{base}/USDT"
+    return symbol
+# ======================== 监控核心类 ========================
+class CryptoMonitorPro:
+    """
+    核心监控类：
+      - 初始化交易所连接
+      - 定时获取K线数据、价格数据
+      - 分析价格变化及均线策略（支持多组均线策略）
+      - 发送警报（包含Telegram通知与日志记录）
+    """
+
+    def __init__(self, config: Dict, log_callback: Optional[Callable] = None):
+        self.config = config
+        self.log_callback = log_callback
+        self.running = Event()  # 这里用 Event 对象替代布尔值
+        self.running.set()       # 设置为运行状态
+        self.init_complete = Event()
+        # 初始配置数据
+        self.price_data: Dict[str, dict] = {}
+        self.base_prices: Dict[str, float] = {}  # 新增：记录每个交易对的基准价格
+        self.leaderboard = LeaderboardIndex()  # 按涨跌幅增量排序，get_leaderboard 直接切片
+        self.single_pair_strategies = {}  # 用于存储单对监控配置，key 为交易对代码
+        self.exchanges: Dict[str, ccxt.Exchange] = {}
+        self.exchange_status: Dict[str, str] = {}
+        self.last_leaderboard_log_time = 0 
+        # 定义冷却时间，单位为秒（例如 300 秒即 5 分钟）
+        self.alert_cooldown = self.config.get("alert_cooldown", 6000)
+        self.last_alert_time: Dict[Tuple[str, str], float] = {}  # 存储每个 (symbol, alert_type) 的上次提醒时间
+
+        
+
+
+        # 数据缓存与统计
+        self.market_cache: Dict[str, dict] = {}
+        self.ma_data: Dict[str, dict] = {}
+        self.usdt_pairs_cache: Dict[str, List[str]] = {}
+        # 市场数据快照（market_cache_dir）：启动时直接使用，后台刷新后只增量更新变化的交易对
+        self.market_meta: Optional[MarketMetadataCache] = None
+        self._market_refreshing = set()
+        if config.get('market_cache_dir'):
+            try:
+                self.market_meta = MarketMetadataCache(config['market_cache_dir'],
+                                                       config.get('market_cache_ttl', 86400))
+            except Exception as e:
+                self.log(f"⚠️ 市场数据快照不可用: {str(e)}", "warning")
+        self.ohlcv_cache = OHLCVCache()  # K线环形缓存，按 (交易所, 交易对, 周期) 增量更新
+        # K线落盘（ohlcv_store_dir）：重启后从本地回填缓存，只增量请求停机期间的K线
+        self.ohlcv_store: Optional[OHLCVDiskStore] = None
+        self._rehydrate_checked = set()
+        if config.get('ohlcv_store_dir'):
+            try:
+                self.ohlcv_store = OHLCVDiskStore(config['ohlcv_store_dir'], log_callback=log_callback)
+                self.base_prices.update(self.ohlcv_store.load_base_prices())
+            except Exception as e:
+                self.log(f"⚠️ K线本地存储不可用: {str(e)}", "warning")
+        # 行情记录（capture_path）：交易所响应写入 gzip 日志，可用 capture.replay_monitor 离线回放
+        self.capture = None
+        if config.get('capture_path'):
+            try:
+                from capture import open_writer  # 仅在启用记录时导入
+                self.capture = open_writer(config['capture_path'])
+            except Exception as e:
+                self.log(f"⚠️ 行情记录不可用: {str(e)}", "warning")
+        self.fetch_planner = SweepFetchPlanner(self.safe_fetch_ohlcv)  # 每轮请求合并
+        self.rate_limiters = RateLimiterRegistry(self.config.get('rate_limit_utilization', 0.8))  # 按交易所共享限速
+        self.sweep_schedulers: Dict[str, AdaptiveSweepScheduler] = {}  # 自适应调度（sweep_mode 为 'adaptive'）
+        self.ticker_history: Dict[str, TickerPriceHistory] = {}  # 批量行情模式下的价格快照历史
+        self.stream_ingestors: Dict[str, Any] = {}  # 各交易所的K线推送接入器（enable_streaming）
+        self.indicators = IndicatorStore()  # 增量均线状态（incremental_indicators）
+        self.data_lock = InstrumentedLock('data_lock')  # 记录等待时间（metrics.LOCK_WAIT_SECONDS）
+        self.stats_lock = InstrumentedLock('stats_lock')
+        self.connection_stats = {
+            'total_pairs': 0,
+            'success_pairs': 0,
+            'last_update': None
+        }
+        # 共享内存状态通道（state_bridge.SharedStateWriter），由启动方设置，Web 进程从中读取
+        self.state_bridge = None
+        # 修改历史记录初始化
+        # 配置 history_db 时警报历史同时写入 SQLite，重启后仍可查询
+        history_store = None
+        if config.get('history_db'):
+            try:
+                history_store = SQLiteAlertStore(config['history_db'], log_callback=log_callback)
+            except Exception as e:
+                self.log(f"⚠️ 警报历史数据库打开失败，仅保存在内存: {str(e)}", "warning")
+        self.history = AlertHistory(config.get('history_max_records', 1000), log_callback=log_callback,
+                                    store=history_store)  # 传递日志回调
+        if history_store is not None:
+            QUEUE_DEPTH.track('history_db', function=history_store.queue.qsize)
+
+        # 通知类（Telegram）
+        self.notifier = TelegramNotifier(config['tg_token'], config['tg_chat_id'])
+        # 通知类（企业微信）
+        self.wechat_notifier = EnterpriseWeChatNotifier(config.get("wechat_webhook", ""))
+        # 警报异步发送：监控线程入队后立即返回，同一渠道短时间内的警报合并发送
+        self.dispatcher = AlertDispatcher(window=config.get('alert_coalesce_window', 2.0), log_callback=log_callback)
+        # 通知与连通性检测共用长连接池：单主机连接上限 = 监控线程（最多10个）+ 警报发送线程
+        get_pool().configure(pool_maxsize=config.get('http_pool_maxsize', 10 + self.dispatcher.workers))
+        for chat_id in self.notifier.chat_ids:
+            self.dispatcher.register(f"telegram:{chat_id}",
+                                     lambda text, chat_id=chat_id: self.notifier.deliver(chat_id, text), 4000)
+        self.dispatcher.register("wechat", self.wechat_notifier.deliver, 2000)
+        QUEUE_DEPTH.track('alerts', function=self.dispatcher.queue.qsize)
+        # 运行指标（metrics_port）：run_engine 启动监控循环时才监听端口，未运行的监控对象不占用
+        self.metrics_server = None
+        self.closed = False
+        # 采样式性能分析（profiler.py）：开启后采样 profile_sweeps 轮，结束时写出火焰图折叠栈
+        self.profiler = None
+        self.profile_sweeps_left = 0
+        if config.get('profile_sweeps'):
+            self.start_profiling(config['profile_sweeps'])
+        if config.get('enable_tg'):
+            self.notifier.enabled = True
+            self.notify("🚀 加密货币监控系统已启动", wechat=False)
+        if config.get("enable_wechat"):
+            self.wechat_notifier.enabled = True
+            self.notify("🚀 加密货币监控系统已启动（企业微信通知）", telegram=False)
+
+
+        # 初始化交易所
+        Thread(target=self.init_exchanges_with_retry, daemon=True).start()
+
+        # 启动内存优化线程
+        self.optimizer = MemoryOptimizer(self, config.get('mem_interval', 600))
+        self.optimizer.start()
+
+    def log(self, message: str, category: str = 'log') -> None:
+        """统一日志记录，同时回调给GUI显示"""
+        if self.log_callback:
+            self.log_callback(message, category)
+
+    @staticmethod
+    def _is_usdt_market(symbol: str, market: dict) -> bool:
+        return ((symbol.endswith('/USDT') or symbol.endswith('-USDT') or 'usdt' in symbol.lower())
+                and market.get('active'))
+
+    def get_markets(self, exchange_id: str) -> Dict:
+        """
+        获取交易所市场数据，同时维护USDT交易对缓存
+        市场数据已在连接时加载（或来自本地快照），超过 market_refresh_interval 秒后在后台刷新，不阻塞调用方
+        """
+        exchange = self.exchanges[exchange_id]
+        with self.data_lock:
+            cache = self.market_cache.get(exchange_id)
+            if cache is None:
+                markets = exchange.markets or {}
+                self.market_cache[exchange_id] = {'timestamp': datetime.now(), 'markets': markets}
+                self.usdt_pairs_cache[exchange_id] = [
+                    clean_symbol(s) for s in markets if self._is_usdt_market(s, markets[s])
+                ]
+                self.log(f"✅ 交易所 {exchange_id} 可用交易对: {len(self.usdt_pairs_cache[exchange_id])} 个", "log")
+                return markets
+            stale = (datetime.now() - cache['timestamp']).total_seconds() >= self.config.get('market_refresh_interval', 3600)
+            if stale and exchange_id not in self._market_refreshing:
+                self._market_refreshing.add(exchange_id)
+                Thread(target=self.refresh_markets, args=(exchange_id,), daemon=True).start()
+            return cache['markets']
+
+    def refresh_markets(self, exchange_id: str) -> None:
+        """后台重新加载市场数据，与旧数据比较后只更新变化的交易对，并保存快照"""
+        exchange = self.exchanges[exchange_id]
+        try:
+            old = dict(exchange.markets or {})
+            markets = exchange.load_markets(reload=True)
+            added, removed, changed = diff_markets(old, markets)
+            with self.data_lock:
+                pairs = self.usdt_pairs_cache.get(exchange_id)
+                if pairs is None:
+                    self.usdt_pairs_cache[exchange_id] = [
+                        clean_symbol(s) for s in markets if self._is_usdt_market(s, markets[s])
+                    ]
+                else:
+                    drop = {clean_symbol(s) for s in removed | changed}
+                    keep = {clean_symbol(s) for s in (added | changed) if self._is_usdt_market(s, markets[s])}
+                    pairs[:] = [p for p in pairs if p not in drop or p in keep]
+                    known = set(pairs)
+                    pairs.extend(p for p in sorted(keep) if p not in known)
+                self.market_cache[exchange_id] = {'timestamp': datetime.now(), 'markets': markets}
+            if added or removed or changed:
+                self.log(f"🔄 {exchange_id} 市场数据更新: 新增 {len(added)}，下架 {len(removed)}，变化 {len(changed)}", "log")
+            if self.market_meta is not None:
+                self.market_meta.save(exchange_id, markets, exchange.currencies)
+        except Exception as e:
+            self.log(f"市场数据加载失败({exchange_id}): {str(e)}", 'warning')
+            with self.data_lock:
+                if exchange_id in self.market_cache:
+                    self.market_cache[exchange_id]['timestamp'] = datetime.now()  # 失败后等下个周期再试
+        finally:
+            self._market_refreshing.discard(exchange_id)
+        
+    #==============
+
+    def _calculate_moving_averages(self, closes: 'pd.Series', periods: List[int]) -> Dict[int, 'pd.Series']:
+        """
+        计算指定周期的移动平均，支持TA-Lib或Pandas rolling
+        """
+        ma_values = {}
+        talib = load_talib()
+        for period in periods:
+            if talib is not None:
+                ma_values[period] = talib.SMA(closes, period)
+            else:
+                # 仅在第一次输出日志提示
+                if not hasattr(self, '_talib_unavailable_logged'):
+                    self.log("TA-Lib不可用，使用普通移动平均计算", 'warning')
+                    self._talib_unavailable_logged = True
+                ma_values[period] = closes.rolling(period).mean()
+        return ma_values
+    
+
+    def _record_price(self, symbol: str, latest_close: float) -> None:
+        """本轮获取到该交易对：更新连接统计（每轮每个交易对一次），并写入最新收盘价"""
+        with self.stats_lock:
+            self.connection_stats['total_pairs'] += 1
+            self.connection_stats['success_pairs'] += 1
+            self.connection_stats['last_update'] = datetime.now()
+        entry = self.store_price(symbol, latest_close)
+        self.log(f"✅ 存储 {symbol} 价格: {entry}", "log")
+
+    def store_price(self, symbol: str, latest_close: float) -> dict:
+        """
+        把最新收盘价写入 `price_data` / `base_prices` / 排行榜，返回写入的 price_data 项；
+        不计入连接统计（K线推送每条消息都会调用）
+        """
+        with self.data_lock:
+            # **确保 `self.base_prices[symbol]` 只存 float**
+            if symbol not in self.base_prices:
+                self.base_prices[symbol] = latest_close
+
+            # **确保 `self.price_data[symbol]` 只存 `dict`**
+            entry = self.price_data[symbol] = {
+                'timestamp': time.time(),
+                'data': latest_close  # 确保 `float` 类型
+            }
+            base_price = self.base_prices[symbol]
+        self.leaderboard.update(symbol, latest_close, base_price)
+        return entry
+
+    def _fetch_ohlcv_delta(self, exchange: ccxt.Exchange, symbol: str, timeframe: str,
+                           limit: int) -> Optional[list]:
+        """
+        增量获取K线：缓存中已有足够窗口时，只用 since 拉取最后一根之后的K线并合并，
+        缓存缺失、出现断档或请求失败时返回 None，由调用方回退到全量拉取
+        """
+        buffer = self.ohlcv_cache.get(exchange.id, symbol, timeframe)
+        if buffer is None:
+            buffer = self.rehydrate_ohlcv(exchange, symbol, timeframe, limit)
+        if buffer is None or len(buffer) < limit:
+            return None
+        # K线推送正常时缓存已经是最新的，无需再请求
+        if time.time() - buffer.stream_updated < self.config.get('stream_stale_after', 30):
+            with buffer.lock:
+                window = buffer.tail(limit)
+            self._record_price(symbol, float(window[-1][4]))  # 推送消息只更新价格，连接统计按轮计入
+            return window
+        try:
+            timeframe_ms = exchange.parse_timeframe(timeframe) * 1000
+        except Exception:
+            return None
+
+        with buffer.lock:
+            last_ts = buffer.last_timestamp
+        if last_ts is None:
+            return None
+        # 包含最后一根（可能未收盘，需要修订），再加上这段时间内新增的K线
+        missing = int((exchange.milliseconds() - last_ts) // timeframe_ms) + 2
+        if missing > buffer.capacity:
+            return None  # 断档太久，直接全量重建
+        # 请求期间（含限速等待与 418/429 暂停）不持有缓存锁，推送接入与均线判断不被阻塞
+        try:
+            data = self._limited_call(exchange, 'fetch_ohlcv', symbol, timeframe, since=last_ts, limit=missing)
+        except Exception as e:
+            self.log(f"⚠️ {symbol} 增量获取失败，回退全量: {str(e)}", "warning")
+            return None
+        if not data or not isinstance(data, list) or data[0][0] > last_ts + timeframe_ms:
+            return None  # 返回为空或与缓存之间出现缺口
+        with buffer.lock:
+            if buffer.last_timestamp is None or len(buffer) < limit:
+                return None  # 请求期间缓存被清理
+            buffer.extend(data)  # 期间推送追加的更新K线保留，更旧的返回值被忽略
+            window = buffer.tail(limit)
+        self.persist_ohlcv(exchange.id, symbol, timeframe, data)
+
+        latest_close = window[-1][4]
+        if latest_close is None or np.isnan(latest_close):
+            return None
+        self._record_price(symbol, float(latest_close))
+        return window
+
+    def rehydrate_ohlcv(self, exchange: ccxt.Exchange, symbol: str, timeframe: str, limit: int):
+        """缓存中没有该交易对时尝试从本地K线存储回填（每个交易对只尝试一次）"""
+        key = (exchange.id, symbol, timeframe)
+        if self.ohlcv_store is None or key in self._rehydrate_checked:
+            return None
+        self._rehydrate_checked.add(key)
+        try:
+            candles = self.ohlcv_store.load(exchange.id, symbol, timeframe, limit,
+                                            exchange.parse_timeframe(timeframe) * 1000)
+        except Exception as e:
+            self.log(f"⚠️ {symbol} 本地K线读取失败: {str(e)}", "warning")
+            return None
+        if not candles:
+            return None
+        return self.ohlcv_cache.seed(exchange.id, symbol, timeframe, candles)
+
+    def start_metrics_endpoint(self) -> None:
+        """配置了 metrics_port 时在本地端口以 Prometheus 文本格式提供 /metrics（已启动时忽略）"""
+        if self.metrics_server is not None or not self.config.get('metrics_port'):
+            return
+        try:
+            self.metrics_server = start_metrics_server(self.config['metrics_port'],
+                                                       self.config.get('metrics_host', '127.0.0.1'))
+        except OSError as e:
+            self.log(f"⚠️ 指标接口端口 {self.config['metrics_port']} 不可用: {str(e)}", "warning")
+            return
+        register_action('/profile', self._profile_action)  # POST /profile?sweeps=N 开始，?stop=1 提前结束
+
+    def shutdown(self) -> None:
+        """停止监控：结束各线程，发出剩余警报并把历史与K线落盘（重复调用时忽略）"""
+        if self.closed:
+            return
+        self.closed = True
+        self.running.clear()
+        self.optimizer.running = False
+        self.dispatcher.stop()  # 发出队列中剩余的警报后停止发送线程
+        self.history.close()  # 写入剩余的警报历史
+        self.close_ohlcv_store()  # K线与基准价格落盘，下次启动时回填
+        if self.capture is not None:
+            self.capture.flush()
+        if self.metrics_server is not None:
+            self.metrics_server.shutdown()
+            self.metrics_server.server_close()
+            self.metrics_server = None
+        self.stop_profiling()  # 未采满的轮数也写出
+
+    def close_ohlcv_store(self) -> None:
+        if self.ohlcv_store is not None:
+            with self.data_lock:
+                base_prices = dict(self.base_prices)
+            self.ohlcv_store.save_base_prices(base_prices)
+            self.ohlcv_store.close()
+
+    def persist_ohlcv(self, exchange_id: str, symbol: str, timeframe: str, candles: list) -> None:
+        """把新获取的K线写入本地存储（未启用时忽略）"""
+        if self.ohlcv_store is not None and candles:
+            self.ohlcv_store.write(exchange_id, symbol, timeframe, candles)
+
+    def _limited_call(self, exchange: ccxt.Exchange, method: str, *args, **kwargs):
+        """
+        经交易所共享令牌桶限速后调用 ccxt 方法：
+        成功后用响应头中的已用权重校准，418/429 时暂停该交易所的全部请求后再抛出
+        """
+        limiter = self.rate_limiters.get(exchange)
+        limiter.acquire(method)
+        start = time.perf_counter()
+        try:
+            result = getattr(exchange, method)(*args, **kwargs)
+        except (ccxt.DDoSProtection, ccxt.RateLimitExceeded) as e:  # 418 / 429
+            FETCH_ERRORS.inc(exchange.id, method, type(e).__name__)
+            pause = limiter.penalize(getattr(exchange, 'last_response_headers', None))
+            self.log(f"⚠️ {exchange.id} 触发限频，暂停请求 {pause:.0f} 秒", "warning")
+            raise
+        except Exception as e:
+            FETCH_ERRORS.inc(exchange.id, method, type(e).__name__)
+            raise
+        finally:
+            FETCH_SECONDS.observe(time.perf_counter() - start, exchange.id, method)
+        limiter.observe(getattr(exchange, 'last_response_headers', None))
+        return result
+
+    def safe_fetch_ohlcv(self, exchange: ccxt.Exchange, symbol: str, timeframe: str, limit: int) -> Optional[list]:
+        """
+        获取K线数据，确保数据格式正确，并防止异常数据存入 `price_data`
+        优先从K线环形缓存增量补齐，缓存不可用时才全量拉取 `limit` 根并写回缓存
+        """
+        if not self.init_complete.is_set():
+            return None
+
+        data = self._fetch_ohlcv_delta(exchange, symbol, timeframe, limit)
+        if data is not None:
+            return data
+
+        #for _ in range(3):
+        for attempt in range(3):
+            try:
+                data = self._limited_call(exchange, 'fetch_ohlcv', symbol, timeframe, limit=limit)
+                # 强化数据验证
+                if not data or len(data) < limit:
+                    self.log(f"⚠️ {symbol} 数据不足，需要 {limit} 条，实际获取 {len(data)} 条", "warning")
+                    continue  # 继续重试
+
+                # ✅ 确保 `data` 是 `list[list]`
+                if not isinstance(data, list) or not all(isinstance(i, list) and len(i) > 4 for i in data):
+                    self.log(f"⚠️ {symbol} 返回数据异常: {data}", "warning")
+                    return None
+
+                latest_candle = data[-1]  # 取最新一根K线
+                latest_close = float(latest_candle[4]) if latest_candle[4] is not None else None
+                if len(latest_candle) < 5 or latest_candle[4] is None:
+                    self.log(f"⚠️ {symbol} K线格式异常", "warning")
+                    continue
+                if latest_close is None:
+                    self.log(f"⚠️ {symbol} 最新K线收盘价为 None: {latest_candle}", "warning")
+                    return None
+
+                self.ohlcv_cache.seed(exchange.id, symbol, timeframe, data)
+                self.persist_ohlcv(exchange.id, symbol, timeframe, data)
+                self._record_price(symbol, latest_close)
+
+                return data  # ✅ 返回完整 K 线数据
+
+            except (ccxt.DDoSProtection, ccxt.RateLimitExceeded) as e:
+                FETCH_RETRIES.inc(exchange.id, type(e).__name__)
+                continue  # 已由限速器暂停，恢复后重试
+            except ccxt.NetworkError as e:
+                FETCH_RETRIES.inc(exchange.id, type(e).__name__)
+                self.log(f"网络错误: {str(e)} - {symbol}", 'warning')
+                time.sleep(10)
+            except ccxt.ExchangeError as e:
+                FETCH_RETRIES.inc(exchange.id, type(e).__name__)
+                self.log(f"交易所错误: {str(e)} - {symbol}", 'warning')
+            except Exception as e:
+                FETCH_RETRIES.inc(exchange.id, type(e).__name__)
+                #self.log(f"未知错误: {str(e)} - {symbol}", 'warning')
+                self.log(f"第 {attempt+1} 次获取 {symbol} 数据失败: {str(e)}", "warning")
+                time.sleep(2)
+
+
+        # 三次尝试均失败后记录
+        self.log(f"❌ {symbol} 数据获取彻底失败", "warning")
+        return None  # ✅ 确保函数返回 `None`
+
+    
+    
+    def get_leaderboard(self, top_n: int = 10) -> Dict[str, Any]:
+        """
+        获取涨幅排行榜 + 监控统计信息
+        top_n: 返回排行榜的数量（默认前10名）
+        """
+        # 排行榜在写入价格时已增量排序（基准价格无效的交易对不会进入），这里只取缓存快照
+        leaderboard, losers = self.leaderboard.snapshot(top_n)
+
+        return {
+            "leaderboard": leaderboard,
+            "losers": losers,  # 跌幅榜
+            "monitor_stats": self.history.get_stats()  # 添加监控统计信息
+        }
+
+
+    def cleanup_data(self) -> None:
+        """
+        定期清理过期数据：
+          - 价格数据保留2小时
+          - 均线数据保留24小时
+          - 交易所市场数据与USDT交易对缓存由 get_markets 定期在后台增量刷新，这里不再清空
+        """
+        now_time = time.time()
+        with self.data_lock:
+            expired = [k for k, v in self.price_data.items() if now_time - v['timestamp'] >= 7200]
+            self.price_data = {
+                k: v for k, v in self.price_data.items()
+                if now_time - v['timestamp'] < 7200
+            }
+            self.leaderboard.remove(expired)
+            self.log(f"💾 内存清理后仍存储的交易对: {list(self.price_data.keys())}", "log")
+
+            self.ma_data = {
+                k: v for k, v in self.ma_data.items()
+                if now_time - v['timestamp'] < 86400
+            }
+        # K线缓存与价格数据保持一致，2小时未访问的交易对直接释放
+        self.ohlcv_cache.evict_idle(7200)
+        self.indicators.evict_idle(7200)
+        # 警报历史数据库按 data_retention 清理
+        self.history.purge(retention_seconds(self.config.get('data_retention', '6小时')))
+        if self.ohlcv_store is not None:
+            with self.data_lock:
+                base_prices = dict(self.base_prices)
+            self.ohlcv_store.save_base_prices(base_prices)
+
+    def init_exchanges_with_retry(self) -> None:
+        """
+        并行初始化所选交易所，重试三次后标记为“disconnected”
+        """
+        self.log("初始化交易所连接中...", "log")
+        # 新增代理测试逻辑
+        proxy = self.config['proxy']
+        if proxy:
+            try:
+                test_url = "https://api.binance.com/api/v3/ping"  # 使用通用测试地址
+                response = get_pool().get(test_url,
+                                      proxies={'http': proxy, 'https': proxy}, 
+                                      timeout=10)
+                if response.status_code != 200:
+                    self.log(f"代理 {proxy} 测试失败: HTTP {response.status_code}", 'warning')
+                    return
+            except Exception as e:
+                self.log(f"代理 {proxy} 不可用: {str(e)}", 'warning')
+                # return # 不 return，继续尝试连接交易所
+         # 原有初始化逻辑（增加HTX的headers）   
+        def init_single_exchange(exchange_id: str):
+            self.exchange_status[exchange_id] = 'connecting'
+            for attempt in range(3):
+                try:
+                    self.log(f"正在连接 {exchange_id} ({attempt+1}/3)...")
+                    exchange_class = getattr(ccxt, exchange_id)
+                    exchange = exchange_class({
+                        'proxies': {'http': self.config['proxy'], 'https': self.config['proxy']},
+                        'enableRateLimit': False,  # 由 rate_limiters 统一限速（多线程共享）
+                            'headers': {
+                                       'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)',
+                                       'Referer': 'https://www.htx.com/'  # 添加Referer绕过反爬
+                    },
+                        'verify': False  # 注意：此处禁用了 SSL 验证，仅用于调试，生产环境下不建议关闭验证！
+                    })
+                    if self.capture is not None:
+                        exchange = self.capture.wrap_exchange(exchange)
+                    snapshot = self.market_meta.load(exchange_id) if self.market_meta else None
+                    if snapshot:
+                        # 使用本地快照立即完成连接，随后在后台刷新市场数据
+                        exchange.set_markets(snapshot['markets'], snapshot['currencies'] or None)
+                    else:
+                        exchange.load_markets()
+                        if self.market_meta is not None:
+                            self.market_meta.save(exchange_id, exchange.markets, exchange.currencies)
+                    with self.data_lock:
+                        self.exchanges[exchange_id] = exchange
+                        self.exchange_status[exchange_id] = 'connected'
+                        if snapshot:
+                            self._market_refreshing.add(exchange_id)
+                    if snapshot:
+                        Thread(target=self.refresh_markets, args=(exchange_id,), daemon=True).start()
+                    self.log(f"{exchange_id} 连接成功{'（市场数据来自本地快照）' if snapshot else ''}", 'log')
+                    return
+                except ccxt.DDoSProtection as e:
+                    self.log(f"交易所 {exchange_id} 触发DDoS保护: {str(e)}", 'warning')
+                except ccxt.ExchangeNotAvailable as e:
+                    self.log(f"交易所 {exchange_id} 暂时不可用: {str(e)}", 'warning')
+                except Exception as e:
+                    self.log(f"{exchange_id} 连接失败: {str(e)}", 'warning')
+                time.sleep(10)
+            self.exchange_status[exchange_id] = 'disconnected'
+
+        threads = []
+        for exchange_id in self.config['exchanges']:
+            t = Thread(target=init_single_exchange, args=(exchange_id,), daemon=True)
+            threads.append(t)
+            t.start()
+        for t in threads:
+            t.join()
+        self.init_complete.set()
+        self.publish_state()
+
+    def notify(self, message: str, telegram: bool = True, wechat: bool = True) -> bool:
+        """把消息交给 AlertDispatcher 发送到已启用的渠道，不等待网络请求"""
+        sinks = []
+        if telegram and self.notifier.enabled:
+            sinks.extend(f"telegram:{chat_id}" for chat_id in self.notifier.chat_ids)
+        if wechat and self.wechat_notifier and self.wechat_notifier.enabled:
+            sinks.append("wechat")
+        if not self.dispatcher.submit(message, sinks):
+            self.log("⚠️ 警报发送队列已满，消息被丢弃", "warning")
+            return False
+        return True
+
+    def send_alert(self, exchange_id: str, symbol: str, message: str, alert_type: str) -> None:
+        """
+        发送警报：
+          - 格式化警报消息，记录到历史记录
+          - 通过Telegram发送（如果启用）
+          - 通过日志回调显示在GUI上
+          - 新增监控统计数据（新增排行榜数据）
+        """
+        key = (symbol, alert_type)
+        current_time = time.time()
+        # 如果该警报曾经发送过，并且距离上次发送时间小于冷却时间，则不再发送
+        if key in self.last_alert_time and (current_time - self.last_alert_time[key] < self.alert_cooldown):
+            return  # 冷却中，不发送
+
+        # 更新最后发送时间
+        self.last_alert_time[key] = current_time
+
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        full_message = f"[{timestamp}] {exchange_id.upper()} {symbol} - {message}"
+
+            # 在记录中保存实际使用的参数
+        record = {
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'exchange': exchange_id,
+            'symbol': symbol,
+            'message': message,
+            'type': alert_type,
+            'timeframe': self.config.get('price_timeframe', '1m'),  # 记录实际参数
+            'period': self.config.get('price_period', 15)
+        }
+        self.history.add_record(record)
+
+        # 记录到历史记录
+        #self.history.add_record({
+            #'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            #'exchange': exchange_id,
+            #'symbol': symbol,
+           # 'message': message,
+           # 'type': alert_type,
+          #  'timeframe': self.config.get('price_timeframe', '1m'),  # 记录实际参数
+          #  'period': self.config.get('price_period', 15)
+       # })
+
+        # 获取监控统计 & 排行榜
+        leaderboard_data = self.get_leaderboard()
+        stats = leaderboard_data["monitor_stats"]
+
+        # 📊 监控统计信息
+        stats_message = f"\n📊 监控统计:\n🔼 多头: {stats['bullish_signals']} 🔽 空头: {stats['bearish_signals']}"
+
+        # 🏆 涨幅排行榜
+        leaderboard_message = "\n🏆 涨幅榜:"
+        for i, entry in enumerate(leaderboard_data["leaderboard"], 1):
+            leaderboard_message += f"\n{i}️⃣ {entry['symbol']} ({entry['exchange']}) {entry['change']:.2f}%"
+
+        final_message = full_message + stats_message + leaderboard_message
+
+        # 发送 Telegram / 企业微信（异步队列，合并窗口内的警报拼成一条）
+        self.notify(final_message)
+
+
+    def check_price_alert(self, exchange: ccxt.Exchange, symbol: str, config: Optional[dict] = None) -> None:
+        """
+        检查虚拟货币价格：
+        - 计算自定义周期（price_period）内的涨跌幅
+        - 如果达到设定的阈值（price_threshold），则触发提醒
+        config 为本轮配置快照，未传入时使用当前配置
+        """
+        config = config or self.config
+        if not config.get('enable_price_monitor', False):
+            return
+        price_timeframe = config.get('price_timeframe', "1m")
+        price_period = config.get('price_period', 15)
+
+        data = self.fetch_planner.fetch(exchange, symbol, price_timeframe, price_period)
+        self.evaluate_price_alert(exchange.id, symbol, data, config)
+
+    def evaluate_price_alert(self, exchange_id: str, symbol: str, data: Optional[list],
+                             config: Optional[dict] = None) -> None:
+        """
+        根据已获取的 price_period 根K线计算涨跌幅并触发提醒，
+        同步与异步监控引擎共用这一判断逻辑
+        """
+        config = config or self.config
+        price_period = config.get('price_period', 15)
+
+        # ✅ 确保数据格式正确
+        if not isinstance(data, list) or len(data) < price_period:
+            self.log(f"⚠️ {symbol} 数据不足 ({len(data) if isinstance(data, list) else 'None'})，无法计算涨跌幅", "warning")
+            return
+
+        try:
+            # ✅ 取第一根和最后一根K线数据
+            first_candle = data[0] if isinstance(data[0], list) and len(data[0]) > 4 else None
+            last_candle = data[-1] if isinstance(data[-1], list) and len(data[-1]) > 4 else None
+
+            if first_candle is None or last_candle is None:
+                self.log(f"⚠️ {symbol} K线数据格式异常: first_candle={first_candle}, last_candle={last_candle}", "warning")
+                return
+
+            past_close = float(first_candle[4]) if first_candle[4] is not None else None
+            current_close = float(last_candle[4]) if last_candle[4] is not None else None
+
+            if past_close is None or current_close is None or past_close <= 0:
+                self.log(f"⚠️ {symbol} 价格异常: past_close={past_close}, current_close={current_close}", "warning")
+                return
+
+            # ✅ 计算涨跌幅
+            change_percent = ((current_close - past_close) / past_close) * 100
+            threshold = config.get('price_threshold', 5.0)
+            if not isinstance(threshold, (int, float)) or threshold <= 0:
+                self.log(f"⚠️ 无效的价格阈值: {threshold}", "warning")
+                return
+
+            # ✅ 方向判断，确保值合法
+            direction = config.get('price_direction', 'both').lower()
+            alert_triggered = False
+            alert_msg = ""
+
+            if direction in ['up', 'both'] and change_percent >= threshold:
+                alert_msg = f"📈 价格上涨 {change_percent:.2f}%（{price_period}分钟）"
+                alert_triggered = True
+            elif direction in ['down', 'both'] and change_percent <= -threshold:
+                alert_msg = f"📉 价格下跌 {abs(change_percent):.2f}%（{price_period}分钟）"
+                alert_triggered = True
+
+            # ✅ 发送警报
+            if alert_triggered:
+                self.send_alert(exchange_id, symbol, alert_msg, 'price')
+
+        except Exception as e:
+            self.log(f"⚠️ {symbol} 价格计算异常: {str(e)}", "warning")
+    
+
+
+    def check_price_alerts_bulk(self, exchange: ccxt.Exchange, symbols: List[str], config: Optional[dict] = None) -> bool:
+        """
+        批量价格警报（price_monitor_mode 为 'ticker' 时使用）：
+        - 每轮每个交易所只调用一次 fetch_tickers，记录带时间戳的价格快照
+        - 一次向量化计算所有交易对在 price_period 内的涨跌幅并触发提醒
+        获取行情失败时返回 False，由调用方回退到逐个交易对的K线检测；
+        config 为本轮配置快照，未传入时使用当前配置
+        """
+        config = config or self.config
+        if not config.get('enable_price_monitor', False):
+            return True
+
+        try:
+            tickers = self._limited_call(exchange, 'fetch_tickers')
+        except Exception as e:
+            self.log(f"⚠️ {exchange.id} 批量行情获取失败，回退K线模式: {str(e)}", "warning")
+            return False
+
+        wanted = set(symbols)
+        prices = {s: float(t['last']) for s, t in tickers.items()
+                  if s in wanted and t.get('last')}
+        now_time = time.time()
+
+        with self.stats_lock:
+            self.connection_stats['total_pairs'] += len(prices)
+            self.connection_stats['success_pairs'] += len(prices)
+            self.connection_stats['last_update'] = datetime.now()
+        with self.data_lock:
+            for symbol, price in prices.items():
+                if symbol not in self.base_prices:
+                    self.base_prices[symbol] = price
+                self.price_data[symbol] = {'timestamp': now_time, 'data': price}
+            changes = [(symbol, price, self.base_prices[symbol]) for symbol, price in prices.items()]
+        self.leaderboard.update_many(changes)
+        self.log(f"✅ {exchange.id} 批量存储 {len(prices)} 个交易对价格", "log")
+
+        price_timeframe = config.get('price_timeframe', "1m")
+        price_period = config.get('price_period', 15)
+        threshold = config.get('price_threshold', 5.0)
+        direction = config.get('price_direction', 'both').lower()
+        if not isinstance(threshold, (int, float)) or threshold <= 0:
+            self.log(f"⚠️ 无效的价格阈值: {threshold}", "warning")
+            return True
+
+        # 与K线模式一致：第一根到最后一根收盘价之间相隔 price_period - 1 个周期
+        window = (price_period - 1) * exchange.parse_timeframe(price_timeframe)
+        history = self.ticker_history.setdefault(exchange.id, TickerPriceHistory())
+        history.add_snapshot(prices, now_time)
+        history.trim(window, now_time)
+
+        pair_symbols, change = history.changes(window, now_time)
+        for symbol, alert_msg in evaluate_price_alerts(pair_symbols, change, threshold, direction, price_period):
+            self.send_alert(exchange.id, symbol, alert_msg, 'price')
+        return True
+
+    def check_ma_alerts(self, exchange: ccxt.Exchange, symbol: str, evaluate: bool = True) -> List[Tuple[str, str]]:
+        """
+        检测均线策略信号：
+          - 遍历每组均线策略（周期、时间周期可配置）
+          - 使用K线数据计算移动均线
+          - 判断短/中/长期均线的排列与中轨价格偏离，确认多头或空头信号
+        evaluate 为 False 时只获取K线（向量化模式下由 check_ma_alerts_vectorized 统一判断）
+        返回 [(alert_type, message), ...] 的列表
+        """
+        alerts = []
+        for strategy in self.config.get('ma_strategies', []):
+            periods = strategy.get('periods')
+            timeframe = strategy.get('timeframe')
+            required_length = max(periods) + 10
+            data = self.fetch_planner.fetch(exchange, symbol, timeframe, required_length)
+            if not data or len(data) < required_length or not evaluate:
+                continue
+            alerts.extend(self.evaluate_ma_strategy(symbol, data, periods, (exchange.id, symbol, timeframe)))
+        return alerts
+
+    def check_ma_alerts_vectorized(self, exchange_id: str, symbols: List[str], since: float) -> List[Tuple[str, str, str]]:
+        """
+        向量化均线检测（ma_engine 为 'vectorized' 时使用）：
+          - 每组策略把该时间周期下所有交易对的收盘价拼成一个二维数组
+          - 一次计算全部交易对的均线排列，规则与 evaluate_ma_strategy 一致
+        只使用 since 之后更新过的K线缓存（即本轮成功获取的数据）
+        返回 [(symbol, alert_type, message), ...] 的列表
+        """
+        alerts = []
+        for strategy in self.config.get('ma_strategies', []):
+            periods = strategy.get('periods')
+            timeframe = strategy.get('timeframe')
+            required_length = max(periods) + 10
+            matrix_symbols, rows = [], []
+            for symbol in symbols:
+                buffer = self.ohlcv_cache.get(exchange_id, symbol, timeframe)
+                if buffer is None or len(buffer) < required_length or buffer.last_update < since:
+                    continue
+                with buffer.lock:
+                    rows.append(buffer.closes(required_length))
+                matrix_symbols.append(symbol)
+            if rows:
+                alerts.extend(evaluate_ma_universe(matrix_symbols, np.vstack(rows), periods,
+                                                   self.config.get("enable_bullish_ma", False),
+                                                   self.config.get("enable_bearish_ma", False)))
+        return alerts
+
+    def evaluate_ma_strategy(self, symbol: str, data: list, periods: List[int],
+                             state_key: Optional[tuple] = None) -> List[Tuple[str, str]]:
+        """
+        对一组均线策略（短/中/长周期）判断多头或空头排列，
+        同步与异步监控引擎共用这一判断逻辑
+        state_key: 启用 incremental_indicators 时用于定位增量均线状态，
+                   每轮只处理新增/修订的K线，不再重算整段滚动均线
+        """
+        alerts = []
+        ma_short, ma_medium, ma_long = periods
+        if state_key is not None and self.config.get('incremental_indicators', False):
+            ma_values, recent = self.indicators.sync(state_key, periods, CandleColumn(data, 0), CandleColumn(data, 4))
+            ma_short_val, ma_medium_val, ma_long_val = (ma_values[p] for p in periods)
+        else:
+            import pandas as pd  # 延迟导入，只有 series 模式才需要
+            closes = pd.Series([candle[4] for candle in data])
+            ma_values = self._calculate_moving_averages(closes, periods)
+            ma_short_val = ma_values[ma_short].iloc[-1]
+            ma_medium_val = ma_values[ma_medium].iloc[-1]
+            ma_long_val = ma_values[ma_long].iloc[-1]
+            recent = closes.iloc[-10:].tolist()
+        current_price = recent[-1]
+
+        # 检查中轨偏离：1%容差
+        if abs(current_price - ma_medium_val) / ma_medium_val > 0.01:
+            return []
+
+        # 判断多头信号：短 > 中 > 长，且最近10根K线均高于中轨
+        #if (ma_short_val > ma_medium_val > ma_long_val and
+           # all(closes.iloc[i] > ma_medium_val for i in range(-10, 0))):
+           # alerts.append(("bullish", f"{symbol} 均线多头排列"))
+        # 判断空头信号：短 < 中 < 长，且最近10根K线均低于中轨
+        #elif (ma_short_val < ma_medium_val < ma_long_val and
+             # all(closes.iloc[i] < ma_medium_val for i in range(-10, 0))):
+           # alerts.append(("bearish", f"{symbol} 均线空头排列"))
+        
+        # 检测多头排列：启用多头策略时，短期 > 中期 > 长期，且最近10根K线的收盘价均高于中期均线
+        if self.config.get("enable_bullish_ma", False) and \
+           ma_short_val > ma_medium_val > ma_long_val and \
+           all(close > ma_medium_val for close in recent):
+            alerts.append(("bullish", f"{symbol} 形成多头排列"))
+
+        # 检测空头排列：启用空头策略时，短期 < 中期 < 长期，且最近10根K线的收盘价均低于中期均线
+        if self.config.get("enable_bearish_ma", False) and \
+           ma_short_val < ma_medium_val < ma_long_val and \
+           all(close < ma_medium_val for close in recent):
+            alerts.append(("bearish", f"{symbol} 形成空头排列"))
+
+        return alerts
+
+    def monitor_single_pair(self, exchange: ccxt.Exchange, symbol: str, alert_counts: dict,
+                            check_price: bool = True, check_ma: bool = True) -> None:
+        """
+        监控单个交易对：
+          - 检测价格警报（批量行情模式下已统一检测时 check_price 为 False）
+          - 检测均线策略警报（向量化模式下 check_ma 为 False，只获取K线）
+        """
+        retry_count = 0
+        max_retries = 3
+        while retry_count < max_retries and self.running.is_set():
+            try:
+                if not self.running.is_set():
+                    return
+    
+                self.log(f"⏳ 监控 {symbol}...", "log")
+
+                # ✅ 确保 `self.price_data[symbol]` 是 `dict`
+                price_info = self.price_data.get(symbol)
+                if not price_info or not isinstance(price_info, dict) or 'data' not in price_info:
+                    self.log(f"⚠️ {symbol} 第 {retry_count+1} 次重试获取价格数据...", "warning")
+                    # 尝试重新调用 safe_fetch_ohlcv() 以更新价格数据
+                    timeframe = self.config.get('price_timeframe', "1m")
+                    period = self.config.get('price_period', 15)
+                    data = self.fetch_planner.fetch(exchange, symbol, timeframe, period)
+                    if not data:
+                        retry_count += 1
+                        time.sleep(2)
+                        self.log(f"⚠️ {symbol} 重新获取价格数据失败", "warning")
+                        return
+                    # 重新检查更新后的价格数据
+                    price_info = self.price_data.get(symbol)
+                    if not price_info or 'data' not in price_info:
+                        raise ValueError("价格数据刷新失败")
+                        self.log(f"⚠️ {symbol} 重新获取后仍无有效价格数据", "warning")
+                        return
+
+                # ✅ 价格警报检测
+                if check_price:
+                    self.check_price_alert(exchange, symbol)
+
+                # ✅ 均线策略检测
+                ma_alerts = self.check_ma_alerts(exchange, symbol, evaluate=check_ma) or []
+                if not isinstance(ma_alerts, list):
+                    self.log(f"⚠️ {symbol} 均线策略返回异常: {ma_alerts}", "warning")
+                    return
+
+                for alert_type, msg in ma_alerts:
+                    self.send_alert(exchange.id, symbol, msg, alert_type)
+                    alert_counts[alert_type] = alert_counts.get(alert_type, 0) + 1
+
+                break  # 成功则退出循环（请求频率由 rate_limiters 控制）
+
+            except Exception as e:
+                retry_count += 1
+                self.log(f"⚠️ {symbol} 监控异常（{retry_count}/{max_retries}）: {str(e)}", "warning")
+                time.sleep(3)
+
+    def get_monitored_pairs(self, exchange_id: str) -> List[str]:
+        """获取交易所需要监控的USDT交易对（已排除指定交易对并限制最大数量）"""
+        # ✅ 确保 `self.get_markets(exchange_id)` 不返回 `None`
+        markets = self.get_markets(exchange_id) or {}
+
+        # ✅ 确保 `usdt_pairs_cache` 可用
+        usdt_pairs = self.usdt_pairs_cache.get(exchange_id, [])
+        if not usdt_pairs:
+            usdt_pairs = [s for s in markets if s.endswith('/USDT')]
+
+        # ✅ 排除指定交易对
+        excluded = [x.strip().upper() for x in self.config.get('excluded_pairs', '').split(',') if x]
+        return [p for p in usdt_pairs if p.upper() not in excluded][:self.config.get('max_pairs', 500)]
+
+    def send_sweep_summary(self, alert_counts: dict) -> None:
+        """每轮结束后汇总监控统计与涨幅榜，并推送到 Telegram / 企业微信"""
+        fetch_stats = self.fetch_planner.stats
+        if fetch_stats['requests']:
+            self.log(f"📦 本轮K线请求 {fetch_stats['requests']} 次，合并复用 {fetch_stats['coalesced']} 次", "log")
+        http_stats = get_pool().stats()
+        if http_stats['requests']:
+            self.log(f"🔗 HTTP 连接池：请求 {http_stats['requests']} 次，新建连接 {http_stats['connections']} 次，"
+                     f"复用率 {http_stats['hit_rate']:.0%}", "log")
+        for ex_id, limiter_stats in self.rate_limiters.stats().items():
+            self.log(f"🚦 {ex_id} 累计请求 {limiter_stats['acquired']} 次，限速等待 {limiter_stats['waited']:.1f} 秒，"
+                     f"限频暂停 {limiter_stats['penalties']} 次", "log")
+
+        # 📊 监控统计 & 排行榜（新一轮的快照，本轮内的警报消息复用它）
+        self.leaderboard.new_sweep()
+        leaderboard_data = self.get_leaderboard() or {"leaderboard": []}  # ✅ 确保 `leaderboard_data` 可用
+
+        stats_msg = (f"📊 监控统计 | 🔼 多头: {alert_counts.get('bullish', 0)} "
+                     f"🔽 空头: {alert_counts.get('bearish', 0)}")
+
+        leaderboard_msg = "\n🏆 涨幅榜:"
+        for i, entry in enumerate(leaderboard_data["leaderboard"], 1):
+            leaderboard_msg += f"\n{i}️⃣ {entry.get('symbol', '未知')} ({entry.get('exchange', '未知')}) {entry.get('change', 0.0):.2f}%"
+
+        full_message = stats_msg + leaderboard_msg
+
+        # ✅ 发送 Telegram & 企业微信
+        self.notify(full_message)
+        self.publish_state()
+
+    def publish_state(self) -> None:
+        """把排行榜、交易所状态、连接统计与最近警报写入共享内存（未设置 state_bridge 时忽略）"""
+        if self.state_bridge is None:
+            return
+        try:
+            board = self.get_leaderboard()
+            with self.stats_lock:
+                connection_stats = dict(self.connection_stats)
+            self.state_bridge.publish({
+                'time': time.time(),
+                'exchange_status': dict(self.exchange_status),
+                'leaderboard': board['leaderboard'],
+                'losers': board['losers'],
+                'monitor_stats': board['monitor_stats'],
+                'connection_stats': connection_stats,
+                'alerts': self.history.query(limit=20),
+                'metrics': REGISTRY.summary(),
+                'control': self.control_state(),
+            })
+        except Exception as e:
+            self.log(f"⚠️ 状态发布失败: {str(e)}", "warning")
+
+    def start_streaming(self) -> None:
+        """
+        为已连接的交易所启动K线推送（enable_streaming）：
+          - 订阅价格监控与均线策略用到的全部时间周期
+          - 已启动的交易所不重复创建，断流时由接入器自行回退到 REST 轮询
+          - 监控的交易对（市场刷新、排除列表、max_pairs）或时间周期变化后停止旧接入器并按新范围重新订阅
+        """
+        from kline_stream import KlineStreamIngestor  # 仅在启用推送时导入
+        timeframes = list(plan_windows(self.config))
+        for exchange_id in list(self.exchanges):
+            if self.exchange_status.get(exchange_id) != 'connected':
+                continue
+            pairs = self.get_monitored_pairs(exchange_id)
+            current = self.stream_ingestors.get(exchange_id)
+            if current is not None:
+                if current.symbols == frozenset(pairs) and current.timeframes == timeframes:
+                    continue
+                current.stop()
+                del self.stream_ingestors[exchange_id]
+                self.log(f"📡 {exchange_id} 监控范围变化，重新订阅K线推送", "log")
+            ingestor = KlineStreamIngestor(self, exchange_id, pairs, timeframes,
+                                           url=self.config.get('stream_url'),
+                                           stale_after=self.config.get('stream_stale_after', 30),
+                                           poll_interval=self.config.get('stream_poll_interval', 60))
+            if ingestor.start():
+                self.stream_ingestors[exchange_id] = ingestor
+
+    def stop_streaming(self) -> None:
+        for ingestor in self.stream_ingestors.values():
+            ingestor.stop()
+        self.stream_ingestors.clear()
+
+    def start_monitoring_async(self) -> None:
+        """
+        异步监控循环（config['engine'] 为 'async' 时使用）：
+          - 基于 ccxt.async_support，所有交易所并发执行
+          - 报警逻辑与 monitor_single_pair 一致
+        """
+        from async_engine import AsyncMonitorEngine  # 仅在启用异步引擎时导入
+        AsyncMonitorEngine(self).run()
+
+    def start_monitoring_sharded(self) -> None:
+        """
+        多进程分片监控（config['engine'] 为 'sharded' 时使用）：
+          - 交易对按哈希分给 shard_workers 个工作进程（默认 CPU 核数）
+          - 警报与价格交回本对象处理，GUI、排行榜与通知与单进程模式相同
+        """
+        from shard_supervisor import ShardSupervisor  # 仅在启用分片时导入
+        ShardSupervisor(self, self.config.get('shard_workers', 0)).run()
+
+    def run_engine(self) -> None:
+        """按 config['engine']（thread / async / sharded）运行监控循环，直到 running 被清除"""
+        self.start_metrics_endpoint()
+        engine = self.config.get('engine', 'thread')
+        if engine == 'async':
+            self.start_monitoring_async()
+        elif engine == 'sharded':
+            self.start_monitoring_sharded()
+        else:
+            self.start_monitoring()
+
+    def start_monitoring(self, symbol=None) -> None:
+        """
+        主监控循环：
+          - 遍历每个交易所，过滤USDT交易对（支持排除及最大数量限制）
+          - 使用线程池并行检测每个交易对的监控信号
+          - 定时更新连接统计与日志输出
+          - sweep_mode 为 'adaptive' 时每个交易对按紧急程度单独排期（见 _adaptive_tick）
+        """
+        self.log("监控循环启动", 'log')
+        last_summary = 0.0
+        alert_counts = {'bullish': 0, 'bearish': 0}
+        while self.running.is_set():
+            # 每次循环前动态读取最新配置
+            with self.data_lock:  # 加锁保证线程安全
+                current_config = self.config.copy()
+            # 按本轮配置规划每个时间周期的最大窗口，同一 (交易对, 周期) 只请求一次
+            self.fetch_planner.begin_sweep(current_config, self.single_pair_strategies)
+            try:
+                if current_config.get('enable_streaming', False):
+                    self.start_streaming()
+
+                if current_config.get('sweep_mode', 'fixed') == 'adaptive':
+                    # 汇总、批量行情仍按 check_interval 执行，交易对检查按各自的到期时间
+                    full_sweep = time.time() - last_summary >= current_config.get('check_interval', 300)
+                    if full_sweep:
+                        self.history.stats = {"bullish_signals": 0, "bearish_signals": 0}
+                    with SWEEP_SECONDS.time('adaptive'):
+                        self._adaptive_tick(current_config, alert_counts, full_sweep)
+                    if full_sweep:
+                        self.send_sweep_summary(alert_counts)
+                        alert_counts = {'bullish': 0, 'bearish': 0}
+                        last_summary = time.time()
+                        self.profile_sweep_done()
+                    time.sleep(current_config.get('adaptive_tick', 15))
+                    continue
+
+                alert_counts = self.run_sweep(current_config)
+
+                # ✅ 防止 `check_interval` 为 `None`
+                #time.sleep(self.config.get('check_interval', 300) or 300)
+                # 动态调整休眠时间
+                time.sleep(current_config.get('check_interval', 300))
+        
+            except Exception as e:
+                self.log(f"⚠️ 监控循环异常: {str(e)}", 'warning')
+                time.sleep(30)  # ✅ 避免短时间内死循环
+
+    def run_sweep(self, config: dict) -> dict:
+        """固定轮询的一轮：检测全部已连接交易所的全部交易对，结束后推送汇总，返回本轮警报计数"""
+        sweep_started = time.perf_counter()
+        # ✅ 清零统计，防止数据累积
+        self.history.stats = {"bullish_signals": 0, "bearish_signals": 0}
+        if self.capture is not None:
+            self.capture.mark('sweep')  # 回放时按标记划分轮次
+
+        alert_counts = {'bullish': 0, 'bearish': 0}
+        for exchange_id, exchange in list(self.exchanges.items()):
+            if self.exchange_status.get(exchange_id) != 'connected':
+                continue
+
+            monitored_pairs = self.get_monitored_pairs(exchange_id)
+
+            # ✅ 批量行情模式：每个交易所一次 fetch_tickers 完成全部价格警报，K线只用于均线策略
+            bulk_price = (config.get('price_monitor_mode', 'ohlcv') == 'ticker' and
+                          self.check_price_alerts_bulk(exchange, monitored_pairs, config))
+            self._sweep_pairs(exchange, monitored_pairs, config, alert_counts, not bulk_price)
+
+        SWEEP_SECONDS.observe(time.perf_counter() - sweep_started, 'thread')
+        self.send_sweep_summary(alert_counts)
+        self.profile_sweep_done()
+        return alert_counts
+
+    def _sweep_pairs(self, exchange: ccxt.Exchange, pairs: List[str], config: dict,
+                     alert_counts: dict, check_price: bool) -> None:
+        """用线程池检测一批交易对，向量化均线模式下在全部获取完成后统一判断"""
+        if not pairs:
+            return
+        # ✅ 动态分配 `max_workers`，防止线程浪费
+        max_threads = min(10, len(pairs) // 2 + 1)
+
+        # ✅ 向量化均线模式：工作线程只获取K线，全部交易对结束后统一判断
+        vector_ma = config.get('ma_engine', 'series') == 'vectorized'
+        sweep_started = time.time()
+
+        # ✅ 并行处理交易对
+        with ThreadPoolExecutor(max_workers=max_threads) as executor:
+            futures = [executor.submit(self.monitor_single_pair, exchange, symbol, alert_counts,
+                                       check_price, not vector_ma) for symbol in pairs]
+            for future in as_completed(futures):
+                pass
+
+        if vector_ma:
+            for symbol, alert_type, msg in self.check_ma_alerts_vectorized(exchange.id, pairs, sweep_started):
+                self.send_alert(exchange.id, symbol, msg, alert_type)
+                alert_counts[alert_type] = alert_counts.get(alert_type, 0) + 1
+
+    def _adaptive_tick(self, config: dict, alert_counts: dict, full_sweep: bool) -> None:
+        """
+        自适应调度的一次检查：每个交易所只检查已到期的交易对（总量受预算限制），
+        检查后按缓存中的波动、涨跌幅与均线偏离重新排期
+        """
+        check_interval = config.get('check_interval', 300)
+        for exchange_id, exchange in list(self.exchanges.items()):
+            if self.exchange_status.get(exchange_id) != 'connected':
+                continue
+            monitored_pairs = self.get_monitored_pairs(exchange_id)
+            scheduler = self.sweep_schedulers.setdefault(exchange_id, AdaptiveSweepScheduler())
+            scheduler.configure(check_interval, config.get('adaptive_min_interval'),
+                                config.get('adaptive_max_interval'))
+            now_time = time.time()
+            scheduler.sync(monitored_pairs, now_time)
+
+            # 批量行情一次覆盖全部交易对，只在整轮时请求；失败时回退到逐个K线检测
+            check_price = config.get('price_monitor_mode', 'ohlcv') != 'ticker'
+            if full_sweep and not check_price:
+                check_price = not self.check_price_alerts_bulk(exchange, monitored_pairs, config)
+
+            due = scheduler.take_due(now_time)
+            self._sweep_pairs(exchange, due, config, alert_counts, check_price)
+            now_time = time.time()
+            for symbol in due:
+                scheduler.reschedule(symbol, self.get_pair_urgency(exchange_id, symbol, config), now_time)
+            if full_sweep:
+                stats = scheduler.stats()
+                self.log(f"⏱️ {exchange_id} 自适应调度：{stats['pairs']} 个交易对，紧急 {stats['urgent']} 个，"
+                         f"静默 {stats['dormant']} 个", "log")
+
+    def get_pair_urgency(self, exchange_id: str, symbol: str, config: dict) -> float:
+        """用K线缓存中的收盘价估算交易对的紧急程度（0~1），决定下次检查时间"""
+        price_closes = None
+        if config.get('enable_price_monitor', False):
+            buffer = self.ohlcv_cache.get(exchange_id, symbol, config.get('price_timeframe', "1m"))
+            if buffer is not None:
+                with buffer.lock:
+                    price_closes = buffer.closes(config.get('price_period', 15))
+        ma_closes = []
+        if config.get('enable_bullish_ma', False) or config.get('enable_bearish_ma', False):
+            for strategy in config.get('ma_strategies', []):
+                buffer = self.ohlcv_cache.get(exchange_id, symbol, strategy.get('timeframe'))
+                if buffer is not None:
+                    with buffer.lock:
+                        ma_closes.append(buffer.closes(strategy.get('periods')[1]))
+        return pair_urgency(price_closes, config.get('price_threshold', 5.0), ma_closes)
+
+    def start_profiling(self, sweeps: int = 3) -> bool:
+        """
+        开始采样全部线程的调用栈，sweeps 轮监控结束后自动停止，
+        折叠栈写到 profile_dir 下按时间命名的 .folded 文件；已在采样时返回 False
+        """
+        from profiler import SamplingProfiler  # 仅在开启采样时导入
+        with self.data_lock:
+            if self.profiler is not None:
+                return False
+            self.profile_path = os.path.join(self.config.get('profile_dir') or '.',
+                                             datetime.now().strftime('profile_%Y%m%d_%H%M%S.folded'))
+            self.profile_sweeps_left = max(int(sweeps), 1)
+            self.profiler = SamplingProfiler(self.config.get('profile_interval', 0.01))
+            self.profiler.start()
+        self.log(f"🔬 性能采样已开始，{self.profile_sweeps_left} 轮后写入 {self.profile_path}", "log")
+        return True
+
+    def profile_sweep_done(self) -> None:
+        """每轮监控结束时调用：未在采样时只做一次判断"""
+        if self.profiler is None:
+            return
+        self.profile_sweeps_left -= 1
+        if self.profile_sweeps_left <= 0:
+            self.stop_profiling()
+
+    def stop_profiling(self) -> Optional[str]:
+        """停止采样，写出折叠栈并在日志中输出各关注函数的线程时间，返回文件路径（未在采样时返回 None）"""
+        with self.data_lock:
+            profiler, self.profiler = self.profiler, None
+        if profiler is None:
+            return None
+        profiler.stop()
+        try:
+            path = profiler.write_folded(os.path.dirname(self.profile_path), os.path.basename(self.profile_path))
+        except (OSError, ValueError) as e:
+            self.log(f"⚠️ 性能采样结果写入失败: {str(e)}", "warning")
+            return None
+        self.log(f"🔬 性能采样完成：{profiler.elapsed:.1f}s，{profiler.samples} 个样本，已写入 {path}"
+                 f"（flamegraph.pl {path} > profile.svg）", "log")
+        for name, seconds, waiting in profiler.summary():
+            self.log(f"   {name}: {seconds:.2f} 线程秒（其中等待/休眠 {waiting:.2f}）", "log")
+        return path
+
+    def _profile_action(self, params: Dict[str, str]) -> str:
+        """
+        指标接口的 POST /profile：?sweeps=N 开始采样，?stop=1 立即结束，
+        ?toggle=1 采样中则结束、否则开始（网页面板的按钮）；完成后立即发布状态供面板显示
+        """
+        try:
+            if params.get('stop') or (params.get('toggle') and self.profiler is not None):
+                path = self.stop_profiling()
+                return f"stopped: {path}" if path else "not running"
+            if self.start_profiling(int(params.get('sweeps', 3))):
+                return f"started: {self.profile_sweeps_left} sweeps -> {self.profile_path}"
+            return f"already running: {self.profile_sweeps_left} sweeps left -> {self.profile_path}"
+        finally:
+            self.publish_state()
+
+    def control_state(self) -> dict:
+        """网页面板的控制入口：指标端口地址（未开启时为 None）与性能采样状态"""
+        url = None
+        if self.metrics_server is not None:
+            host, port = self.metrics_server.server_address[:2]
+            url = f"http://{'127.0.0.1' if host in ('', '0.0.0.0') else host}:{port}"
+        return {'url': url, 'profiling': self.profiler is not None, 'profile_sweeps_left': self.profile_sweeps_left}
+
+    # 新增接口：更新整个监控配置
+    def update_config(self, new_config: dict) -> None:
+        """
+        更新监控对象内部的配置字典，新的配置会在下一次监控周期生效。
+        """
+        with self.data_lock:  # 加锁
+            changed_keys = [k for k in new_config if self.config.get(k) != new_config[k]]
+            # 记录需要重新初始化的字段
+            need_reinit = 'price_timeframe' in new_config
+        # 合并配置
+            self.config.update(new_config)
+        
+
+            # 特殊字段处理
+            if need_reinit:
+                self._reinit_data_fetcher()
+    
+        self.log(f"配置已实时更新: {new_config}", "log")
+        self.log(f"配置变更字段: {changed_keys}", "debug")
+
+    def _reinit_data_fetcher(self):
+        """重新初始化数据抓取器（真实实现）"""
+        # 清空旧数据缓存
+        with self.data_lock:
+            self.price_data.clear()
+            self.base_prices.clear()
+            self.ticker_history.clear()
+            self.leaderboard.clear()
+            self._rehydrate_checked.clear()
+            
+        self.log("价格时间周期变更，已清空缓存数据", "log")
+
+    # 新增接口：更新单个交易对监控列表
+    def update_single_pair_list(self, pair_list: list) -> None:
+        """
+        更新单个交易对监控列表，重置内部的单对策略配置（可根据需要保留原有策略）。
+        这里简单将原有策略清空，并以新列表初始化每个交易对为“未启用”状态。
+        """
+        self.single_pair_strategies = {}
+        for pair in pair_list:
+            self.single_pair_strategies[pair.upper()] = {"enabled": False}
+        self.log("单个交易对监控列表已更新", "log")
+    #=====================================================
+    def enable_single_pair_strategy(self, pair: str, strategy1: dict, strategy2: dict) -> None:
+        """
+        启用单个交易对监控：
+          - pair: 交易对代码，如 "BTC/USDT"
+          - strategy1: 字典，包含策略1参数，例如：
+              {"timeframe": "5m", "ma_period": 20, "threshold": 5}
+          - strategy2: 字典，包含策略2参数，例如：
+              {"timeframe": "5m", "threshold": 10}
+        此方法保存配置，并启动后台线程进行监控。
+        """
+        pair = pair.upper()
+        if not hasattr(self, "single_pair_strategies"):
+            self.single_pair_strategies = {}
+        self.single_pair_strategies[pair] = {
+            "strategy1": strategy1,
+            "strategy2": strategy2,
+            "enabled": True
+        }
+        self.log(f"单个交易对 {pair} 监控已启用", "log")
+        # 启动监控线程，如果尚未启动该交易对的监控线程（你可以简单启动一个新的线程，每次启用均启动）
+        thread = Thread(target=self.monitor_single_pair_strategy, args=(pair,), daemon=True)
+        thread.start()
+
+    def disable_single_pair_strategy(self, pair: str) -> None:
+        """
+        禁用单个交易对监控，将对应策略标记为禁用。
+        """
+        pair = pair.upper()
+        if hasattr(self, "single_pair_strategies") and pair in self.single_pair_strategies:
+            self.single_pair_strategies[pair]["enabled"] = False
+            self.log(f"单个交易对 {pair} 监控已禁用", "log")
+        else:
+            self.log(f"未找到 {pair} 的单对监控策略", "warning")
+
+    def monitor_single_pair_strategy(self, pair: str) -> None:
+        """
+        后台线程循环监控指定交易对，分别应用策略1和策略2，
+        当达到警报条件时调用 send_alert 触发报警。
+        这里示例中使用默认刷新间隔为 60 秒，你可根据需要调整或将其作为参数设置。
+        """
+        refresh_interval = 60  # 单对监控刷新间隔（秒）
+        while (hasattr(self, "single_pair_strategies") and
+               pair in self.single_pair_strategies and
+               self.single_pair_strategies[pair].get("enabled", False) and
+               self.running.is_set()):
+            # 取出策略配置
+            strat = self.single_pair_strategies[pair]
+            s1 = strat["strategy1"]
+            s2 = strat["strategy2"]
+
+            # 选择一个交易所进行监控，这里示例使用 Binance（你可根据实际情况选择其他交易所）
+            exchange = self.exchanges.get("binance")
+            if not exchange:
+                self.log(f"监控 {pair} 时未连接 Binance", "warning")
+                time.sleep(refresh_interval)
+                continue
+
+            self.check_single_pair_strategy(exchange, pair, s1, s2)
+            time.sleep(refresh_interval)
+
+    def check_single_pair_strategy(self, exchange: ccxt.Exchange, pair: str, s1: dict, s2: dict) -> None:
+        """单对监控的一次检查：策略1（价格与均线偏离）与策略2（相邻两根K线涨跌幅）"""
+        # 策略1：监控价格与均线偏离
+        data1 = self.fetch_planner.fetch(exchange, pair, s1.get("timeframe", "5m"), s1.get("ma_period", 20) + 10)
+        if data1 and len(data1) >= s1.get("ma_period", 20):
+            ma_period = s1.get("ma_period", 20)
+            if self.config.get('incremental_indicators', False):
+                ma_values, recent = self.indicators.sync(('single', exchange.id, pair, s1.get("timeframe", "5m")),
+                                                         [ma_period], CandleColumn(data1, 0), CandleColumn(data1, 4))
+                current_price = recent[-1]
+                current_ma = ma_values[ma_period]
+            else:
+                import pandas as pd
+                closes = pd.Series([candle[4] for candle in data1])
+                ma_line = closes.rolling(window=ma_period).mean()
+                current_price = closes.iloc[-1]
+                current_ma = ma_line.iloc[-1]
+            if current_ma and current_ma != 0:
+                diff_pct = abs(current_price - current_ma) / current_ma * 100
+                if diff_pct <= s1.get("threshold", 5):
+                    self.send_alert(exchange.id, pair, 
+                                    f"策略1：价格 {current_price:.2f} 与均线 {current_ma:.2f} 差 {diff_pct:.2f}%", 
+                                    "strategy1")
+        
+        # 策略2：监控价格涨跌幅百分比
+        data2 = self.fetch_planner.fetch(exchange, pair, s2.get("timeframe", "5m"), 2)
+        if data2 and len(data2) >= 2:
+            prev_close = data2[-2][4]
+            current_close = data2[-1][4]
+            if prev_close != 0:
+                change_pct = ((current_close - prev_close) / prev_close) * 100
+                if abs(change_pct) >= s2.get("threshold", 10):
+                    self.send_alert(exchange.id, pair, 
+                                    f"策略2：价格变动 {change_pct:.2f}%", 
+                                    "strategy2")
+
+
+# ======================== 系统休眠控制（仅 Windows） ========================
+ES_CONTINUOUS = 0x80000000
+ES_SYSTEM_REQUIRED = 0x00000001
+ES_AWAYMODE_REQUIRED = 0x00000040  # Windows Vista 及以上
+
+
+def prevent_sleep():
+    """
+    调用 SetThreadExecutionState API，防止系统进入睡眠状态（非 Windows 平台忽略）
+    """
+    if sys.platform != "win32":
+        return
+    import ctypes
+    result = ctypes.windll.kernel32.SetThreadExecutionState(
+        ES_CONTINUOUS | ES_SYSTEM_REQUIRED | ES_AWAYMODE_REQUIRED)
+    if result == 0:
+        print("调用 SetThreadExecutionState 失败")
+    else:
+        print("系统休眠已被禁止")
+
+
+def restore_sleep():
+    """
+    恢复系统默认睡眠状态
+    """
+    if sys.platform != "win32":
+        return
+    import ctypes
+    ctypes.windll.kernel32.SetThreadExecutionState(ES_CONTINUOUS)
+    print("系统休眠已恢复")
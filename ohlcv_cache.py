@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+K线环形缓存：
+  - 按 (交易所, 交易对, 时间周期) 保存最近 N 根K线
+  - 首次全量拉取后只做 since 增量补齐，避免每轮重复下载整段窗口
+"""
+import time
+import numpy as np
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+
+class OHLCVRingBuffer:
+    """基于 NumPy 数组的定长K线环形缓冲区，每行为 [ts, open, high, low, close, volume]"""
+
+    def __init__(self, capacity: int):
+        self.capacity = max(int(capacity), 1)
+        self._data = np.zeros((self.capacity, 6), dtype=np.float64)
+        self._start = 0   # 最旧一根K线所在行
+        self._size = 0
+        self.lock = Lock()
+        self.last_access = time.time()
+        self.stream_updated = 0.0  # 最近一次由 WebSocket 推送更新的时间
+        self.last_update = 0.0     # 最近一次写入K线（REST 或推送）的时间
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _row(self, i: int) -> int:
+        """第 i 根（按时间顺序）K线在底层数组中的行号，支持负数索引"""
+        if i < 0:
+            i += self._size
+        return (self._start + i) % self.capacity
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        if not self._size:
+            return None
+        return int(self._data[self._row(-1), 0])
+
+    def clear(self) -> None:
+        self._start = 0
+        self._size = 0
+
+    def extend(self, candles: List[list]) -> int:
+        """
+        合并新K线：
+          - 与最后一根时间戳相同：覆盖（未收盘K线的修订）
+          - 时间戳更新：追加，满了则覆盖最旧的一根
+          - 更旧的K线直接忽略
+        返回实际追加的新K线数量
+        """
+        appended = 0
+        for candle in candles:
+            if not candle or len(candle) < 5 or candle[0] is None or candle[4] is None:
+                continue
+            ts = int(candle[0])
+            row = [ts] + [float(v) if v is not None else np.nan for v in candle[1:6]]
+            row += [0.0] * (6 - len(row))
+            last_ts = self.last_timestamp
+            if last_ts is not None and ts == last_ts:
+                self._data[self._row(-1)] = row
+            elif last_ts is None or ts > last_ts:
+                if self._size < self.capacity:
+                    self._data[self._row(self._size)] = row
+                    self._size += 1
+                else:
+                    self._data[self._start] = row
+                    self._start = (self._start + 1) % self.capacity
+                appended += 1
+        self.last_access = time.time()
+        if candles:
+            self.last_update = self.last_access
+        return appended
+
+    def tail(self, n: int) -> List[list]:
+        """按时间顺序返回最近 n 根K线（ccxt 格式：时间戳为 int）"""
+        n = min(n, self._size)
+        if n <= 0:
+            return []
+        idx = (self._start + np.arange(self._size - n, self._size)) % self.capacity
+        rows = self._data[idx].tolist()
+        for row in rows:
+            row[0] = int(row[0])
+        self.last_access = time.time()
+        return rows
+
+    def closes(self, n: int) -> np.ndarray:
+        """返回最近 n 根收盘价数组（不做拷贝以外的转换）"""
+        n = min(n, self._size)
+        idx = (self._start + np.arange(self._size - n, self._size)) % self.capacity
+        return self._data[idx, 4]
+
+
+class OHLCVCache:
+    """多交易对K线缓存（线程安全），容量按最大请求窗口自动放大"""
+
+    def __init__(self, headroom: int = 20):
+        self.headroom = headroom  # 预留的额外容量，避免窗口刚好满时频繁重建
+        self.buffers: Dict[Tuple[str, str, str], OHLCVRingBuffer] = {}
+        self.lock = Lock()
+
+    def get(self, exchange_id: str, symbol: str, timeframe: str) -> Optional[OHLCVRingBuffer]:
+        with self.lock:
+            return self.buffers.get((exchange_id, symbol, timeframe))
+
+    def seed(self, exchange_id: str, symbol: str, timeframe: str, candles: List[list]) -> OHLCVRingBuffer:
+        """用一次全量拉取的数据（重新）初始化缓冲区"""
+        key = (exchange_id, symbol, timeframe)
+        with self.lock:
+            buffer = self.buffers.get(key)
+            if buffer is None or buffer.capacity < len(candles):
+                buffer = OHLCVRingBuffer(len(candles) + self.headroom)
+                self.buffers[key] = buffer
+        with buffer.lock:
+            buffer.clear()
+            buffer.extend(candles)
+        return buffer
+
+    def evict_idle(self, max_idle: float) -> int:
+        """清理超过 max_idle 秒未访问的缓冲区，返回清理数量"""
+        now_time = time.time()
+        with self.lock:
+            stale = [k for k, b in self.buffers.items() if now_time - b.last_access > max_idle]
+            for k in stale:
+                del self.buffers[k]
+        return len(stale)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.buffers.clear()
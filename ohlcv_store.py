@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+K线本地列式存储（热重启用）：
+  - 按 交易所/时间周期/日期(UTC) 分区，每个交易对一个 .npy 文件（N x 6：时间戳、开、高、低、收、量）
+  - 获取层写入的K线先在内存中按时间戳合并，后台线程定期把新K线以定长行追加到同名 .bin 段文件，
+    每次落盘的 IO 只与新K线数量有关；跨日后把旧分区的段文件合并进 .npy（同一时间戳以最新写入为准，原子替换文件）
+  - 分区保留天数按时间周期放大，至少能回填 keep_bars 根K线（日线等大周期不会只剩几根）
+  - 启动后按需用 mmap 读取最近的分区回填K线缓存，只需增量请求停机期间缺失的K线
+  - 同时保存 base_prices，重启后涨跌幅榜沿用原基准价格
+"""
+import json
+import os
+import time
+from datetime import datetime, timezone
+from threading import Lock, Thread
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def _safe_name(symbol: str) -> str:
+    return symbol.replace('/', '_').replace(':', '_')
+
+
+def _day(ts_ms: int) -> str:
+    return datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+TIMEFRAME_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800, 'M': 2592000, 'y': 31536000}
+
+
+def _timeframe_seconds(timeframe: str) -> int:
+    """'15m' -> 900（与 ccxt parse_timeframe 一致），无法识别时按 1 分钟处理"""
+    try:
+        return int(timeframe[:-1]) * TIMEFRAME_SECONDS[timeframe[-1]]
+    except (ValueError, KeyError):
+        return 60
+
+
+def _read_segment(path: str) -> np.ndarray:
+    """读取追加写入的段文件，忽略进程中断留下的不完整末行"""
+    raw = np.fromfile(path, dtype=np.float64)
+    return raw[:len(raw) // 6 * 6].reshape(-1, 6)
+
+
+def _latest_per_timestamp(rows: np.ndarray) -> np.ndarray:
+    """按时间戳排序去重，同一时间戳保留最后写入的一行"""
+    ts = rows[::-1, 0]
+    _, first = np.unique(ts, return_index=True)
+    return rows[len(rows) - 1 - first]
+
+
+class OHLCVDiskStore:
+    """
+    root: 存储目录
+    flush_interval: 后台落盘间隔（秒）
+    keep_days: 保留的日期分区数量，更早的分区在跨日整理时删除
+    keep_bars: 每个时间周期至少保留能覆盖这么多根K线的分区（大周期时放大 keep_days）
+    log_callback: 后台落盘出错时的日志回调 (消息, 类别)，未提供时打印到标准输出
+    """
+
+    def __init__(self, root: str, flush_interval: float = 30, keep_days: int = 7, keep_bars: int = 1000,
+                 log_callback: Optional[Callable] = None):
+        self.root = root
+        self.flush_interval = flush_interval
+        self.keep_days = keep_days
+        self.keep_bars = keep_bars
+        self.log_callback = log_callback
+        os.makedirs(root, exist_ok=True)
+        self.pending: Dict[Tuple[str, str, str, str], Dict[int, list]] = {}
+        self.lock = Lock()
+        self.io_lock = Lock()
+        self.stats = {'files_written': 0, 'candles_written': 0, 'rehydrated': 0, 'compacted': 0}
+        self.maintained_day: Optional[str] = None  # 最近一次整理分区的日期(UTC)
+        self.running = True
+        self.thread = Thread(target=self._flush_loop, daemon=True)
+        self.thread.start()
+
+    def log(self, message: str, category: str = 'warning') -> None:
+        if self.log_callback:
+            self.log_callback(message, category)
+        else:
+            print(f"[{category}] {message}")
+
+    def _path(self, exchange_id: str, timeframe: str, day: str, symbol: str) -> str:
+        """合并后的分区文件；未合并的追加段为同名 .bin"""
+        return os.path.join(self.root, exchange_id, timeframe, day, _safe_name(symbol) + '.npy')
+
+    def write(self, exchange_id: str, symbol: str, timeframe: str, candles: List[list]) -> None:
+        """登记新获取的K线（只写内存，由后台线程落盘）"""
+        with self.lock:
+            for candle in candles:
+                if candle[4] is None:
+                    continue
+                ts = int(candle[0])
+                key = (exchange_id, timeframe, _day(ts), symbol)
+                self.pending.setdefault(key, {})[ts] = candle[:6]
+
+    def flush(self) -> int:
+        """把内存中的K线追加到对应分区的段文件，返回写入的文件数；跨日后整理一次旧分区"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        with self.io_lock:
+            for (exchange_id, timeframe, day, symbol), rows in pending.items():
+                path = self._path(exchange_id, timeframe, day, symbol)
+                new = np.array([rows[ts] for ts in sorted(rows)], dtype=np.float64)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path[:-4] + '.bin', 'ab') as f:
+                    new.tofile(f)
+                self.stats['files_written'] += 1
+                self.stats['candles_written'] += len(new)
+            today = _day(int(time.time() * 1000))
+            if self.maintained_day != today:
+                self._maintain(today)
+                self.maintained_day = today
+        return len(pending)
+
+    def _read_day(self, day_dir: str, name: str, tail: int = 0) -> Optional[np.ndarray]:
+        """读取一个分区中某交易对的K线（合并文件 + 追加段），tail > 0 时只返回末尾 tail 根"""
+        npy, segment = os.path.join(day_dir, name + '.npy'), os.path.join(day_dir, name + '.bin')
+        parts = []
+        if os.path.exists(npy):
+            data = np.load(npy, mmap_mode='r')
+            parts.append(data[-tail:] if tail else data)
+        if not os.path.exists(segment):
+            return np.array(parts[0]) if parts else None
+        parts.append(_read_segment(segment))
+        rows = _latest_per_timestamp(np.concatenate(parts))
+        return rows[-tail:] if tail else rows
+
+    def _compact(self, day_dir: str) -> None:
+        """把分区内的追加段合并进 .npy（原子替换）后删除段文件"""
+        for name in os.listdir(day_dir):
+            if not name.endswith('.bin'):
+                continue
+            base = name[:-4]
+            rows = self._read_day(day_dir, base)
+            path = os.path.join(day_dir, base + '.npy')
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                np.save(f, rows)
+            os.replace(tmp, path)
+            os.remove(os.path.join(day_dir, name))
+            self.stats['compacted'] += 1
+
+    def _keep_partitions(self, timeframe: str) -> int:
+        return max(self.keep_days, -(-self.keep_bars * _timeframe_seconds(timeframe) // 86400) + 1)
+
+    def _maintain(self, today: Optional[str] = None) -> None:
+        """合并今天以前分区的追加段，删除超出保留数量的日期分区"""
+        for exchange_id in os.listdir(self.root):
+            ex_dir = os.path.join(self.root, exchange_id)
+            if not os.path.isdir(ex_dir):
+                continue
+            for timeframe in os.listdir(ex_dir):
+                tf_dir = os.path.join(ex_dir, timeframe)
+                days = sorted(os.listdir(tf_dir))
+                keep = self._keep_partitions(timeframe)
+                for day in days[:-keep] if len(days) > keep else []:
+                    day_dir = os.path.join(tf_dir, day)
+                    for name in os.listdir(day_dir):
+                        os.remove(os.path.join(day_dir, name))
+                    os.rmdir(day_dir)
+                for day in days[-keep:]:
+                    if day != today:
+                        self._compact(os.path.join(tf_dir, day))
+
+    def load(self, exchange_id: str, symbol: str, timeframe: str, limit: int,
+             timeframe_ms: int) -> Optional[List[list]]:
+        """
+        从最近的分区读取最多 limit 根K线（mmap 读取，只加载需要的尾部），
+        只返回末尾连续的一段（中间停机留下的断档之前的K线不参与计算）
+        """
+        tf_dir = os.path.join(self.root, exchange_id, timeframe)
+        if not os.path.isdir(tf_dir):
+            return None
+        parts, total = [], 0
+        with self.io_lock:
+            for day in sorted(os.listdir(tf_dir), reverse=True):
+                rows = self._read_day(os.path.join(tf_dir, day), _safe_name(symbol), limit - total)
+                if rows is None:
+                    if parts:
+                        break  # 分区不连续，之前的数据对均线没有意义
+                    continue
+                parts.append(rows)
+                total += len(rows)
+                if total >= limit:
+                    break
+        if not parts:
+            return None
+        rows = np.concatenate(parts[::-1])
+        gaps = np.flatnonzero(np.diff(rows[:, 0]) > timeframe_ms)
+        if gaps.size:
+            rows = rows[gaps[-1] + 1:]
+        self.stats['rehydrated'] += 1
+        return [[int(r[0])] + [float(v) for v in r[1:]] for r in rows]
+
+    def save_base_prices(self, base_prices: Dict[str, float]) -> None:
+        path = os.path.join(self.root, 'base_prices.json')
+        tmp = path + '.tmp'
+        with self.io_lock:  # 内存清理线程与 close() 可能同时保存
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'saved_at': time.time(), 'base_prices': base_prices}, f)
+            os.replace(tmp, path)
+
+    def load_base_prices(self) -> Dict[str, float]:
+        path = os.path.join(self.root, 'base_prices.json')
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, encoding='utf-8') as f:
+                return {k: float(v) for k, v in json.load(f).get('base_prices', {}).items()}
+        except (ValueError, OSError):
+            return {}
+
+    def _flush_loop(self) -> None:
+        while self.running:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                self.log(f"⚠️ K线落盘失败: {str(e)}", "warning")
+
+    def close(self) -> None:
+        self.running = False
+        self.flush()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+警报一致性校验：同一份K线数据分别交给逐交易对的原始判断路径（legacy）与各个加速引擎，
+逐条比较发出的 (交易所, 交易对, 类型, 消息) 警报，并报告各自耗时。
+  python parity_harness.py                                       合成数据，比较全部引擎
+  python parity_harness.py --engines incremental --sweeps 50 --pairs 300
+  python parity_harness.py --capture market_capture.jsonl.gz     使用 capture.py 记录的真实行情
+
+覆盖的判断：check_price_alert、check_ma_alerts（含向量化模式）、check_single_pair_strategy、
+StockMonitorPro.check_stock（需要 tkinter 才能导入 crypto.py，缺少时跳过）。
+记录的是进入 send_alert 的原始警报（冷却之前），每轮用虚拟时钟推进，结果不受运行速度影响。
+存在差异时退出码为 1。
+"""
+import argparse
+import copy
+import json
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from threading import Lock
+from typing import Dict, List, Tuple
+
+from capture import ReplayLog, VirtualClock, clock_modules, frame_from_json
+from monitor_core import CryptoMonitorPro, DEFAULT_CONFIG
+
+# 原始路径与各加速引擎的配置（在 legacy 基础上覆盖）
+ENGINES = {
+    'legacy': {'ma_engine': 'series', 'incremental_indicators': False, 'price_monitor_mode': 'ohlcv'},
+    'incremental': {'incremental_indicators': True},
+    'vectorized': {'ma_engine': 'vectorized'},
+    'vectorized+incremental': {'ma_engine': 'vectorized', 'incremental_indicators': True},
+}
+
+BASE_CONFIG = {
+    'exchanges': [],
+    'market_cache_dir': '',
+    'ohlcv_store_dir': '',
+    'history_db': '',
+    'capture_path': '',
+    'enable_tg': False,
+    'enable_wechat': False,
+    'enable_streaming': False,
+    'sweep_mode': 'fixed',
+    'price_threshold': 1.0,
+    'enable_bullish_ma': True,
+    'enable_bearish_ma': True,
+    'rate_limit_utilization': 1e6,
+}
+
+SINGLE_PAIR_STRATEGY = ({'timeframe': '5m', 'ma_period': 20, 'threshold': 0.5}, {'timeframe': '5m', 'threshold': 0.5})
+
+Event = Tuple[int, str, str, str, str]  # (轮次, 交易所, 交易对, 类型, 消息)
+
+
+class ParityMonitor(CryptoMonitorPro):
+    """只记录警报、不发送通知的监控对象"""
+
+    def __init__(self, config: Dict):
+        self.events: List[Event] = []
+        self.events_lock = Lock()
+        self.sweep = 0
+        super().__init__(config)
+
+    def send_alert(self, exchange_id: str, symbol: str, message: str, alert_type: str) -> None:
+        with self.events_lock:
+            self.events.append((self.sweep, exchange_id, symbol, alert_type, message))
+
+    def publish_state(self) -> None:
+        pass
+
+
+# ======================== 数据来源 ========================
+class SyntheticSource:
+    """fake_ccxt_exchange 确定性生成的K线，虚拟时钟每轮前进 step 秒"""
+
+    START = 1_700_000_100
+
+    def __init__(self, args):
+        self.args = args
+
+    def windows(self) -> List[Tuple[float, float]]:
+        step = self.args.step
+        return [(self.START + i * step, self.START + (i + 1) * step) for i in range(self.args.sweeps or 30)]
+
+    def exchanges(self, clock: VirtualClock) -> list:
+        from fake_ccxt_exchange import FakeExchange
+        exchanges = []
+        for i in range(self.args.exchanges):
+            exchange = FakeExchange(f"fake{i}", pairs=self.args.pairs, latency=0, jitter=0, seed=i)
+            exchange.milliseconds = lambda: int(clock.now * 1000)
+            exchange.load_markets()
+            exchanges.append(exchange)
+        return exchanges
+
+    def stock_frames(self):
+        """
+        按轮次生成股票分钟K线（末行为实时报价），每两轮新增一根K线，中间一轮只更新报价；
+        --restate-every N 时每 N 轮发生一次除权：除权日（当时最近第 5 根K线）之前的全部历史K线
+        按新的复权因子改写（模拟前复权重算，除权日固定，不随窗口滑动），
+        --nan-bars 时部分K线收盘价为 NaN（随窗口滑入滑出）
+        """
+        import pandas as pd
+        from fake_ccxt_exchange import FakeExchange
+        curve = FakeExchange()
+        for sweep in range(self.args.sweeps or 30):
+            every = self.args.restate_every
+            ex_bars = [k * every // 2 + 194 for k in range(1, sweep // every + 1)] if every else []
+            for n in range(self.args.stocks):
+                symbol = f"sh{600000 + n}"
+                first = sweep // 2
+                bars = [float('nan') if self.args.nan_bars and i % 41 == n % 41
+                        else curve._close(symbol, i) * (1 + 0.02 * sum(i < ex for ex in ex_bars))
+                        for i in range(first, first + 199)]
+                quote = round(curve._close(symbol, first + 199) * (1 + (sweep % 2) * 0.001), 2)
+                times = [datetime.fromtimestamp(self.START + i * 300).strftime('%Y-%m-%d %H:%M:%S')
+                         for i in range(first, first + 200)]
+                closes = bars + [quote]
+                yield sweep, symbol, pd.DataFrame({'时间': times, '开盘': closes, '最高': closes, '最低': closes,
+                                                   '收盘': closes, '成交量': [0.0] * 200})
+
+
+class CaptureSource:
+    """capture.py 记录的行情日志，按记录的轮次回放"""
+
+    def __init__(self, args):
+        self.args = args
+        self.log = ReplayLog(*args.capture)
+
+    def windows(self) -> List[Tuple[float, float]]:
+        windows = self.log.sweep_windows()
+        return windows[:self.args.sweeps] if self.args.sweeps else windows
+
+    def exchanges(self, clock: VirtualClock) -> list:
+        self.log.rewind()
+        clock.set(self.log.start)
+        exchanges = []
+        for exchange_id in self.log.exchanges:
+            exchange = self.log.exchange(exchange_id, clock)
+            exchange.load_markets()
+            exchanges.append(exchange)
+        return exchanges
+
+    def stock_frames(self):
+        windows = self.windows()
+        starts = [start for start, _ in windows]
+        for t, args in self.log.calls.get(('akshare', 'stock_zh_a_minute'), []):
+            if windows and t > windows[-1][1]:
+                break
+            df = frame_from_json(self.log.response('akshare', 'stock_zh_a_minute', args, t))
+            if df is not None and not df.empty:
+                sweep = max(sum(1 for start in starts if start <= t) - 1, 0)
+                yield sweep, args[0][0], df
+
+
+# ======================== 运行与比较 ========================
+def run_crypto(source, config: dict, single_pairs: int) -> Tuple[List[Event], dict]:
+    monitor = ParityMonitor(config)
+    monitor.init_complete.wait()
+    monitor.optimizer.running = False
+    clock = VirtualClock()
+    wall = cpu = 0.0
+    with clock.installed(*clock_modules()):
+        exchanges = source.exchanges(clock)
+        for exchange in exchanges:
+            monitor.exchanges[exchange.id] = exchange
+            monitor.exchange_status[exchange.id] = 'connected'
+        pairs = monitor.get_monitored_pairs(exchanges[0].id)[:single_pairs] if exchanges else []
+        s1, s2 = SINGLE_PAIR_STRATEGY
+        monitor.single_pair_strategies = {pair: {'enabled': True, 'strategy1': s1, 'strategy2': s2} for pair in pairs}
+        for sweep, (start, end) in enumerate(source.windows()):
+            clock.set(start, end)
+            monitor.sweep = sweep
+            with monitor.data_lock:
+                current_config = monitor.config.copy()
+            t0, c0 = time.perf_counter(), time.process_time()
+            monitor.fetch_planner.begin_sweep(current_config, monitor.single_pair_strategies)
+            monitor.run_sweep(current_config)
+            for pair in pairs:
+                monitor.check_single_pair_strategy(exchanges[0], pair, s1, s2)
+            wall += time.perf_counter() - t0
+            cpu += time.process_time() - c0
+    monitor.shutdown()
+    return monitor.events, {'wall_s': round(wall, 3), 'cpu_s': round(cpu, 3)}
+
+
+def run_stocks(stock_class, frames, config: dict) -> Tuple[List[Event], dict]:
+    events: List[Event] = []
+    current = {'sweep': 0, 'symbol': ''}
+
+    def log(message: str, category: str = 'log') -> None:
+        if category == 'stock':
+            events.append((current['sweep'], 'stock', current['symbol'], 'stock', message))
+
+    monitor = stock_class(dict(config), log)
+    wall = 0.0
+    for sweep, symbol, df in frames:
+        current.update(sweep=sweep, symbol=symbol)
+        t0 = time.perf_counter()
+        monitor.check_stock(symbol, df.copy())
+        wall += time.perf_counter() - t0
+    return events, {'wall_s': round(wall, 3)}
+
+
+def diff_events(expected: List[Event], actual: List[Event]) -> Tuple[List[Event], List[Event]]:
+    """按多重集合比较（同一轮内的警报顺序取决于线程调度），返回 (缺少的, 多出的)"""
+    want, got = Counter(expected), Counter(actual)
+    return sorted((want - got).elements()), sorted((got - want).elements())
+
+
+HEADER = f"{'引擎':<24} {'警报数':>8} {'耗时(s)':>9} {'CPU(s)':>8} {'股票提醒':>8} {'股票(s)':>8} {'缺少':>6} {'多出':>6}"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='原始判断路径与加速引擎的警报一致性校验')
+    parser.add_argument('--engines', nargs='+', default=[name for name in ENGINES if name != 'legacy'],
+                        choices=[name for name in ENGINES if name != 'legacy'], help='与 legacy 比较的引擎')
+    parser.add_argument('--capture', nargs='+', help='使用 capture.py 记录的行情日志（默认合成数据）')
+    parser.add_argument('--pairs', type=int, default=100, help='合成数据：每个交易所的交易对数量')
+    parser.add_argument('--exchanges', type=int, default=2, help='合成数据：交易所数量')
+    parser.add_argument('--sweeps', type=int, help='轮数（合成数据默认 30 轮，记录的日志默认全部轮次）')
+    parser.add_argument('--step', type=float, default=300, help='合成数据：每轮虚拟时间前进的秒数')
+    parser.add_argument('--single-pairs', type=int, default=5, help='同时检查单对监控策略的交易对数量')
+    parser.add_argument('--stocks', type=int, default=20, help='合成数据：股票数量（0 为不检查股票）')
+    parser.add_argument('--restate-every', type=int, default=0, help='合成数据：每 N 轮改写股票历史K线（0 为不改写）')
+    parser.add_argument('--nan-bars', action='store_true', help='合成数据：股票K线中混入 NaN 收盘价')
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=JSON', help='覆盖监控配置，例如 price_threshold=2')
+    parser.add_argument('--show', type=int, default=10, help='每个引擎最多显示的差异条数')
+    parser.add_argument('--json', help='把结果写入 JSON 文件')
+    args = parser.parse_args(argv)
+
+    base = copy.deepcopy(DEFAULT_CONFIG)
+    base.update(BASE_CONFIG)
+    base['max_pairs'] = args.pairs
+    for item in args.set:
+        key, _, value = item.partition('=')
+        base[key] = json.loads(value)
+    source = CaptureSource(args) if args.capture else SyntheticSource(args)
+
+    try:
+        from crypto import StockMonitorPro  # 股票监控在 crypto.py 中（依赖 tkinter）
+        stock_frames = list(source.stock_frames()) if args.stocks else []
+    except ImportError as e:
+        print(f"跳过股票监控比较: {e}")
+        StockMonitorPro, stock_frames = None, []
+
+    results = {}
+    print(HEADER)
+    for name in ['legacy'] + args.engines:
+        config = dict(base, **ENGINES['legacy'])
+        config.update(ENGINES[name])
+        events, timing = run_crypto(source, config, args.single_pairs)
+        stock_events, stock_timing = (run_stocks(StockMonitorPro, stock_frames, config) if stock_frames
+                                      else ([], {'wall_s': 0.0}))
+        results[name] = {'events': events + stock_events, 'crypto': timing, 'stock': stock_timing,
+                         'alerts': len(events), 'stock_alerts': len(stock_events)}
+
+    failed = False
+    report = {}
+    for name, result in results.items():
+        missing, extra = diff_events(results['legacy']['events'], result['events'])
+        failed = failed or bool(missing or extra)
+        print(f"{name:<24} {result['alerts']:>8} {result['crypto']['wall_s']:>9.2f} {result['crypto']['cpu_s']:>8.2f} "
+              f"{result['stock_alerts']:>8} {result['stock']['wall_s']:>8.2f} {len(missing):>6} {len(extra):>6}")
+        for event in missing[:args.show]:
+            print(f"    - 轮次{event[0]} {event[1]} {event[2]} [{event[3]}] {event[4]}")
+        for event in extra[:args.show]:
+            print(f"    + 轮次{event[0]} {event[1]} {event[2]} [{event[3]}] {event[4]}")
+        report[name] = {'alerts': result['alerts'], 'stock_alerts': result['stock_alerts'],
+                        'crypto': result['crypto'], 'stock': result['stock'],
+                        'missing': [list(e) for e in missing], 'extra': [list(e) for e in extra]}
+    print("全部一致" if not failed else "存在差异")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+采样式性能分析（按需开启，关闭时监控循环只多一次属性判断）：
+  - 后台线程每隔 interval 秒用 sys._current_frames() 抓取全部线程的调用栈，不修改被测代码
+  - 调用栈按 "线程;模块:函数;..." 折叠计数，write_folded 输出的文件可直接交给 flamegraph.pl / speedscope
+  - 栈顶正在 sleep 或阻塞等待（锁、队列、条件变量、select）时追加 [sleep] / [wait] 帧，区分计算与等待
+  - summary() 把每个样本归到栈中最内层的关注函数（FOCUS_FUNCTIONS），估算各阶段占用的线程时间
+线程池线程名中的序号会去掉（ThreadPoolExecutor-3_1 -> ThreadPoolExecutor），同类线程合并到一棵树。
+"""
+import linecache
+import os
+import re
+import sys
+import time
+from threading import Event, Lock, Thread, enumerate as enumerate_threads, get_ident
+from typing import Dict, Iterable, List, Optional, Tuple
+
+FOCUS_FUNCTIONS = ('safe_fetch_ohlcv', 'check_price_alert', 'check_price_alerts_bulk', 'check_ma_alerts',
+                   'check_ma_alerts_vectorized', 'send_alert', 'get_markets')
+MAX_DEPTH = 128
+# 栈顶为这些 (模块, 函数) 时线程处于阻塞等待
+WAIT_FRAMES = {('threading', 'wait'), ('threading', '_wait_for_tstate_lock'), ('queue', 'get'),
+               ('selectors', 'select'), ('socketserver', 'serve_forever'), ('concurrent.futures.thread', '_worker')}
+_THREAD_SUFFIX = re.compile(r'[-_]\d+(_\d+)?(?= \(|$)')  # Thread-3 (_run) / ThreadPoolExecutor-0_2
+
+
+def _thread_label(name: str) -> str:
+    return _THREAD_SUFFIX.sub('', name).replace(';', ':') or 'thread'
+
+
+class SamplingProfiler:
+    """
+    interval: 采样间隔（秒），默认 100 Hz
+    focus: 需要单独统计的函数名（按 co_name 匹配）
+    """
+
+    def __init__(self, interval: float = 0.01, focus: Iterable[str] = FOCUS_FUNCTIONS):
+        self.interval = interval
+        self.focus = frozenset(focus)
+        self.stacks: Dict[Tuple[str, ...], int] = {}  # 折叠栈 -> 样本数
+        self.samples = 0
+        self.ticks = 0
+        self.started = 0.0
+        self.elapsed = 0.0
+        self.lock = Lock()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+        self._sleep_lines: Dict[Tuple[str, int], bool] = {}  # (文件, 行号) -> 该行是否调用 sleep
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self.started = time.perf_counter()
+        self._thread = Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.elapsed += time.perf_counter() - self.started
+
+    def _run(self) -> None:
+        own = get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in enumerate_threads()}
+            frames = sys._current_frames()
+            collected = []
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                collected.append(self._fold(_thread_label(names.get(ident, 'thread')), frame))
+            del frames
+            with self.lock:
+                self.ticks += 1
+                for stack in collected:
+                    self.stacks[stack] = self.stacks.get(stack, 0) + 1
+                    self.samples += 1
+
+    def _fold(self, thread_name: str, frame) -> Tuple[str, ...]:
+        """从栈顶向下取帧，返回 (线程, 最外层帧, ..., 最内层帧[, 等待标记])"""
+        names = []
+        leaf = frame
+        while frame is not None and len(names) < MAX_DEPTH:
+            code = frame.f_code
+            names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+            frame = frame.f_back
+        state = self._leaf_state(leaf)
+        names.reverse()
+        return (thread_name, *names, state) if state else (thread_name, *names)
+
+    def _leaf_state(self, frame) -> str:
+        module = frame.f_globals.get('__name__', '')
+        if (module, frame.f_code.co_name) in WAIT_FRAMES:
+            return '[wait]'
+        key = (frame.f_code.co_filename, frame.f_lineno)
+        sleeping = self._sleep_lines.get(key)
+        if sleeping is None:
+            sleeping = self._sleep_lines[key] = 'sleep(' in linecache.getline(*key)
+        return '[sleep]' if sleeping else ''
+
+    # ---------- 结果 ----------
+    def folded(self) -> List[str]:
+        """flamegraph.pl 的折叠格式：每行 "帧;帧;帧 样本数" """
+        with self.lock:
+            items = sorted(self.stacks.items())
+        return [f"{';'.join(frame.replace(';', ':') for frame in stack)} {count}" for stack, count in items]
+
+    def write_folded(self, directory: str, name: str) -> str:
+        """写到 directory/name 并返回路径；name 解析后不在 directory 内时抛出 ValueError"""
+        root = os.path.realpath(directory or '.')
+        path = os.path.realpath(os.path.join(root, name))
+        if os.path.dirname(path) != root:
+            raise ValueError(f"采样结果路径不在 {root} 内: {name}")
+        os.makedirs(root, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self.folded()) + '\n')
+        return path
+
+    def summary(self) -> List[Tuple[str, float, float]]:
+        """
+        [(关注函数, 线程秒, 其中等待/休眠的线程秒)]，按线程秒降序；
+        样本归到栈中最内层的关注函数，不在任何关注函数内的样本不计入
+        """
+        with self.lock:
+            items = list(self.stacks.items())
+            ticks = self.ticks
+        # 按实际采样次数折算时间（采样线程可能被调度延迟，比 interval 更可靠）
+        seconds_per_tick = self.elapsed / ticks if ticks and self.elapsed else self.interval
+        busy: Dict[str, int] = {}
+        idle: Dict[str, int] = {}
+        for stack, count in items:
+            name = next((frame.rsplit(':', 1)[-1] for frame in reversed(stack[1:])
+                         if frame.rsplit(':', 1)[-1] in self.focus), None)
+            if name is None:
+                continue
+            target = idle if stack[-1] in ('[wait]', '[sleep]') else busy
+            target[name] = target.get(name, 0) + count
+        rows = [(name, (busy.get(name, 0) + idle.get(name, 0)) * seconds_per_tick, idle.get(name, 0) * seconds_per_tick)
+                for name in set(busy) | set(idle)]
+        return sorted(rows, key=lambda row: -row[1])
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+按交易所共享的令牌桶限速器（取代每次请求前各线程各自 sleep）：
+  - 每个交易所一个令牌桶，按权重（weight）扣减，所有线程按先来后到排队领取许可
+  - 读取交易所返回的已用权重响应头（如币安 x-mbx-used-weight-1m），与服务端计数对齐
+  - 收到 418/429 时按 Retry-After 或指数退避暂停整个交易所的请求
+  - 线程调用 acquire()，异步引擎调用 acquire_async()，两者共用同一个令牌桶
+"""
+import asyncio
+import time
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+# 各交易所公开的 REST 限额：period 秒内最多 limit 个权重单位
+# weight_header 为服务端返回的已用权重，costs 为各方法的权重（未列出的方法按 1 计）
+EXCHANGE_LIMITS = {
+    'binance': {'limit': 6000, 'period': 60, 'weight_header': 'x-mbx-used-weight-1m',
+                'costs': {'fetch_ohlcv': 2, 'fetch_tickers': 80}},
+    'okx': {'limit': 40, 'period': 2, 'costs': {'fetch_ohlcv': 1, 'fetch_tickers': 2}},
+    'htx': {'limit': 4, 'period': 1, 'costs': {'fetch_ohlcv': 1, 'fetch_tickers': 1}},
+}
+
+
+class TokenBucket:
+    """
+    预约式令牌桶：令牌不足时先记账（余额为负），调用方在锁外睡到自己的时间点，
+    因此并发调用按进入顺序依次放行，不会出现忙等或饿死
+      limit / period: 公开限额，utilization 为实际使用比例
+      weight_header: 已用权重响应头名称（小写），没有则为 None
+    """
+
+    def __init__(self, limit: float, period: float, utilization: float = 0.8,
+                 weight_header: Optional[str] = None, costs: Optional[Dict[str, float]] = None):
+        self.limit = limit
+        self.period = period
+        self.capacity = max(limit * utilization, 1)
+        self.rate = self.capacity / period  # 每秒补充的权重
+        self.weight_header = weight_header
+        self.costs = costs or {}
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.backoff = 0.0
+        self.lock = Lock()
+        self.stats = {'acquired': 0, 'waited': 0.0, 'penalties': 0}
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def cost(self, method: str) -> float:
+        return self.costs.get(method, 1)
+
+    def _reserve(self, cost: float, reserved: bool) -> Tuple[float, bool]:
+        """未预约时扣减令牌；返回 (还需等待的秒数, 是否已预约)，暂停期间先等到暂停结束"""
+        with self.lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now, reserved
+            if reserved:
+                return 0.0, True
+            self._refill(now)
+            self.tokens -= cost
+            return (-self.tokens / self.rate if self.tokens < 0 else 0.0), True
+
+    def _acquired(self, waited: float) -> float:
+        with self.lock:
+            self.stats['acquired'] += 1
+            self.stats['waited'] += waited
+        return waited
+
+    def acquire(self, method: str = '', cost: Optional[float] = None) -> float:
+        """领取一次请求的许可，返回等待的秒数"""
+        cost = self.cost(method) if cost is None else cost
+        waited = 0.0
+        reserved = False
+        while True:
+            wait, reserved = self._reserve(cost, reserved)
+            if wait <= 0:
+                return self._acquired(waited)
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, method: str = '', cost: Optional[float] = None) -> float:
+        """acquire() 的异步版本：在事件循环中等待，不占用线程"""
+        cost = self.cost(method) if cost is None else cost
+        waited = 0.0
+        reserved = False
+        while True:
+            wait, reserved = self._reserve(cost, reserved)
+            if wait <= 0:
+                return self._acquired(waited)
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def observe(self, headers: Optional[dict]) -> None:
+        """请求成功后调用：按服务端已用权重收紧本地余额，并清除退避"""
+        with self.lock:
+            self.backoff = 0.0
+            if not headers or not self.weight_header:
+                return
+            used = None
+            for key, value in headers.items():
+                if key.lower() == self.weight_header:
+                    try:
+                        used = float(value)
+                    except (TypeError, ValueError):
+                        pass
+                    break
+            if used is None:
+                return
+            # 其他进程（如 web_server）也在消耗同一 IP 的权重，以服务端计数为准
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, self.capacity - used)
+            if used >= self.capacity:
+                # 权重窗口按整周期重置，等到下一个窗口再继续
+                self.paused_until = max(self.paused_until,
+                                        time.monotonic() + self.period - time.time() % self.period)
+
+    def penalize(self, headers: Optional[dict] = None) -> float:
+        """收到 418/429 时调用：按 Retry-After 或指数退避暂停，返回暂停秒数"""
+        retry_after = None
+        for key, value in (headers or {}).items():
+            if key.lower() == 'retry-after':
+                try:
+                    retry_after = float(value)
+                except (TypeError, ValueError):
+                    pass
+                break
+        with self.lock:
+            self.backoff = min(max(self.backoff * 2, 5.0), 300.0)
+            pause = retry_after if retry_after is not None else self.backoff
+            now = time.monotonic()
+            self._refill(now)
+            self.paused_until = max(self.paused_until, now + pause)
+            # 暂停结束后从空桶开始补充，避免恢复瞬间集中放行
+            self.tokens = min(self.tokens, 0.0)
+            self.updated = max(self.updated, self.paused_until)
+            self.stats['penalties'] += 1
+        return pause
+
+
+class RateLimiterRegistry:
+    """按交易所 ID 管理令牌桶，未登记限额的交易所使用 ccxt 的 rateLimit 推算"""
+
+    def __init__(self, utilization: float = 0.8):
+        self.utilization = utilization
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.lock = Lock()
+
+    def get(self, exchange) -> TokenBucket:
+        bucket = self.buckets.get(exchange.id)
+        if bucket is not None:
+            return bucket
+        with self.lock:
+            bucket = self.buckets.get(exchange.id)
+            if bucket is None:
+                spec = EXCHANGE_LIMITS.get(exchange.id)
+                if spec is None:
+                    # ccxt 的 rateLimit 为两次请求之间的毫秒数
+                    spec = {'limit': 1000 / max(getattr(exchange, 'rateLimit', 100) or 100, 1), 'period': 1}
+                bucket = self.buckets[exchange.id] = TokenBucket(
+                    spec['limit'], spec['period'], self.utilization,
+                    spec.get('weight_header'), spec.get('costs'))
+            return bucket
+
+    def stats(self) -> Dict[str, dict]:
+        return {ex_id: dict(bucket.stats) for ex_id, bucket in self.buckets.items()}
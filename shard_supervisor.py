@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+多进程分片监控（config['engine'] 为 'sharded' 时使用）：
+  - 按 crc32(交易所:交易对) 把监控范围稳定地分给 shard_workers 个工作进程，
+    每个进程独立运行获取循环、K线缓存与均线计算，不再共用一个 GIL
+  - 工作进程不直接发通知：警报、价格（排行榜）、警告/错误日志与每轮结束消息通过队列交回主进程，
+    由主进程的 send_alert / 排行榜 / GUI 统一处理
+  - 限速按进程数平分（rate_limit_utilization / N），合计不超过单进程时的请求速率
+  - 工作进程不开指标端口，每轮把指标累计值随 sweep 消息交回，主进程的 /metrics 输出合计
+"""
+import multiprocessing
+import os
+import time
+import zlib
+from datetime import datetime
+from queue import Empty
+from threading import Thread
+from typing import Dict, List, Tuple
+
+from metrics import REGISTRY
+from monitor_core import CryptoMonitorPro
+
+FORWARD_LOG_CATEGORIES = ('warning', 'error')
+WORKER_CHECK_INTERVAL = 2.0  # 检查工作进程存活的间隔（秒），与队列是否有消息无关
+
+
+def shard_of(exchange_id: str, symbol: str, shard_count: int) -> int:
+    return zlib.crc32(f"{exchange_id}:{symbol}".encode('utf-8')) % shard_count
+
+
+class ShardWorkerMonitor(CryptoMonitorPro):
+    """工作进程中的监控对象：只处理属于本分片的交易对，结果放入队列"""
+
+    def __init__(self, config: Dict, queue, shard_index: int, shard_count: int):
+        self.queue = queue
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self._sent_prices: Dict[str, Tuple[float, float]] = {}
+        super().__init__(config, self._forward_log)
+        self.dispatcher.stop(0)  # 通知只由主进程发送，工作进程不保留发送线程
+
+    def notify(self, message: str, telegram: bool = True, wechat: bool = True) -> bool:
+        return False
+
+    def _forward_log(self, message: str, category: str = 'log') -> None:
+        # 逐交易对的进度日志留在工作进程，只把警告与错误交回主进程
+        if category in FORWARD_LOG_CATEGORIES:
+            self.queue.put(('log', self.shard_index, (message, category)))
+
+    def get_monitored_pairs(self, exchange_id: str) -> List[str]:
+        return [p for p in super().get_monitored_pairs(exchange_id)
+                if shard_of(exchange_id, p, self.shard_count) == self.shard_index]
+
+    def send_alert(self, exchange_id: str, symbol: str, message: str, alert_type: str) -> None:
+        self.queue.put(('alert', self.shard_index, (exchange_id, symbol, message, alert_type)))
+
+    def send_sweep_summary(self, alert_counts: dict) -> None:
+        """本轮结束：只发送价格有变化的交易对，汇总与通知由主进程完成"""
+        with self.leaderboard.lock:
+            prices = dict(self.leaderboard.prices)
+        changed = [(symbol, price, base) for symbol, (price, base) in prices.items()
+                   if self._sent_prices.get(symbol) != (price, base)]
+        self._sent_prices = prices
+        self.queue.put(('sweep', self.shard_index, (dict(alert_counts), changed, REGISTRY.snapshot())))
+
+    def publish_state(self) -> None:
+        pass
+
+
+def _shard_worker(shard_index: int, shard_count: int, config: dict, queue, stop_event) -> None:
+    config = dict(config)
+    config['engine'] = config.get('shard_engine', 'thread')
+    config['rate_limit_utilization'] = config.get('rate_limit_utilization', 0.8) / shard_count
+    config['history_db'] = ''  # 警报历史由主进程记录
+    config['enable_tg'] = config['enable_wechat'] = False  # 启动通知与警报只由主进程发送
+    config['metrics_port'] = 0  # 端口由主进程持有，指标随 sweep 消息交回
+    if config.get('ohlcv_store_dir'):
+        config['ohlcv_store_dir'] = os.path.join(config['ohlcv_store_dir'], f"shard{shard_index}-of-{shard_count}")
+    if config.get('capture_path'):
+        config['capture_path'] = f"{config['capture_path']}.shard{shard_index}-of-{shard_count}"  # 回放时一起读入
+    if config.get('profile_sweeps'):
+        config['profile_dir'] = os.path.join(config.get('profile_dir') or '.', f"shard{shard_index}-of-{shard_count}")
+    monitor = ShardWorkerMonitor(config, queue, shard_index, shard_count)
+    monitor.init_complete.wait()
+    target = monitor.start_monitoring_async if config['engine'] == 'async' else monitor.start_monitoring
+    Thread(target=target, daemon=True).start()
+    stop_event.wait()
+    monitor.shutdown()
+    queue.put(('stopped', shard_index, None))
+
+
+class ShardSupervisor:
+    """
+    在主进程中启动并管理分片工作进程，把工作进程的结果交给 monitor
+    shard_workers: 工作进程数（默认 CPU 核数）
+    """
+
+    def __init__(self, monitor: CryptoMonitorPro, shard_workers: int = 0):
+        self.monitor = monitor
+        self.shard_count = max(1, shard_workers or os.cpu_count() or 1)
+        self.context = multiprocessing.get_context('spawn')  # 各平台行为一致，不继承主进程的线程
+        self.queue = self.context.Queue()
+        self.stop_event = self.context.Event()
+        self.processes: List = []
+        self.sweep_counts: Dict[int, dict] = {}  # 分片 -> 上次汇总后累计的警报数
+        self.stats = {'alerts': 0, 'prices': 0, 'sweeps': 0}
+
+    def start(self) -> None:
+        with self.monitor.data_lock:
+            config = self.monitor.config.copy()
+        for index in range(self.shard_count):
+            process = self.context.Process(target=_shard_worker, name=f"shard-{index}",
+                                           args=(index, self.shard_count, config, self.queue, self.stop_event),
+                                           daemon=True)
+            process.start()
+            self.processes.append(process)
+        self.monitor.log(f"分片监控启动：{self.shard_count} 个工作进程", "log")
+
+    def run(self) -> None:
+        """处理工作进程发回的消息，直到 monitor.running 被清除"""
+        self.start()
+        next_check = time.monotonic() + WORKER_CHECK_INTERVAL
+        try:
+            while self.monitor.running.is_set():
+                try:
+                    kind, shard, payload = self.queue.get(timeout=0.5)
+                except Empty:
+                    pass
+                else:
+                    self.handle(kind, shard, payload)
+                if time.monotonic() >= next_check:
+                    self._check_workers()
+                    next_check = time.monotonic() + WORKER_CHECK_INTERVAL
+        finally:
+            self.stop()
+
+    def handle(self, kind: str, shard: int, payload) -> None:
+        monitor = self.monitor
+        if kind == 'alert':
+            monitor.send_alert(*payload)
+            self.stats['alerts'] += 1
+        elif kind == 'sweep':
+            alert_counts, prices, metrics = payload
+            self._merge_prices(prices)
+            REGISTRY.merge_remote(f"shard{shard}", metrics)
+            # 快分片可能在慢分片回报前完成多轮，按分片累加，汇总时不丢失任何一轮的警报数
+            counts = self.sweep_counts.setdefault(shard, {})
+            for key, value in alert_counts.items():
+                counts[key] = counts.get(key, 0) + value
+            if len(self.sweep_counts) == self.shard_count:
+                # 全部分片完成一轮后统一汇总，与单进程模式一样每轮推送一次
+                totals = {}
+                for counts in self.sweep_counts.values():
+                    for key, value in counts.items():
+                        totals[key] = totals.get(key, 0) + value
+                self.sweep_counts = {}
+                self.stats['sweeps'] += 1
+                monitor.send_sweep_summary(totals)
+                monitor.history.stats = {"bullish_signals": 0, "bearish_signals": 0}
+                monitor.profile_sweep_done()
+        elif kind == 'log':
+            message, category = payload
+            monitor.log(f"[分片{shard}] {message}", category)
+        elif kind == 'stopped':
+            monitor.log(f"分片 {shard} 已停止", "log")
+
+    def _merge_prices(self, prices: List[Tuple[str, float, float]]) -> None:
+        """工作进程的价格写入主进程的 price_data / base_prices / 排行榜"""
+        if not prices:
+            return
+        monitor = self.monitor
+        now_time = time.time()
+        entries = []
+        with monitor.data_lock:
+            for symbol, price, base in prices:
+                monitor.price_data[symbol] = {'timestamp': now_time, 'data': price}
+                # 主进程已有基准价格（例如从K线落盘恢复）时以主进程为准
+                entries.append((symbol, price, monitor.base_prices.setdefault(symbol, base)))
+        monitor.leaderboard.update_many(entries)
+        with monitor.stats_lock:
+            monitor.connection_stats['total_pairs'] += len(prices)
+            monitor.connection_stats['success_pairs'] += len(prices)
+            monitor.connection_stats['last_update'] = datetime.now()
+        self.stats['prices'] += len(prices)
+
+    def _check_workers(self) -> None:
+        for index, process in enumerate(self.processes):
+            if not process.is_alive() and not self.stop_event.is_set():
+                self.monitor.log(f"⚠️ 分片 {index} 进程退出（exitcode={process.exitcode}），重新启动", "warning")
+                with self.monitor.data_lock:
+                    config = self.monitor.config.copy()
+                process = self.context.Process(target=_shard_worker, name=f"shard-{index}",
+                                               args=(index, self.shard_count, config, self.queue, self.stop_event),
+                                               daemon=True)
+                process.start()
+                self.processes[index] = process
+
+    def stop(self, timeout: float = 10) -> None:
+        self.stop_event.set()
+        deadline = time.time() + timeout
+        for process in self.processes:
+            process.join(max(deadline - time.time(), 0))
+            if process.is_alive():
+                process.terminate()
+        # 处理停止前发回的剩余消息（警报不能丢）
+        while True:
+            try:
+                kind, shard, payload = self.queue.get_nowait()
+            except Empty:
+                break
+            if kind != 'sweep':
+                self.handle(kind, shard, payload)
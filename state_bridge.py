@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+监控进程与 Web 进程之间的共享内存状态通道：
+  - 监控进程每轮把排行榜、交易所状态、连接统计、最近警报编码为 JSON 写入共享内存
+  - 布局：[序号 u64][长度 u32][JSON]；写入前序号加一（奇数表示正在写），写完再加一（偶数）
+  - Web 进程读取时比较前后两次序号（seqlock），不加锁、不 pickle；序号不变时直接返回上次解析的结果
+  - 共享内存只传递名字，子进程用名字重新打开，不依赖 fork
+"""
+import json
+import struct
+import time
+from multiprocessing import shared_memory
+from threading import Lock
+from typing import Optional
+
+HEADER = struct.Struct('<QI')  # 序号、数据长度
+
+
+class SharedStateWriter:
+    """
+    size: 共享内存大小（字节），快照超过容量时丢弃警报列表后重试，仍然放不下则跳过本次发布
+    """
+
+    def __init__(self, size: int = 1 << 20):
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.capacity = size - HEADER.size
+        self.seq = 0
+        self.lock = Lock()  # 同一进程内可能从多个线程发布，读取方不加锁
+        HEADER.pack_into(self.shm.buf, 0, 0, 0)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def publish(self, state: dict) -> int:
+        """写入一份快照，返回新的序号"""
+        payload = json.dumps(state, ensure_ascii=False, default=str).encode('utf-8')
+        if len(payload) > self.capacity:
+            state = dict(state, alerts=[])
+            payload = json.dumps(state, ensure_ascii=False, default=str).encode('utf-8')
+            if len(payload) > self.capacity:
+                return self.seq
+        buf = self.shm.buf
+        with self.lock:
+            struct.pack_into('<Q', buf, 0, self.seq + 1)  # 奇数：写入中
+            buf[HEADER.size:HEADER.size + len(payload)] = payload
+            struct.pack_into('<I', buf, 8, len(payload))
+            self.seq += 2
+            struct.pack_into('<Q', buf, 0, self.seq)
+            return self.seq
+
+    def close(self) -> None:
+        self.shm.close()
+        self.shm.unlink()
+
+
+class SharedStateReader:
+    def __init__(self, name: str):
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+        except TypeError:
+            # 旧版本读取方也会登记到 resource_tracker；Web 进程由监控进程用 multiprocessing 启动，
+            # 两者共用同一个 resource_tracker，重复登记没有影响
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.seq = 0
+        self.state: Optional[dict] = None
+
+    def read(self, retries: int = 50) -> Optional[dict]:
+        """返回最新快照（尚未发布时为 None）；读到写入中的数据时重试"""
+        buf = self.shm.buf
+        for _ in range(retries):
+            seq, length = HEADER.unpack_from(buf, 0)
+            if seq == self.seq:
+                return self.state
+            if seq & 1:
+                time.sleep(0.001)
+                continue
+            payload = bytes(buf[HEADER.size:HEADER.size + length])
+            if struct.unpack_from('<Q', buf, 0)[0] != seq:
+                continue  # 读取过程中被覆盖
+            self.state = json.loads(payload)
+            self.seq = seq
+            return self.state
+        return self.state
+
+    def close(self) -> None:
+        self.shm.close()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+自适应轮询调度：
+  - 每个交易对有自己的下次检查时间，不再每轮全部检查后统一休眠 check_interval
+  - 近期波动大、涨跌幅接近 price_threshold、价格贴近均线中轨的交易对提前检查，
+    长时间不动的交易对逐步推迟到 max_interval
+  - 整体检查速率不超过固定轮询（交易对数 / check_interval），总请求量不增加
+"""
+import math
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Sequence
+
+
+def pair_urgency(price_closes: Optional[np.ndarray], price_threshold: float,
+                 ma_closes: Sequence[np.ndarray] = ()) -> float:
+    """
+    根据缓存中的收盘价估算交易对的紧急程度（0~1）：
+      - 价格窗口内涨跌幅占 price_threshold 的比例
+      - 按近期收益率波动推算的窗口内预期波动占 price_threshold 的比例
+      - 价格与各均线策略中轨的偏离（1% 以内最紧急，5% 以上不加权），
+        窗口内几乎没有波动的交易对不会形成均线排列，不计入
+    """
+    urgency = 0.0
+    if price_closes is not None and len(price_closes) >= 2 and price_threshold > 0:
+        closes = price_closes[~np.isnan(price_closes)]
+        if len(closes) >= 2 and closes[0] > 0 and np.all(closes > 0):
+            change = abs(closes[-1] - closes[0]) / closes[0] * 100
+            urgency = max(urgency, change / price_threshold)
+            if len(closes) >= 3:
+                vol_move = float(np.std(np.diff(np.log(closes)))) * math.sqrt(len(closes)) * 100
+                urgency = max(urgency, vol_move / price_threshold)
+    for closes in ma_closes:
+        if closes is None or not len(closes) or np.isnan(closes).any():
+            continue
+        ma_medium = closes.mean()
+        if ma_medium <= 0 or np.ptp(closes) / ma_medium < 0.001:
+            continue
+        deviation = abs(closes[-1] - ma_medium) / ma_medium
+        urgency = max(urgency, 1 - (deviation - 0.01) / 0.04)
+    return min(max(urgency, 0.0), 1.0)
+
+
+class AdaptiveSweepScheduler:
+    """
+    单个交易所的交易对调度表：
+      check_interval: 固定轮询间隔，决定整体检查预算（交易对数 / check_interval 次每秒）
+      min_interval / max_interval: 紧急程度为 1 / 0 时的检查间隔
+    """
+
+    def __init__(self, check_interval: float = 300, min_interval: Optional[float] = None,
+                 max_interval: Optional[float] = None, budget_ratio: float = 1.0):
+        self.next_due: Dict[str, float] = {}
+        self.urgency: Dict[str, float] = {}
+        self.credit = 0.0
+        self.last_take: Optional[float] = None
+        self.configure(check_interval, min_interval, max_interval, budget_ratio)
+
+    def configure(self, check_interval: float, min_interval: Optional[float] = None,
+                  max_interval: Optional[float] = None, budget_ratio: float = 1.0) -> None:
+        self.check_interval = max(check_interval, 1)
+        self.min_interval = min_interval or self.check_interval / 5
+        self.max_interval = max(max_interval or self.check_interval * 4, self.min_interval)
+        self.budget_ratio = budget_ratio
+
+    def interval(self, urgency: float) -> float:
+        """紧急程度 0 -> max_interval，1 -> min_interval，中间按几何插值"""
+        return self.min_interval * (self.max_interval / self.min_interval) ** (1 - urgency)
+
+    def sync(self, symbols: Iterable[str], now: float) -> None:
+        """新加入的交易对立即到期，已不再监控的交易对移除"""
+        symbols = list(symbols)
+        wanted = set(symbols)
+        for symbol in [s for s in self.next_due if s not in wanted]:
+            del self.next_due[symbol]
+            self.urgency.pop(symbol, None)
+        added = [s for s in symbols if s not in self.next_due]
+        for symbol in added:
+            self.next_due[symbol] = now
+        # 新交易对首轮全部检查一次，不占用后续预算
+        self.credit += len(added)
+
+    def take_due(self, now: float) -> List[str]:
+        """
+        取出当前到期的交易对：按到期先后排序，数量受预算限制，
+        未取到的保持到期状态，下次优先处理
+        """
+        if self.last_take is not None:
+            budget = len(self.next_due) / self.check_interval * self.budget_ratio
+            self.credit += budget * max(now - self.last_take, 0)
+        self.last_take = now
+        self.credit = min(self.credit, len(self.next_due))
+        due = sorted((ts, s) for s, ts in self.next_due.items() if ts <= now)
+        count = min(len(due), int(self.credit))
+        self.credit -= count
+        return [s for _, s in due[:count]]
+
+    def reschedule(self, symbol: str, urgency: float, now: float) -> None:
+        if symbol not in self.next_due:
+            return
+        self.urgency[symbol] = urgency
+        self.next_due[symbol] = now + self.interval(urgency)
+
+    def stats(self) -> dict:
+        values = list(self.urgency.values())
+        return {
+            'pairs': len(self.next_due),
+            'urgent': sum(1 for u in values if u >= 0.5),
+            'dormant': sum(1 for u in values if u == 0),
+        }
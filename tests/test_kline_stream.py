@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""kline_stream：流名称、推送写入与断流时的 REST 轮询回退（不联网，使用假的监控对象）"""
+import asyncio
+import json
+import time
+from threading import Event
+from types import SimpleNamespace
+
+from kline_stream import KlineStreamIngestor, stream_name
+from ohlcv_cache import OHLCVCache
+
+MINUTE = 60000
+
+
+def make_monitor(**overrides):
+    monitor = SimpleNamespace(
+        ohlcv_cache=OHLCVCache(),
+        config={'enable_price_monitor': False},
+        running=Event(),
+        exchanges={'binance': object()},
+        fetch_planner=SimpleNamespace(windows={'1m': 15}),
+        prices=[],
+        polls=[],
+        log=lambda message, category='log': None,
+        persist_ohlcv=lambda *args: None,
+    )
+    monitor.store_price = lambda symbol, close: monitor.prices.append((symbol, close))
+    monitor.safe_fetch_ohlcv = lambda exchange, symbol, timeframe, limit: monitor.polls.append((symbol, timeframe, limit))
+    monitor.running.set()
+    for key, value in overrides.items():
+        setattr(monitor, key, value)
+    return monitor
+
+
+def kline_message(symbol_id, timeframe, start, close, closed=False):
+    return json.dumps({'stream': f"{symbol_id.lower()}@kline_{timeframe}",
+                       'data': {'e': 'kline', 's': symbol_id,
+                                'k': {'t': start, 'i': timeframe, 'o': '1', 'h': '2', 'l': '0.5',
+                                      'c': str(close), 'v': '10', 'x': closed}}})
+
+
+def test_stream_name_spot_symbols():
+    assert stream_name('BTC/USDT', '1m') == 'btcusdt@kline_1m'
+    assert stream_name('BTC-USDT', '15m') == 'btcusdt@kline_15m'
+
+
+def test_stream_name_strips_settle_currency_of_derivatives():
+    assert stream_name('BTC/USDT:USDT', '1m') == 'btcusdt@kline_1m'
+    assert ':' not in stream_name('ETH/USD:ETH', '5m')
+
+
+def test_derivatives_are_not_subscribed_on_spot_stream():
+    ingestor = KlineStreamIngestor(make_monitor(), 'binance', ['BTC/USDT:USDT', 'ETH/USDT'], ['1m'])
+    assert ingestor.streams == {'ethusdt@kline_1m': ('ETH/USDT', '1m')}
+
+
+def test_handle_message_updates_cache_and_price_only():
+    monitor = make_monitor()
+    start = 1700000000000
+    monitor.ohlcv_cache.seed('binance', 'ETH/USDT', '1m', [[start + i * MINUTE, 1, 2, 0.5, 100 + i, 1] for i in range(20)])
+    ingestor = KlineStreamIngestor(monitor, 'binance', ['ETH/USDT'], ['1m'])
+    for close in (120.5, 121.0):
+        ingestor.handle_message(kline_message('ETHUSDT', '1m', start + 20 * MINUTE, close))
+    buffer = monitor.ohlcv_cache.get('binance', 'ETH/USDT', '1m')
+    assert buffer.tail(1)[0][4] == 121.0
+    assert buffer.stream_updated > 0
+    # 只写价格，连接统计由轮询按轮计入（假的监控对象没有 _record_price）
+    assert monitor.prices == [('ETH/USDT', 120.5), ('ETH/USDT', 121.0)]
+
+
+def test_gap_in_stream_hands_buffer_back_to_rest():
+    monitor = make_monitor()
+    start = 1700000000000
+    monitor.ohlcv_cache.seed('binance', 'ETH/USDT', '1m', [[start + i * MINUTE, 1, 2, 0.5, 100, 1] for i in range(20)])
+    ingestor = KlineStreamIngestor(monitor, 'binance', ['ETH/USDT'], ['1m'])
+    ingestor.handle_message(kline_message('ETHUSDT', '1m', start + 25 * MINUTE, 130))
+    buffer = monitor.ohlcv_cache.get('binance', 'ETH/USDT', '1m')
+    assert buffer.stream_updated == 0.0
+    assert len(buffer) == 20
+
+
+def test_fallback_polls_dropped_streams_over_rest():
+    monitor = make_monitor()
+    ingestor = KlineStreamIngestor(monitor, 'binance', ['BTC/USDT', 'ETH/USDT'], ['1m', '5m'], poll_interval=0.01)
+    ingestor.running = True
+    ingestor.live_streams.add('btcusdt@kline_1m')
+    ingestor.last_update['btcusdt@kline_1m'] = time.time()
+
+    def poll(exchange, symbol, timeframe, limit):
+        monitor.polls.append((symbol, timeframe, limit))
+        if len(monitor.polls) == 3:
+            ingestor.running = False
+
+    monitor.safe_fetch_ohlcv = poll
+    asyncio.run(asyncio.wait_for(ingestor._fallback_loop(), 5))
+    limit_5m = monitor.config.get('price_period', 15)
+    assert sorted(monitor.polls) == [('BTC/USDT', '5m', limit_5m), ('ETH/USDT', '1m', 15), ('ETH/USDT', '5m', limit_5m)]
+    assert ingestor.stats['fallback_polls'] == 3
+
+
+def test_stale_live_stream_counts_as_dropped():
+    ingestor = KlineStreamIngestor(make_monitor(), 'binance', ['BTC/USDT'], ['1m'], stale_after=30)
+    ingestor.live_streams.add('btcusdt@kline_1m')
+    ingestor.last_update['btcusdt@kline_1m'] = time.time()
+    assert ingestor.dropped_symbols() == []
+    ingestor.last_update['btcusdt@kline_1m'] = time.time() - 31
+    assert ingestor.dropped_symbols() == [('BTC/USDT', '1m')]
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+批量行情快照模式：
+  - 每轮每个交易所只调用一次 fetch_tickers
+  - 自行保存各交易对带时间戳的价格历史
+  - 一次向量化计算全部交易对在 price_period 内的涨跌幅
+"""
+import time
+import numpy as np
+from collections import deque
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+
+class TickerPriceHistory:
+    """单个交易所的快照价格历史，列为交易对，行为一次快照"""
+
+    def __init__(self):
+        self.columns: Dict[str, int] = {}   # symbol -> 列号
+        self.symbols: List[str] = []
+        self.snapshots: deque = deque()     # (timestamp, np.ndarray)
+        self.lock = Lock()
+
+    def add_snapshot(self, prices: Dict[str, float], timestamp: Optional[float] = None) -> None:
+        """追加一次快照，新出现的交易对自动分配新列，缺失的交易对记为 NaN"""
+        timestamp = timestamp if timestamp is not None else time.time()
+        with self.lock:
+            for symbol in prices:
+                if symbol not in self.columns:
+                    self.columns[symbol] = len(self.symbols)
+                    self.symbols.append(symbol)
+            row = np.full(len(self.symbols), np.nan)
+            for symbol, price in prices.items():
+                row[self.columns[symbol]] = price
+            self.snapshots.append((timestamp, row))
+
+    def trim(self, max_age: float, now: Optional[float] = None) -> None:
+        """只保留最近 max_age 秒内的快照，并额外保留一条作为窗口起点"""
+        now = now if now is not None else time.time()
+        with self.lock:
+            while len(self.snapshots) > 1 and now - self.snapshots[1][0] >= max_age:
+                self.snapshots.popleft()
+
+    def changes(self, window: float, now: Optional[float] = None) -> Tuple[List[str], np.ndarray]:
+        """
+        计算每个交易对相对 window 秒前的涨跌幅（%）：
+          - 起点取时间不晚于 now - window 的最近一次快照
+          - 历史不足 window 时返回空结果（相当于K线数据不足）
+        """
+        now = now if now is not None else time.time()
+        with self.lock:
+            if not self.snapshots:
+                return [], np.array([])
+            past = None
+            for ts, row in reversed(self.snapshots):
+                if now - ts >= window:
+                    past = row
+                    break
+            if past is None:
+                return [], np.array([])
+            current = self.snapshots[-1][1]
+            symbols = list(self.symbols)
+
+        past = np.concatenate([past, np.full(len(current) - len(past), np.nan)])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = (current - past) / past * 100
+        change[~(past > 0)] = np.nan
+        return symbols, change
+
+
+def evaluate_price_alerts(symbols: List[str], change: np.ndarray, threshold: float,
+                          direction: str, price_period: int) -> List[Tuple[str, str]]:
+    """
+    对全部交易对一次性判断价格警报，规则与 check_price_alert 一致，
+    返回 [(symbol, alert_msg), ...]
+    """
+    if not len(symbols):
+        return []
+    valid = ~np.isnan(change)
+    up = valid & (change >= threshold) if direction in ['up', 'both'] else np.zeros(len(change), dtype=bool)
+    down = valid & (change <= -threshold) & ~up if direction in ['down', 'both'] else np.zeros(len(change), dtype=bool)
+    alerts = []
+    for i in np.flatnonzero(up):
+        alerts.append((symbols[i], f"📈 价格上涨 {change[i]:.2f}%（{price_period}分钟）"))
+    for i in np.flatnonzero(down):
+        alerts.append((symbols[i], f"📉 价格下跌 {abs(change[i]):.2f}%（{price_period}分钟）"))
+    return alerts
@@ -1,57 +1,133 @@
+from urllib.request import Request, urlopen
+
 import dash
-from dash import dcc, html
+from dash import html
 import dash_bootstrap_components as dbc
-from flask import Flask
-from dash.dependencies import Input, Output
+from flask import Flask, Response
+from state_bridge import SharedStateReader
+from dashboard_feed import DashboardFeed
+
+# 浏览器端：订阅 /events，收到 snapshot 时整体渲染，收到 diff 时只替换变化的行
+# Dash 在取得布局后才渲染表格，早于表格到达的数据先保存在 view 中，表格出现时（MutationObserver）整体重绘
+# 性能采样按钮同样由 Dash 渲染，用事件委托绑定点击，POST /profile 后显示监控进程的回复
+PROFILE_SWEEPS = 3  # 面板按钮开始采样时的轮数
+FEED_SCRIPT = """
+<script>
+(function () {
+    var view = {};
+    function cell(tag, text) { var el = document.createElement(tag); el.textContent = text; return el; }
+    function row(values) { var tr = document.createElement("tr"); values.forEach(function (v) { tr.appendChild(cell("td", v)); }); return tr; }
+    function paint(section, body) {
+        body.innerHTML = "";
+        (view[section] || []).forEach(function (values) { body.appendChild(row(values)); });
+    }
+    function render(section, patch) {
+        var rows = view[section] || [];
+        var before = rows.length;
+        rows.length = patch.n;
+        Object.keys(patch.rows).forEach(function (i) { rows[+i] = patch.rows[i]; });
+        view[section] = rows;
+        var body = document.getElementById(section + "-body");
+        if (!body) { return; }
+        if (body.rows.length !== before) { paint(section, body); return; }  // 表格与 view 不同步时整体重绘
+        while (body.rows.length > patch.n) { body.deleteRow(-1); }
+        Object.keys(patch.rows).sort(function (a, b) { return a - b; }).forEach(function (i) {
+            var tr = row(patch.rows[i]);
+            if (+i < body.rows.length) { body.replaceChild(tr, body.rows[+i]); } else { body.appendChild(tr); }
+        });
+    }
+    function full(snapshot) {
+        Object.keys(snapshot).forEach(function (section) {
+            view[section] = snapshot[section].slice();
+            var body = document.getElementById(section + "-body");
+            if (body) { paint(section, body); }
+        });
+    }
+    new MutationObserver(function () {
+        Object.keys(view).forEach(function (section) {
+            var body = document.getElementById(section + "-body");
+            if (body && body.rows.length !== view[section].length) { paint(section, body); }
+        });
+    }).observe(document.documentElement, {childList: true, subtree: true});
+    function connect() {
+        var source = new EventSource("/events");
+        source.addEventListener("snapshot", function (e) { full(JSON.parse(e.data)); });
+        source.addEventListener("diff", function (e) {
+            var diff = JSON.parse(e.data);
+            Object.keys(diff).forEach(function (section) { render(section, diff[section]); });
+        });
+    }
+    document.addEventListener("click", function (e) {
+        if (!e.target || e.target.id !== "profile-toggle") { return; }
+        fetch("/profile", {method: "POST"}).then(function (r) { return r.text(); }).then(function (text) {
+            var result = document.getElementById("profile-result");
+            if (result) { result.textContent = text; }
+        });
+    });
+    if (document.readyState === "loading") { document.addEventListener("DOMContentLoaded", connect); } else { connect(); }
+})();
+</script>
+"""
+
 
-def create_dash_app(get_monitor):
+def _table(section, headers):
+    return dbc.Table([html.Thead(html.Tr([html.Th(h) for h in headers])), html.Tbody(id=f"{section}-body")],
+                     bordered=True, striped=True, hover=True)
+
+
+def create_dash_app(state_reader, log_callback=None):
+    """
+    state_reader: SharedStateReader；表格内容由 /events 推送，Dash 只负责页面结构
+    log_callback: 面板后台错误的日志回调 (消息, 类别)，默认写入 Flask 的日志
+    """
     # 使用 Flask 作为底层服务器
     server = Flask(__name__)
     app = dash.Dash(__name__, server=server, external_stylesheets=[dbc.themes.BOOTSTRAP])
+    if log_callback is None:
+        log_callback = lambda message, category: server.logger.warning("[%s] %s", category, message)
+    feed = DashboardFeed(state_reader, log_callback=log_callback)  # 所有浏览器共用一份视图，只在监控发布新快照时重新计算
 
     # 页面布局：无需单独建 HTML 文件，全部在 Dash 中定义
     app.layout = dbc.Container([
         html.H1("加密货币监控系统", className="text-center mt-3"),
         html.Hr(),
         html.H3("交易所状态"),
-        dcc.Interval(id="interval-component", interval=5000, n_intervals=0),  # 每5秒刷新
-        dbc.Table(id="exchange-status-table", bordered=True, striped=True, hover=True),
+        html.Table(html.Tbody(id="stats-body")),
+        _table("status", ["交易所", "状态"]),
         html.H3("交易排行榜"),
-        dbc.Table(id="leaderboard-table", bordered=True, striped=True, hover=True)
+        _table("leaderboard", ["交易对", "涨跌幅(%)"]),
+        html.H3("最近警报"),
+        _table("alerts", ["时间", "交易所", "交易对", "内容"]),
+        html.H3("性能采样"),
+        html.Button("🔬 开始 / 结束采样", id="profile-toggle", className="btn btn-secondary btn-sm me-2"),
+        html.Span(id="profile-result"),
+        html.Table(html.Tbody(id="profile-body"), className="mt-2"),
+        html.H3("运行指标"),
+        _table("metrics", ["指标", "标签", "次数/当前值", "平均", "P50", "P95"])
     ], fluid=True)
+    app.index_string = app.index_string.replace("</body>", FEED_SCRIPT + "</body>")
+
+    @server.route("/profile", methods=["POST"])
+    def profile():
+        # 面板进程不持有监控对象，经监控进程的指标端口（metrics_port）转发 POST /profile?toggle=1
+        control = (state_reader.read() or {}).get('control') or {}
+        if not control.get('url'):
+            return Response("监控进程未开启指标端口（metrics_port），无法控制性能采样\n", status=503, mimetype="text/plain")
+        request = Request(f"{control['url']}/profile?toggle=1&sweeps={PROFILE_SWEEPS}", data=b"", method="POST")
+        try:
+            with urlopen(request, timeout=5) as response:
+                return Response(response.read(), mimetype="text/plain")
+        except OSError as e:
+            return Response(f"性能采样请求失败: {str(e)}\n", status=502, mimetype="text/plain")
 
-    # 回调函数：更新交易所状态
-    @app.callback(
-        Output("exchange-status-table", "children"),
-        Input("interval-component", "n_intervals")
-    )
-    def update_status(n):
-        monitor = get_monitor()
-        if not monitor:
-            return [html.Tr([html.Td("暂无数据")])]
-        status = monitor.exchange_status
-        header = html.Thead(html.Tr([html.Th("交易所"), html.Th("状态")]))
-        body = html.Tbody([html.Tr([html.Td(ex), html.Td(status.get(ex, "unknown"))])
-                            for ex in status])
-        return [header, body]
-
-    # 回调函数：更新排行榜
-    @app.callback(
-        Output("leaderboard-table", "children"),
-        Input("interval-component", "n_intervals")
-    )
-    def update_leaderboard(n):
-        monitor = get_monitor()
-        if not monitor:
-            return [html.Tr([html.Td("暂无数据")])]
-        leaderboard = monitor.get_leaderboard()
-        header = html.Thead(html.Tr([html.Th("交易对"), html.Th("涨跌幅(%)")]))
-        body = html.Tbody([html.Tr([html.Td(pair), html.Td(f"{change:.2f}")])
-                            for pair, change in leaderboard])
-        return [header, body]
+    @server.route("/events")
+    def events():
+        return Response(feed.stream(), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
     return app
 
-def run_web_server(get_monitor, host="0.0.0.0", port=5000):
-    app = create_dash_app(get_monitor)
-    app.run_server(host=host, port=port, debug=False)
+def run_web_server(state_name, host="0.0.0.0", port=5000):
+    """state_name: 监控进程中 SharedStateWriter 的共享内存名字"""
+    app = create_dash_app(SharedStateReader(state_name))
+    app.run(host=host, port=port, debug=False)